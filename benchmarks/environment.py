@@ -0,0 +1,196 @@
+"""
+Prepares the process for benchmarking: environment variables, Mongo client
+(mongomock or a real mongod) shared by service and modular_sdk models,
+in-memory secrets storage and a counter of database round-trips.
+
+Must be configured before anything from src/ is imported because some
+settings are read at import time
+"""
+import os
+import sys
+import threading
+from functools import wraps
+from pathlib import Path
+
+from modular_sdk.services.ssm_service import AbstractSSMClient
+
+SRC = Path(__file__).resolve().parent.parent / 'src'
+
+# collection methods that result in a round-trip to the database
+COUNTED_METHODS = (
+    'find',
+    'find_one',
+    'find_one_and_update',
+    'find_one_and_replace',
+    'find_one_and_delete',
+    'insert_one',
+    'insert_many',
+    'replace_one',
+    'update_one',
+    'update_many',
+    'delete_one',
+    'delete_many',
+    'bulk_write',
+    'count_documents',
+    'estimated_document_count',
+    'aggregate',
+    'distinct',
+)
+# commands that are sent by a driver on its own
+IGNORED_COMMANDS = {
+    'hello',
+    'ismaster',
+    'isMaster',
+    'ping',
+    'endSessions',
+    'buildInfo',
+}
+
+
+class DbCallCounter:
+    """
+    Counts database round-trips. Calls to mongomock are intercepted on
+    collection level (nested calls inside mongomock are not counted), calls
+    to a real mongod are intercepted via pymongo command monitoring
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._local = threading.local()
+
+    def reset(self) -> int:
+        count, self.count = self.count, 0
+        return count
+
+    def patch_mongomock(self) -> None:
+        from mongomock.collection import Collection
+
+        for name in COUNTED_METHODS:
+            original = getattr(Collection, name, None)
+            if original is None:
+                continue
+            setattr(Collection, name, self._wrap(original))
+
+    def _wrap(self, method):
+        local = self._local
+
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            depth = getattr(local, 'depth', 0)
+            if not depth:
+                self.count += 1
+            local.depth = depth + 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                local.depth = depth
+
+        return wrapper
+
+    def command_listener(self):
+        from pymongo import monitoring
+
+        counter = self
+
+        class _Listener(monitoring.CommandListener):
+            def started(self, event):
+                if event.command_name not in IGNORED_COMMANDS:
+                    counter.count += 1
+
+            def succeeded(self, event):
+                pass
+
+            def failed(self, event):
+                pass
+
+        return _Listener()
+
+
+class InMemorySSMClient(AbstractSSMClient):
+    """
+    Replaces Vault so that on-prem auth can sign and verify tokens
+    """
+
+    def __init__(self):
+        self._storage = {}
+
+    def get_parameter(self, name: str):
+        return self._storage.get(name)
+
+    def put_parameter(self, name: str, value, _type='SecureString'):
+        self._storage[name] = value
+        return name
+
+    def delete_parameter(self, name: str) -> bool:
+        return self._storage.pop(name, None) is not None
+
+
+def patch_mongomock_bulk() -> None:
+    """
+    Pymongo>=4.11 passes `sort` to bulk update and replace operations,
+    mongomock 4.3 does not accept it. Nothing in src/ sorts bulk writes
+    """
+    from mongomock.collection import BulkOperationBuilder
+
+    def without_sort(method):
+        @wraps(method)
+        def wrapper(*args, sort=None, **kwargs):
+            return method(*args, **kwargs)
+
+        return wrapper
+
+    for name in ('add_update', 'add_replace'):
+        setattr(BulkOperationBuilder, name,
+                without_sort(getattr(BulkOperationBuilder, name)))
+
+
+def configure(mongo_uri: str | None, db_name: str) -> DbCallCounter:
+    """
+    Sets envs and installs a shared Mongo client. Returns the counter of
+    database calls that is already wired into that client
+    """
+    os.environ.update(
+        {
+            'MODULAR_SERVICE_MODE': 'docker',
+            'MODULAR_SERVICE_MONGO_DATABASE': db_name,
+            'MODULAR_SERVICE_LOG_LEVEL': 'ERROR',
+            'MODULAR_SDK_SERVICE_MODE': 'docker',
+            'MODULAR_SDK_DB_BACKEND': 'mongo',
+            'MODULAR_SDK_MONGO_DB_NAME': db_name,
+            'MODULAR_SDK_LOG_LEVEL': 'ERROR',
+        }
+    )
+    if str(SRC) not in sys.path:
+        sys.path.insert(0, str(SRC))
+
+    counter = DbCallCounter()
+    if mongo_uri:
+        import pymongo
+
+        os.environ['MODULAR_SERVICE_MONGO_URI'] = mongo_uri
+        os.environ['MODULAR_SDK_MONGO_URI'] = mongo_uri
+        client = pymongo.MongoClient(
+            mongo_uri, event_listeners=[counter.command_listener()]
+        )
+        client.drop_database(db_name)
+    else:
+        import mongomock
+
+        counter.patch_mongomock()
+        patch_mongomock_bulk()
+        client = mongomock.MongoClient()
+
+    from modular_sdk.models.pynamongo import models as sdk_models
+
+    import models
+
+    models.MongoClientSingleton._instance = client
+    sdk_models.MongoClientSingleton._instance = client
+
+    from commons.log_helper import setup_logging
+    from services import SP
+
+    setup_logging()
+    # cached_property keeps its value in instance dict
+    SP.__dict__['ssm'] = InMemorySSMClient()
+    return counter
@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+"""
+Benchmarks every registered route by calling HANDLER.lambda_handler directly
+and through the on-prem Bottle application. Reports p50/p99 latency,
+database calls per request and memory allocated per request. Results are
+written to a JSON file that can be compared with a previous run:
+
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import asdict
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import quote, urlencode
+from wsgiref.util import setup_testing_defaults
+
+import environment
+
+ROOT = Path(__file__).resolve().parent
+STAGE = 'dev'
+TARGETS = ('lambda', 'bottle')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--mongo-uri',
+        help='Use a real mongod instead of mongomock. The database is '
+             'dropped before seeding',
+    )
+    parser.add_argument('--database', default='modular_service_benchmark')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument(
+        '--alloc-iterations', type=int, default=5,
+        help='Number of separate requests measured with tracemalloc',
+    )
+    parser.add_argument(
+        '--targets', nargs='+', choices=TARGETS, default=list(TARGETS)
+    )
+    parser.add_argument(
+        '--only', nargs='+', default=[],
+        help='Benchmark only routes whose path contains one of these strings',
+    )
+    parser.add_argument('--customers', type=int, default=10)
+    parser.add_argument('--tenants', type=int, default=10_000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--policies', type=int, default=200)
+    parser.add_argument('--roles', type=int, default=50)
+    parser.add_argument('--applications', type=int, default=1_000)
+    parser.add_argument(
+        '--output', type=Path,
+        help='JSON file to write results to. By default a timestamped file '
+             'inside benchmarks/results/',
+    )
+    parser.add_argument(
+        '--compare', type=Path, help='JSON file of a previous run'
+    )
+    parser.add_argument(
+        '--max-regression', type=float,
+        help='Exit with non-zero code if p50 latency of any route grew by '
+             'more than this percent or it makes more database calls than '
+             'in the compared run',
+    )
+    return parser
+
+
+class LambdaTarget:
+    def __init__(self, claims: dict[str, dict]):
+        from lambdas.modular_api_handler.handler import HANDLER
+
+        self._handler = HANDLER
+        self._claims = claims
+
+    def __call__(self, scenario, path_params: dict, payload: dict) -> int:
+        from commons import RequestContext
+
+        path = _fill(scenario.path, path_params)
+        event = {
+            'httpMethod': scenario.method,
+            'path': path,
+            'headers': {'Content-Type': 'application/json'},
+            'requestContext': {
+                'resourcePath': scenario.path,
+                'path': f'/{STAGE}{path}',
+            },
+            'pathParameters': path_params,
+        }
+        if scenario.principal:
+            event['requestContext']['authorizer'] = {
+                'claims': self._claims[scenario.principal]
+            }
+        if scenario.method == 'GET':
+            event['queryStringParameters'] = payload
+        else:
+            event['body'] = json.dumps(payload)
+            event['isBase64Encoded'] = False
+        return self._handler.lambda_handler(event, RequestContext())[
+            'statusCode'
+        ]
+
+
+class BottleTarget:
+    def __init__(self, tokens: dict[str, str]):
+        from onprem.app import OnPremApiBuilder
+
+        self._app = OnPremApiBuilder().build(STAGE)
+        self._tokens = tokens
+
+    def __call__(self, scenario, path_params: dict, payload: dict) -> int:
+        body = b''
+        query = ''
+        if scenario.method == 'GET':
+            query = urlencode(payload)
+        else:
+            body = json.dumps(payload).encode()
+        environ = {
+            'REQUEST_METHOD': scenario.method,
+            'PATH_INFO': f'/{STAGE}{_fill(scenario.path, path_params)}',
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': BytesIO(body),
+        }
+        if scenario.principal:
+            environ['HTTP_AUTHORIZATION'] = (
+                f'Bearer {self._tokens[scenario.principal]}'
+            )
+        setup_testing_defaults(environ)
+        status = []
+
+        def start_response(st, headers, exc_info=None):
+            status.append(st)
+
+        for _ in self._app(environ, start_response):
+            pass  # consuming the body
+        return int(status[0].split()[0])
+
+
+def _fill(template: str, params: dict) -> str:
+    return template.format(**{k: quote(v, safe='') for k, v in params.items()})
+
+
+def _principals() -> tuple[dict[str, str], dict[str, dict]]:
+    """
+    Returns access tokens and decoded claims of seeded principals
+    """
+    from seed import ADMIN_USERNAME, PRINCIPAL_PASSWORD, SYSTEM_USERNAME
+    from scenarios import ADMIN, SYSTEM
+    from services import SP
+
+    cl = SP.onprem_users_client
+    tokens, claims = {}, {}
+    for principal, username in ((ADMIN, ADMIN_USERNAME),
+                                (SYSTEM, SYSTEM_USERNAME)):
+        token = cl.authenticate_user(username, PRINCIPAL_PASSWORD)['id_token']
+        tokens[principal] = token
+        claims[principal] = cl.decode_token(token)
+    return tokens, claims
+
+
+def _quantile(values: list[float], q: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+def measure(target, scenario, data, counter, args) -> dict:
+    timings, calls, codes = [], [], Counter()
+    for i in range(args.warmup + args.iterations):
+        params, payload = scenario.prepare(data)
+        counter.reset()
+        start = time.perf_counter_ns()
+        code = target(scenario, params, payload)
+        elapsed = time.perf_counter_ns() - start
+        if i < args.warmup:
+            continue
+        timings.append(elapsed / 1e6)
+        calls.append(counter.reset())
+        codes[code] += 1
+
+    peaks, retained = [], []
+    tracemalloc.start()
+    for _ in range(args.alloc_iterations):
+        params, payload = scenario.prepare(data)
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        target(scenario, params, payload)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append((peak - base) / 1024)
+        retained.append((current - base) / 1024)
+    tracemalloc.stop()
+
+    return {
+        'status': {str(k): v for k, v in sorted(codes.items())},
+        'latency_ms': {
+            'p50': round(_quantile(timings, 50), 3),
+            'p99': round(_quantile(timings, 99), 3),
+            'mean': round(statistics.fmean(timings), 3),
+            'min': round(min(timings), 3),
+            'max': round(max(timings), 3),
+        },
+        'db_calls': {
+            'mean': round(statistics.fmean(calls), 2),
+            'max': max(calls),
+        },
+        'alloc_kib': {
+            'peak': round(statistics.median(peaks), 1) if peaks else None,
+            'retained': (
+                round(statistics.median(retained), 1) if retained else None
+            ),
+        },
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', 'HEAD'), cwd=ROOT, capture_output=True,
+            text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return
+
+
+def _key(res: dict) -> tuple[str, str, str]:
+    return res['target'], res['method'], res['path']
+
+
+def compare(current: dict, previous: dict,
+            max_regression: float | None) -> bool:
+    """
+    Prints differences between two runs. Returns False if a regression
+    above the threshold is found
+    """
+    before = {_key(r): r for r in previous['results']}
+    ok = True
+    print(f'\nCompared with {previous["meta"].get("git_commit")} '
+          f'({previous["meta"].get("created_at")})')
+    print(f'{"target":<7} {"route":<45} {"p50 ms":>18} {"p99 ms":>18} '
+          f'{"db calls":>12}')
+    for res in current['results']:
+        old = before.get(_key(res))
+        if not old:
+            continue
+        p50, old_p50 = res['latency_ms']['p50'], old['latency_ms']['p50']
+        p99, old_p99 = res['latency_ms']['p99'], old['latency_ms']['p99']
+        db, old_db = res['db_calls']['mean'], old['db_calls']['mean']
+        change = (p50 - old_p50) / old_p50 * 100 if old_p50 else 0.0
+        mark = ''
+        if max_regression is not None and (
+                change > max_regression or db > old_db):
+            ok = False
+            mark = ' !'
+        print(f'{res["target"]:<7} {res["method"] + " " + res["path"]:<45} '
+              f'{old_p50:>7.2f}→{p50:<7.2f}{change:+.0f}% '
+              f'{old_p99:>8.2f}→{p99:<8.2f} {old_db:>5.1f}→{db:<5.1f}{mark}')
+    return ok
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+    counter = environment.configure(args.mongo_uri, args.database)
+
+    from seed import Sizes, init_private_key, seed
+    from scenarios import SCENARIOS, SKIPPED
+    from commons.log_helper import setup_logging
+
+    sizes = Sizes(
+        customers=args.customers,
+        tenants=args.tenants,
+        users=args.users,
+        policies=args.policies,
+        roles=args.roles,
+        applications=args.applications,
+    )
+    print(f'Seeding: {asdict(sizes)}')
+    start = time.perf_counter()
+    init_private_key()
+    data = seed(sizes)
+    setup_logging()  # main.py that is used for seeding configures its own
+    print(f'Seeded in {time.perf_counter() - start:.1f}s')
+
+    tokens, claims = _principals()
+    targets = {}
+    if 'lambda' in args.targets:
+        targets['lambda'] = LambdaTarget(claims)
+    if 'bottle' in args.targets:
+        targets['bottle'] = BottleTarget(tokens)
+
+    from lambdas.modular_api_handler.handler import HANDLER
+
+    covered = {(s.method, s.path) for s in SCENARIOS}
+    missing = [
+        (e.method.value, e.path) for e in HANDLER.iter_endpoint()
+        if (e.method.value, e.path) not in covered
+        and (e.method.value, e.path) not in SKIPPED
+    ]
+    for method, path in missing:
+        print(f'WARNING: no scenario for {method} {path}')
+
+    results = []
+    for scenario in SCENARIOS:
+        if args.only and not any(o in scenario.path for o in args.only):
+            continue
+        for name, target in targets.items():
+            res = measure(target, scenario, data, counter, args)
+            res = {
+                'target': name,
+                'method': scenario.method,
+                'path': scenario.path,
+                **res,
+            }
+            results.append(res)
+            lat = res['latency_ms']
+            print(f'{name:<7} {scenario.method + " " + scenario.path:<45} '
+                  f'p50 {lat["p50"]:>8.2f}ms  p99 {lat["p99"]:>8.2f}ms  '
+                  f'db {res["db_calls"]["mean"]:>5.1f}  '
+                  f'peak {res["alloc_kib"]["peak"] or 0:>8.1f}KiB  '
+                  f'{res["status"]}')
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'git_commit': _git_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'backend': 'mongod' if args.mongo_uri else 'mongomock',
+            'sizes': asdict(sizes),
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'alloc_iterations': args.alloc_iterations,
+        },
+        'results': results,
+        'skipped': [
+            {'method': m, 'path': p, 'reason': r}
+            for (m, p), r in SKIPPED.items()
+        ] + [
+            {'method': m, 'path': p, 'reason': 'no scenario'}
+            for m, p in missing
+        ],
+    }
+    output = args.output
+    if not output:
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        output = ROOT / 'results' / f'{stamp}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f'Results were written to {output}')
+
+    if args.compare:
+        previous = json.loads(args.compare.read_text())
+        if not compare(report, previous, args.max_regression):
+            print('Regressions found')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,446 @@
+"""
+One scenario per registered route. Each scenario knows how to prepare a
+request: path parameters and body (or query). Preparation may write to
+the database (e.g. create an entity that will be deleted by the measured
+request), it is not included in measurements
+"""
+import base64
+import itertools
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable
+
+from seed import (
+    ADMIN_ROLE,
+    ADMIN_USERNAME,
+    PRINCIPAL_PASSWORD,
+    SETTINGS_PER_TENANT,
+    Dataset,
+)
+
+ADMIN = 'admin'
+SYSTEM = 'system'
+
+Prepared = tuple[dict, dict]  # path params, body or query
+_uid = itertools.count()
+
+
+@dataclass(frozen=True)
+class Scenario:
+    method: str
+    path: str  # Endpoint value
+    principal: str | None = ADMIN  # None for endpoints without auth
+    prepare: Callable[[Dataset], Prepared] = field(
+        default=lambda data: ({}, {})
+    )
+
+
+def _pick(items: list[str]) -> str:
+    return items[next(_uid) % len(items)]
+
+
+def _new_policy(data: Dataset) -> str:
+    from models.policy import Policy
+
+    name = f'bench-tmp-policy-{next(_uid)}'
+    Policy(customer=data.customer, name=name, permissions=[]).save()
+    return name
+
+
+def _new_role(data: Dataset) -> str:
+    from models.role import Role
+
+    name = f'bench-tmp-role-{next(_uid)}'
+    Role(customer=data.customer, name=name, policies=[]).save()
+    return name
+
+
+def _new_tenant(data: Dataset, regions: tuple[str, ...] = ()) -> str:
+    from modular_sdk.models.tenant import Tenant
+
+    from services import SP
+
+    uid = next(_uid)
+    name = f'BENCH-TMP-TENANT-{uid}'
+    rs = SP.region_service
+    Tenant(
+        name=name,
+        display_name=name.lower(),
+        display_name_to_lower=name.lower(),
+        is_active=True,
+        read_only=False,
+        customer_name=data.customer,
+        cloud='AWS',
+        project=f'8{uid:011d}',
+        regions=[rs.region_model_to_attr(rs.get_region(r)) for r in regions],
+    ).save()
+    return name
+
+
+def _new_application(data: Dataset) -> str:
+    from modular_sdk.models.application import Application
+
+    aid = str(uuid.uuid4())
+    Application(
+        application_id=aid,
+        customer_id=data.customer,
+        type='AWS_ROLE',
+        description='bench application',
+        is_deleted=False,
+    ).save()
+    return aid
+
+
+def _new_region() -> str:
+    from modular_sdk.models.region import RegionModel
+
+    uid = next(_uid)
+    name = f'BENCH-TMP-REGION-{uid}'
+    RegionModel(
+        maestro_name=name,
+        native_name=f'bench-tmp-region-{uid}',
+        cloud='AWS',
+        region_id=str(uuid.uuid4()),
+        is_active=True,
+    ).save()
+    return name
+
+
+def _new_user(data: Dataset) -> str:
+    from models.user import User
+
+    username = f'bench-tmp-user-{next(_uid)}'
+    User(user_id=username, password=b'', customer=data.customer).save()
+    return username
+
+
+def _refresh_token() -> str:
+    from services import SP
+
+    res = SP.onprem_users_client.authenticate_user(
+        ADMIN_USERNAME, PRINCIPAL_PASSWORD
+    )
+    return res['refresh_token']
+
+
+def _gcp_credentials() -> dict:
+    return {
+        'type': 'service_account',
+        'project_id': 'bench-project',
+        'private_key_id': 'key-id',
+        'private_key': 'private-key',
+        'client_email': 'bench@bench-project.iam.gserviceaccount.com',
+        'client_id': '1234567890',
+        'auth_uri': 'https://accounts.google.com/o/oauth2/auth',
+        'token_uri': 'https://oauth2.googleapis.com/token',
+        'auth_provider_x509_cert_url': 'https://www.googleapis.com/oauth2/v1/certs',
+        'client_x509_cert_url': 'https://www.googleapis.com/robot/v1/metadata/x509/bench',
+    }
+
+
+SCENARIOS = (
+    # policies
+    Scenario('GET', '/policies'),
+    Scenario(
+        'GET', '/policies/{name}',
+        prepare=lambda d: ({'name': _pick(d.policies)}, {}),
+    ),
+    Scenario(
+        'POST', '/policies',
+        prepare=lambda d: ({}, {
+            'name': f'bench-new-policy-{next(_uid)}',
+            'permissions': ['tenant:describe'],
+        }),
+    ),
+    Scenario(
+        'PATCH', '/policies/{name}',
+        prepare=lambda d: ({'name': _pick(d.policies)}, {
+            'permissions_to_attach': ['tenant:describe'],
+        }),
+    ),
+    Scenario(
+        'DELETE', '/policies/{name}',
+        prepare=lambda d: ({'name': _new_policy(d)}, {}),
+    ),
+    # roles
+    Scenario('GET', '/roles'),
+    Scenario(
+        'GET', '/roles/{name}',
+        prepare=lambda d: ({'name': _pick(d.roles)}, {}),
+    ),
+    Scenario(
+        'POST', '/roles',
+        prepare=lambda d: ({}, {
+            'name': f'bench-new-role-{next(_uid)}',
+            'policies': [_pick(d.policies)],
+        }),
+    ),
+    Scenario(
+        'PATCH', '/roles/{name}',
+        prepare=lambda d: ({'name': _pick(d.roles)}, {
+            'policies_to_attach': [_pick(d.policies)],
+        }),
+    ),
+    Scenario(
+        'DELETE', '/roles/{name}',
+        prepare=lambda d: ({'name': _new_role(d)}, {}),
+    ),
+    # rbac
+    Scenario('GET', '/rbac/export'),
+    Scenario(
+        'POST', '/rbac/import',
+        prepare=lambda d: ({}, {
+            'policies': [{
+                'name': f'bench-import-policy-{uid}',
+                'permissions': ['tenant:describe'],
+            } for uid in itertools.islice(_uid, 5)],
+            'roles': [{
+                'name': f'bench-import-role-{next(_uid)}',
+                'policies': [_pick(d.policies)],
+            }],
+        }),
+    ),
+    # customers
+    Scenario('GET', '/customers', principal=SYSTEM),
+    Scenario(
+        'GET', '/customers/{name}', principal=SYSTEM,
+        prepare=lambda d: ({'name': _pick(d.customers)}, {}),
+    ),
+    Scenario(
+        'POST', '/customers', principal=SYSTEM,
+        prepare=lambda d: ({}, {
+            'name': f'BENCH_NEW_CUSTOMER_{next(_uid)}',
+            'display_name': 'bench customer',
+        }),
+    ),
+    Scenario(
+        'PATCH', '/customers/{name}', principal=SYSTEM,
+        prepare=lambda d: ({'name': _pick(d.customers[1:] or d.customers)}, {
+            'admins': ['admin@example.com'],
+        }),
+    ),
+    Scenario(
+        'POST', '/customers/{name}/activate', principal=SYSTEM,
+        prepare=lambda d: ({'name': _pick(d.customers[1:] or d.customers)}, {}),
+    ),
+    Scenario(
+        'POST', '/customers/{name}/deactivate', principal=SYSTEM,
+        prepare=lambda d: ({'name': _pick(d.customers[1:] or d.customers)}, {}),
+    ),
+    # tenants
+    Scenario('GET', '/tenants'),
+    Scenario('GET', '/tenants/stats'),
+    Scenario(
+        'GET', '/tenants/{name}',
+        prepare=lambda d: ({'name': _pick(d.tenants)}, {}),
+    ),
+    Scenario(
+        'POST', '/tenants',
+        prepare=lambda d: ({}, {
+            'name': f'BENCH-NEW-TENANT-{next(_uid)}',
+            'display_name': 'bench tenant',
+            'cloud': 'AWS',
+            'account_id': f'9{next(_uid):011d}',
+            'read_only': False,
+        }),
+    ),
+    Scenario(
+        'POST', '/tenants/batch',
+        prepare=lambda d: ({}, {'tenants': [
+            {
+                'name': f'BENCH-BATCH-TENANT-{uid}',
+                'display_name': 'bench tenant',
+                'cloud': 'AWS',
+                'account_id': f'7{uid:011d}',
+                'read_only': False,
+            } for uid in itertools.islice(_uid, 10)
+        ] + [
+            {  # already exists
+                'name': _pick(d.tenants),
+                'display_name': 'bench tenant',
+                'cloud': 'AWS',
+                'account_id': f'7{next(_uid):011d}',
+                'read_only': False,
+            }
+        ]}),
+    ),
+    Scenario(
+        'POST', '/tenants/{name}/activate',
+        prepare=lambda d: ({'name': _pick(d.tenants)}, {}),
+    ),
+    Scenario(
+        'POST', '/tenants/{name}/deactivate',
+        prepare=lambda d: ({'name': _pick(d.tenants)}, {}),
+    ),
+    Scenario(
+        'DELETE', '/tenants/{name}',
+        prepare=lambda d: ({'name': _new_tenant(d)}, {}),
+    ),
+    # tenant regions
+    Scenario(
+        'GET', '/tenants/{name}/regions',
+        prepare=lambda d: ({'name': _pick(d.tenants)}, {}),
+    ),
+    Scenario(
+        'POST', '/tenants/{name}/regions',
+        prepare=lambda d: ({'name': _new_tenant(d)}, {
+            'regions': d.spare_regions[:3],
+        }),
+    ),
+    Scenario(
+        'DELETE', '/tenants/{name}/regions',
+        prepare=lambda d: (
+            {'name': _new_tenant(d, tuple(d.spare_regions[:3]))},
+            {'regions': d.spare_regions[:3]},
+        ),
+    ),
+    # tenant settings
+    Scenario(
+        'GET', '/tenants/settings',
+        prepare=lambda d: ({}, {'key': 'KEY_0'}),
+    ),
+    Scenario(
+        'GET', '/tenants/{name}/settings',
+        prepare=lambda d: ({'name': _pick(d.tenants_with_settings)}, {
+            'key': ','.join(f'KEY_{k}' for k in range(SETTINGS_PER_TENANT)),
+        }),
+    ),
+    Scenario(
+        'PUT', '/tenants/{name}/settings',
+        prepare=lambda d: ({'name': _pick(d.tenants_with_settings)}, {
+            'settings': {
+                f'KEY_{k}': {'value': 'updated'}
+                for k in range(SETTINGS_PER_TENANT)
+            },
+        }),
+    ),
+    # applications
+    Scenario('GET', '/applications'),
+    Scenario('GET', '/applications/stats'),
+    Scenario(
+        'GET', '/applications/{id}',
+        prepare=lambda d: ({'id': _pick(d.applications)}, {}),
+    ),
+    Scenario(
+        'PATCH', '/applications/{id}',
+        prepare=lambda d: ({'id': _pick(d.applications)}, {
+            'description': 'updated',
+        }),
+    ),
+    Scenario(
+        'DELETE', '/applications/{id}',
+        prepare=lambda d: ({'id': _new_application(d)}, {}),
+    ),
+    Scenario(
+        'POST', '/applications/aws-role',
+        prepare=lambda d: ({}, {
+            'description': 'bench',
+            'role_name': 'bench-role',
+            'account_id': '123456789012',
+        }),
+    ),
+    Scenario(
+        'POST', '/applications/azure-credentials',
+        prepare=lambda d: ({}, {
+            'description': 'bench',
+            'client_id': str(uuid.uuid4()),
+            'tenant_id': str(uuid.uuid4()),
+            'api_key': 'secret',
+        }),
+    ),
+    Scenario(
+        'POST', '/applications/azure-certificate',
+        prepare=lambda d: ({}, {
+            'description': 'bench',
+            'client_id': str(uuid.uuid4()),
+            'tenant_id': str(uuid.uuid4()),
+            'certificate': base64.b64encode(b'certificate').decode(),
+        }),
+    ),
+    Scenario(
+        'POST', '/applications/gcp-service-account',
+        prepare=lambda d: ({}, {
+            'description': 'bench',
+            'credentials': _gcp_credentials(),
+        }),
+    ),
+    # regions
+    Scenario('GET', '/regions', principal=SYSTEM),
+    Scenario(
+        'GET', '/regions/{name}', principal=SYSTEM,
+        prepare=lambda d: (
+            {'name': _pick(d.regions)}, {'customer_id': d.customer}
+        ),
+    ),
+    Scenario(
+        'POST', '/regions', principal=SYSTEM,
+        prepare=lambda d: ({}, {
+            'maestro_name': f'BENCH-NEW-REGION-{next(_uid)}',
+            'native_name': f'bench-new-region-{next(_uid)}',
+            'cloud': 'AWS',
+        }),
+    ),
+    Scenario(
+        'DELETE', '/regions/{name}', principal=SYSTEM,
+        prepare=lambda d: ({'name': _new_region()}, {'customer_id': d.customer}),
+    ),
+    # users
+    Scenario('GET', '/users'),
+    Scenario('GET', '/users/whoami'),
+    Scenario('GET', '/users/stats'),
+    Scenario(
+        'GET', '/users/{username}',
+        prepare=lambda d: ({'username': _pick(d.users)}, {}),
+    ),
+    Scenario(
+        'POST', '/users',
+        prepare=lambda d: ({}, {
+            'username': f'bench-new-user-{next(_uid)}',
+            'role_name': ADMIN_ROLE,
+            'password': PRINCIPAL_PASSWORD,
+        }),
+    ),
+    Scenario(
+        'PATCH', '/users/{username}',
+        prepare=lambda d: ({'username': _pick(d.users)}, {
+            'role_name': ADMIN_ROLE,
+        }),
+    ),
+    Scenario(
+        'DELETE', '/users/{username}',
+        prepare=lambda d: ({'username': _new_user(d)}, {}),
+    ),
+    Scenario(
+        'POST', '/users/reset-password',
+        prepare=lambda d: ({}, {'new_password': PRINCIPAL_PASSWORD}),
+    ),
+    Scenario(
+        'POST', '/signup', principal=None,
+        prepare=lambda d: ({}, {
+            'username': f'bench-signup-{next(_uid)}',
+            'password': PRINCIPAL_PASSWORD,
+            'customer_name': f'BENCH_SIGNUP_{next(_uid)}',
+            'customer_display_name': 'bench signup',
+        }),
+    ),
+    Scenario(
+        'POST', '/signin', principal=None,
+        prepare=lambda d: ({}, {
+            'username': ADMIN_USERNAME,
+            'password': PRINCIPAL_PASSWORD,
+        }),
+    ),
+    Scenario(
+        'POST', '/refresh', principal=None,
+        prepare=lambda d: ({}, {'refresh_token': _refresh_token()}),
+    ),
+    # misc
+    Scenario('GET', '/health/live', principal=None),
+    Scenario('GET', '/doc', principal=None),
+    Scenario('GET', '/doc/swagger.json', principal=None),
+)
+
+# routes that cannot be benchmarked offline
+SKIPPED = {
+    ('POST', '/applications/aws-credentials'): 'validates keys against STS',
+}
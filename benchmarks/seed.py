@@ -0,0 +1,267 @@
+"""
+Seeds the database with a realistic volume of entities. Documents are
+serialized by the same adapter the service uses and inserted in bulk, so
+seeding 10k tenants takes seconds even with mongomock
+"""
+import uuid
+from dataclasses import dataclass, field
+
+import bcrypt
+
+PRINCIPAL_PASSWORD = 'Bench-Passw0rd!'
+ADMIN_USERNAME = 'bench-admin'
+SYSTEM_USERNAME = 'bench-system'
+ADMIN_ROLE = 'bench-admin-role'
+ADMIN_POLICY = 'bench-admin-policy'
+CLOUDS = ('AWS', 'AZURE', 'GOOGLE')
+SETTINGS_PER_TENANT = 2
+
+
+@dataclass
+class Sizes:
+    customers: int = 10
+    tenants: int = 10_000
+    users: int = 500
+    policies: int = 200
+    roles: int = 50
+    applications: int = 1_000
+    regions_per_tenant: int = 3
+    tenants_with_settings: int = 1_000
+
+
+@dataclass
+class Dataset:
+    """
+    Names of seeded entities that scenarios can refer to. Everything
+    belongs to the principal's customer
+    """
+
+    customer: str
+    customers: list[str] = field(default_factory=list)
+    tenants: list[str] = field(default_factory=list)
+    regions: list[str] = field(default_factory=list)
+    policies: list[str] = field(default_factory=list)
+    roles: list[str] = field(default_factory=list)
+    users: list[str] = field(default_factory=list)
+    applications: list[str] = field(default_factory=list)
+    tenants_with_settings: list[str] = field(default_factory=list)
+    spare_regions: list[str] = field(default_factory=list)
+
+
+def _insert(model, items) -> None:
+    items = list(items)
+    if not items:
+        return
+    adapter = model.mongo_adapter()
+    ser = adapter._ser
+    adapter.get_collection(model).insert_many(
+        [ser.serialize(item) for item in items], ordered=False
+    )
+
+
+def _create_indexes() -> None:
+    from main import CreateIndexes
+
+    CreateIndexes()()
+
+
+def _regions() -> dict[str, list]:
+    from modular_sdk.models.region import RegionModel
+
+    from commons.regions import AWS_REGIONS, AZURE_REGIONS, GOOGLE_REGIONS
+
+    res = {}
+    for cloud, natives in zip(
+        CLOUDS, (AWS_REGIONS, AZURE_REGIONS, GOOGLE_REGIONS)
+    ):
+        res[cloud] = [
+            RegionModel(
+                maestro_name=f'{cloud}-{native}'.upper(),
+                native_name=native,
+                cloud=cloud,
+                region_id=str(uuid.uuid4()),
+                is_active=True,
+            )
+            for native in sorted(natives)
+        ]
+    return res
+
+
+def seed(sizes: Sizes) -> Dataset:
+    from modular_sdk.models.application import Application
+    from modular_sdk.models.customer import Customer
+    from modular_sdk.models.region import RegionModel
+    from modular_sdk.models.tenant import Tenant
+    from modular_sdk.models.tenant_settings import TenantSettings
+    from modular_sdk.services.region_service import RegionService
+
+    from commons.constants import Permission
+    from commons.time_helper import utc_iso
+    from models.policy import Policy
+    from models.role import Role
+    from models.user import User
+
+    _create_indexes()
+
+    customers = [f'BENCH_CUSTOMER_{i}' for i in range(sizes.customers)]
+    data = Dataset(customer=customers[0], customers=customers)
+
+    _insert(
+        Customer,
+        (
+            Customer(name=name, display_name=name.lower(), is_active=True)
+            for name in customers
+        ),
+    )
+
+    regions = _regions()
+    _insert(RegionModel, (r for items in regions.values() for r in items))
+    data.regions = [r.maestro_name for items in regions.values() for r in items]
+    # regions that are never activated in tenants
+    data.spare_regions = [r.maestro_name for r in regions['AWS'][-5:]]
+
+    tenants = []
+    for i in range(sizes.tenants):
+        cloud = CLOUDS[i % len(CLOUDS)]
+        available = regions[cloud][:-5] if cloud == 'AWS' else regions[cloud]
+        tenant_regions = [
+            RegionService.region_model_to_attr(r)
+            for r in (
+                available[(i + j) % len(available)]
+                for j in range(sizes.regions_per_tenant)
+            )
+        ]
+        name = f'BENCH-TENANT-{i}'
+        tenants.append(
+            Tenant(
+                name=name,
+                display_name=name.lower(),
+                display_name_to_lower=name.lower(),
+                is_active=True,
+                read_only=False,
+                customer_name=customers[i % len(customers)],
+                cloud=cloud,
+                activation_date=utc_iso(),
+                project=f'{i:012d}',
+                regions=tenant_regions,
+            )
+        )
+    _insert(Tenant, tenants)
+    data.tenants = [
+        t.name for t in tenants if t.customer_name == data.customer
+    ]
+
+    _insert(
+        TenantSettings,
+        (
+            TenantSettings(
+                tenant_name=t.name, key=f'KEY_{k}', value={'value': k}
+            )
+            for t in tenants[: sizes.tenants_with_settings]
+            for k in range(SETTINGS_PER_TENANT)
+        ),
+    )
+    data.tenants_with_settings = [
+        t.name
+        for t in tenants[: sizes.tenants_with_settings]
+        if t.customer_name == data.customer
+    ] or data.tenants
+
+    applications = [
+        Application(
+            application_id=str(uuid.uuid4()),
+            customer_id=customers[i % len(customers)],
+            type='AWS_ROLE',
+            description=f'bench application {i}',
+            is_deleted=False,
+            meta={'roleName': f'role-{i}', 'accountNumber': f'{i:012d}'},
+        )
+        for i in range(sizes.applications)
+    ]
+    _insert(Application, applications)
+    data.applications = [
+        a.application_id
+        for a in applications
+        if a.customer_id == data.customer
+    ]
+
+    permissions = sorted(Permission.iter_all())
+    policies = [
+        Policy(customer=data.customer, name=ADMIN_POLICY, permissions=permissions)
+    ]
+    policies.extend(
+        Policy(
+            customer=customers[i % len(customers)],
+            name=f'bench-policy-{i}',
+            permissions=permissions[i % len(permissions):][:10],
+        )
+        for i in range(sizes.policies)
+    )
+    _insert(Policy, policies)
+    data.policies = [
+        p.name
+        for p in policies
+        if p.customer == data.customer and p.name != ADMIN_POLICY
+    ]
+
+    roles = [Role(customer=data.customer, name=ADMIN_ROLE, policies=[ADMIN_POLICY])]
+    roles.extend(
+        Role(
+            customer=customers[i % len(customers)],
+            name=f'bench-role-{i}',
+            policies=[f'bench-policy-{i % max(sizes.policies, 1)}'],
+        )
+        for i in range(sizes.roles)
+    )
+    _insert(Role, roles)
+    data.roles = [
+        r.name
+        for r in roles
+        if r.customer == data.customer and r.name != ADMIN_ROLE
+    ]
+
+    # low cost factor keeps seeding fast, signin still verifies the hash
+    hashed = bcrypt.hashpw(PRINCIPAL_PASSWORD.encode(), bcrypt.gensalt(4))
+    users = [
+        User(
+            user_id=ADMIN_USERNAME,
+            password=hashed,
+            customer=data.customer,
+            role=ADMIN_ROLE,
+            created_at=utc_iso(),
+        ),
+        User(
+            user_id=SYSTEM_USERNAME,
+            password=hashed,
+            is_system=True,
+            created_at=utc_iso(),
+        ),
+    ]
+    users.extend(
+        User(
+            user_id=f'bench-user-{i}',
+            password=hashed,
+            customer=customers[i % len(customers)],
+            role=ADMIN_ROLE,
+            created_at=utc_iso(),
+        )
+        for i in range(sizes.users)
+    )
+    _insert(User, users)
+    data.users = [
+        u.user_id
+        for u in users
+        if u.customer == data.customer and u.user_id != ADMIN_USERNAME
+    ]
+    return data
+
+
+def init_private_key() -> None:
+    from main import InitVault
+
+    from commons.constants import PRIVATE_KEY_SECRET_NAME
+    from services import SP
+
+    SP.ssm.put_parameter(
+        PRIVATE_KEY_SECRET_NAME, InitVault.generate_private_key()
+    )
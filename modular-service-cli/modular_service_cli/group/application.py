@@ -29,23 +29,37 @@ def application():
 @click.option('--type', '-t',
               type=click.Choice(tuple(map(operator.attrgetter('value'), ApplicationType))),
               help='Application type to filter applications')
+@click.option('--field', '-f', type=str, multiple=True,
+              help='Field of applications to return. Can be specified multiple '
+                   'times. All the fields are returned by default')
 @cli_response(attributes_order=attributes_order)
 def describe(ctx: ContextObj, application_id, limit, next_token, type,
-             customer_id):
+             field, customer_id):
     """
     Describes Application.
     """
     if application_id:
         return ctx.api_client.get_application(application_id,
-                                              customer_id=customer_id)
+                                              customer_id=customer_id,
+                                              fields=','.join(field))
     return ctx.api_client.query_application(
         customer_id=customer_id,
         limit=limit,
         next_token=next_token,
-        type=type
+        type=type,
+        fields=','.join(field)
     )
 
 
+@application.command(cls=ViewCommand, name='stats')
+@cli_response()
+def stats(ctx: ContextObj, customer_id):
+    """
+    Shows the number of applications by type
+    """
+    return ctx.api_client.applications_stats(customer_id=customer_id)
+
+
 @application.command(cls=ViewCommand, name='create_aws_role')
 @click.option('--role_name', '-rn', type=str, required=True,
               help='AWS Role name')
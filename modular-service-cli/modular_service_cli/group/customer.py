@@ -23,19 +23,24 @@ def customer():
 @build_next_token_option()
 @click.option('--is_active', '-act', type=bool, 
               help='Whether to return active or deactivated customers')
+@click.option('--field', '-f', type=str, multiple=True,
+              help='Field of customers to return. Can be specified multiple '
+                   'times. All the fields are returned by default')
 @cli_response(attributes_order=attributes_order)
-def describe(ctx: ContextObj, name, limit, next_token, is_active, 
+def describe(ctx: ContextObj, name, limit, next_token, is_active, field,
              customer_id):
     """
     Describes Customer.
     """
     if name:
-        return ctx.api_client.get_customer(name, customer_id=customer_id)
+        return ctx.api_client.get_customer(name, customer_id=customer_id,
+                                           fields=','.join(field))
     return ctx.api_client.query_customer(
         limit=limit,
         next_token=next_token,
         is_active=is_active,
-        customer_id=customer_id
+        customer_id=customer_id,
+        fields=','.join(field)
     )
 
 
@@ -5,6 +5,7 @@ from modular_service_cli.group import cli_response, ViewCommand
 from modular_service_cli.group.application import application
 from modular_service_cli.group.customer import customer
 from modular_service_cli.group.policy import policy
+from modular_service_cli.group.rbac import rbac
 from modular_service_cli.group.region import region
 from modular_service_cli.group.role import role
 from modular_service_cli.group.tenant import tenant
@@ -115,3 +116,4 @@ modularservice.add_command(application)
 modularservice.add_command(tenant)
 modularservice.add_command(region)
 modularservice.add_command(users)
+modularservice.add_command(rbac)
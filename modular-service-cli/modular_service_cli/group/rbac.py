@@ -0,0 +1,71 @@
+import json
+from http import HTTPStatus
+
+import click
+
+from modular_service_cli.group import ContextObj, ViewCommand, cli_response
+from modular_service_cli.service.api_client import ApiResponse
+
+attributes_order = 'dry_run', 'policies', 'roles'
+
+
+@click.group(name='rbac')
+def rbac():
+    """Exports and imports all policies and roles at once"""
+
+
+@rbac.command(cls=ViewCommand, name='export')
+@click.option('--path', '-path', type=str, required=True,
+              help='Path to a .json file to write policies and roles to')
+@cli_response()
+def export(ctx: ContextObj, path, customer_id):
+    """
+    Exports all policies and roles of the customer to a file
+    """
+    resp = ctx.api_client.export_rbac(customer_id=customer_id)
+    if resp.code != HTTPStatus.OK:
+        return resp
+    document = resp.data.get('data') or {}
+    try:
+        with open(path, 'w') as fp:
+            json.dump(document, fp, indent=2)
+    except Exception:
+        return ApiResponse.build(f'Could not write file {path}')
+    return ApiResponse.build(
+        f'{len(document.get("policies") or ())} policies and '
+        f'{len(document.get("roles") or ())} roles were exported to {path}'
+    )
+
+
+@rbac.command(cls=ViewCommand, name='import')
+@click.option('--path', '-path', type=str, required=True,
+              help='Path to a .json file with policies and roles. Has the '
+                   'same format as the one created by export')
+@click.option('--dry_run', '-dr', is_flag=True, required=False,
+              help='Only show the changes that would be made')
+@click.option('--prune', '-pr', is_flag=True, required=False,
+              help='Delete policies and roles that are not in the file')
+@cli_response(attributes_order=attributes_order)
+def import_(ctx: ContextObj, path, dry_run, prune, customer_id):
+    """
+    Makes policies and roles of the customer equal to the ones in the file.
+    Only changed items are written
+    """
+    try:
+        with open(path, 'r') as fp:
+            document = json.load(fp)
+    except FileNotFoundError:
+        return ApiResponse.build(f'File {path} not found')
+    except json.JSONDecodeError:
+        return ApiResponse.build(f'File {path} contains invalid JSON')
+    except Exception:
+        return ApiResponse.build(f'Could not load file {path}')
+    if not isinstance(document, dict):
+        return ApiResponse.build(f'File {path} must contain a JSON object')
+    return ctx.api_client.import_rbac(
+        policies=document.get('policies'),
+        roles=document.get('roles'),
+        dry_run=dry_run,
+        prune=prune,
+        customer_id=customer_id
+    )
@@ -2,7 +2,13 @@ import operator
 
 import click
 
-from modular_service_cli.group import ContextObj, ViewCommand, cli_response
+from modular_service_cli.group import (
+    ContextObj,
+    ViewCommand,
+    build_limit_option,
+    build_next_token_option,
+    cli_response,
+)
 from modular_service_cli.service.constants import Cloud
 
 
@@ -17,14 +23,29 @@ def region():
 @region.command(cls=ViewCommand, name='describe')
 @click.option('--maestro_name', '-n', type=str,
               help='Region name.', required=False)
+@build_limit_option(type=click.IntRange(min=1, max=1000), default=None,
+                    show_default=False,
+                    help='Number of regions to show. All by default')
+@build_next_token_option()
+@click.option('--cloud', '-c',
+              type=click.Choice(tuple(map(operator.attrgetter('value'), Cloud))),
+              help='Cloud to filter regions by')
+@click.option('--is_active', '-act', type=bool,
+              help='Whether to query only active regions')
 @cli_response(attributes_order=attributes_order)
-def describe(ctx: ContextObj, maestro_name, customer_id):
+def describe(ctx: ContextObj, maestro_name, limit, next_token, cloud,
+             is_active, customer_id):
     """
     Describes Region.
     """
     if maestro_name:
         return ctx.api_client.get_region(maestro_name)
-    return ctx.api_client.query_regions()
+    return ctx.api_client.query_regions(
+        limit=limit,
+        next_token=next_token,
+        cloud=cloud,
+        is_active=is_active
+    )
 
 
 @region.command(cls=ViewCommand, name='activate')
@@ -32,23 +32,40 @@ def tenant():
               help='Cloud to filter tenants by')
 @click.option('--is_active', '-act', type=bool, 
               help='Whether to query only active tenants')
+@click.option('--field', '-f', type=str, multiple=True,
+              help='Field of tenants to return. Can be specified multiple '
+                   'times. All the fields are returned by default')
+@click.option('--search', '-s', type=str,
+              help='Prefix of tenant display name or account id')
 @cli_response(attributes_order=attributes_order)
 def describe(ctx: ContextObj, tenant_name, limit, next_token, cloud, 
-             is_active, customer_id):
+             is_active, field, search, customer_id):
     """
     Describes Tenant.
     """
     if tenant_name:
-        return ctx.api_client.get_tenant(tenant_name, customer_id=customer_id)
+        return ctx.api_client.get_tenant(tenant_name, customer_id=customer_id,
+                                         fields=','.join(field))
     return ctx.api_client.query_tenants(
         customer_id=customer_id,
         limit=limit,
         next_token=next_token,
         cloud=cloud,
-        is_active=is_active
+        is_active=is_active,
+        fields=','.join(field),
+        search=search
     )
 
 
+@tenant.command(cls=ViewCommand, name='stats')
+@cli_response()
+def stats(ctx: ContextObj, customer_id):
+    """
+    Shows the number of tenants by cloud and state
+    """
+    return ctx.api_client.tenants_stats(customer_id=customer_id)
+
+
 @tenant.command(cls=ViewCommand, name='create')
 @click.option('--name', '-n', type=str, required=True,
               help='Tenant name to activate.')
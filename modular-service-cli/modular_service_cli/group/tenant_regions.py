@@ -27,15 +27,17 @@ def describe(ctx: ContextObj, tenant_name, customer_id):
 @click.option('--tenant_name', '-tn', type=str, required=True,
               help='Tenant name to activate.')
 @click.option('--region_name', '-rn', type=str, required=True,
-              help='Region Maestro name to activate.')
+              multiple=True,
+              help='Region Maestro name to activate. Can be specified '
+                   'multiple times')
 @cli_response(attributes_order=attributes_order)
 def activate(ctx: ContextObj, tenant_name, region_name, customer_id):
     """
-    Activates region in tenant.
+    Activates regions in tenant.
     """
     return ctx.api_client.add_tenant_region(
         name=tenant_name,
-        region=region_name,
+        regions=list(region_name),
         customer_id=customer_id
     )
 
@@ -44,14 +46,16 @@ def activate(ctx: ContextObj, tenant_name, region_name, customer_id):
 @click.option('--tenant_name', '-tn', type=str, required=True,
               help='Tenant name to activate.')
 @click.option('--region_name', '-rn', type=str, required=True,
-              help='Region Maestro name to activate.')
+              multiple=True,
+              help='Region Maestro name to deactivate. Can be specified '
+                   'multiple times')
 @cli_response()
 def deactivate(ctx: ContextObj, tenant_name, region_name, customer_id):
     """
-    Deactivates region in tenant.
+    Deactivates regions in tenant.
     """
     return ctx.api_client.delete_tenant_region(
         name=tenant_name,
-        region=region_name,
+        regions=list(region_name),
         customer_id=customer_id
     )
@@ -24,8 +24,9 @@ def settings():
               help='Tenant name to describe.')
 @build_limit_option()
 @build_next_token_option()
-@click.option('--key', '-k', type=str, required=False,
-              help='Setting key to filter based on')
+@click.option('--key', '-k', type=str, required=False, multiple=True,
+              help='Setting key to filter based on. Can be specified '
+                   'multiple times')
 @cli_response(attributes_order=attributes_order)
 def describe(ctx: ContextObj, tenant_name, limit, next_token, key,
              customer_id):
@@ -36,34 +37,77 @@ def describe(ctx: ContextObj, tenant_name, limit, next_token, key,
         name=tenant_name,
         limit=limit,
         next_token=next_token,
+        key=','.join(key),
+        customer_id=customer_id
+    )
+
+
+@settings.command(cls=ViewCommand, name='describe_by_key')
+@click.option('--key', '-k', type=str, required=True,
+              help='Setting key to describe in all the tenants')
+@build_limit_option()
+@build_next_token_option()
+@cli_response(attributes_order=attributes_order)
+def describe_by_key(ctx: ContextObj, key, limit, next_token, customer_id):
+    """
+    Describes settings with the given key of all the customer's tenants
+    """
+    return ctx.api_client.query_tenant_settings_by_key(
         key=key,
+        limit=limit,
+        next_token=next_token,
         customer_id=customer_id
     )
 
 
+def _load_json(path: str) -> tuple[object, ApiResponse | None]:
+    try:
+        with open(path, 'r') as fp:
+            return json.load(fp), None
+    except FileNotFoundError:
+        return None, ApiResponse.build(f'File {path} not found')
+    except json.JSONDecodeError:
+        return None, ApiResponse.build(f'File {path} contains invalid JSON')
+    except Exception:
+        return None, ApiResponse.build(f'Could not load file {path}')
+
+
 @settings.command(cls=ViewCommand, name='put')
 @click.option('--tenant_name', '-tn', type=str, required=True,
               help='Tenant name to activate.')
-@click.option('--key', '-k', type=str, required=True,
+@click.option('--key', '-k', type=str, required=False,
               help='Setting key to filter based on')
-@click.option('--value', '-v', type=str, required=True,
+@click.option('--value', '-v', type=str, required=False,
               help='Path to a JSON file that contains setting value')
+@click.option('--settings', '-s', 'settings_path', type=str,
+              required=False,
+              help='Path to a JSON file that contains an object of setting '
+                   'keys to their values. Allows to put many settings at '
+                   'once')
 @cli_response(attributes_order=attributes_order)
-def put(ctx: ContextObj, tenant_name, key, value):
+def put(ctx: ContextObj, tenant_name, key, value, settings_path):
     """
     Set tenant setting
     """
-    try:
-        with open(value, 'r') as fp:
-            data = json.load(fp)
-    except FileNotFoundError:
-        return ApiResponse.build(f'File {value} not found')
-    except json.JSONDecodeError:
-        return ApiResponse.build(f'File {value} contains invalid JSON')
-    except Exception:
-        return ApiResponse.build(f'Could not load file {value}')
+    if not (key and value) and not settings_path:
+        raise click.UsageError(
+            'Either --key and --value or --settings must be provided'
+        )
+    data = {}
+    if key and value:
+        data['key'] = key
+        data['value'], error = _load_json(value)
+        if error:
+            return error
+    if settings_path:
+        data['settings'], error = _load_json(settings_path)
+        if error:
+            return error
+        if not isinstance(data['settings'], dict):
+            return ApiResponse.build(
+                f'File {settings_path} must contain a JSON object'
+            )
     return ctx.api_client.put_tenant_settings(
         name=tenant_name,
-        key=key,
-        value=data
+        **data
     )
@@ -28,6 +28,15 @@ def describe(ctx: ContextObj, username, limit, next_token, customer_id):
     )
 
 
+@users.command(cls=ViewCommand, name='stats')
+@cli_response()
+def stats(ctx: ContextObj, customer_id):
+    """
+    Shows the number of users by role
+    """
+    return ctx.api_client.users_stats(customer_id=customer_id)
+
+
 @users.command(cls=ViewCommand, name='create')
 @click.option('--username', required=True, type=str,
               help='Username to create user')
@@ -280,6 +280,20 @@ class ModularServiceApiClient:
             query=sifted(kwargs)
         )
 
+    def export_rbac(self, **kwargs):
+        return self.make_request(
+            path=Endpoint.RBAC_EXPORT,
+            method=HTTPMethod.GET,
+            query=sifted(kwargs)
+        )
+
+    def import_rbac(self, **kwargs):
+        return self.make_request(
+            path=Endpoint.RBAC_IMPORT,
+            method=HTTPMethod.POST,
+            data=sifted(kwargs)
+        )
+
     def query_policies(self, **kwargs):
         return self.make_request(
             path=Endpoint.POLICIES,
@@ -399,6 +413,13 @@ class ModularServiceApiClient:
             query=sifted(kwargs)
         )
 
+    def tenants_stats(self, **kwargs):
+        return self.make_request(
+            path=Endpoint.TENANTS_STATS,
+            method=HTTPMethod.GET,
+            query=sifted(kwargs)
+        )
+
     def create_tenant(self, **kwargs):
         return self.make_request(
             path=Endpoint.TENANTS,
@@ -467,6 +488,13 @@ class ModularServiceApiClient:
             path=Endpoint.TENANTS_NAME_SETTINGS,
             method=HTTPMethod.PUT,
             path_params={'name': name},
+            data=sifted(kwargs)
+        )
+
+    def query_tenant_settings_by_key(self, **kwargs):
+        return self.make_request(
+            path=Endpoint.TENANTS_SETTINGS,
+            method=HTTPMethod.GET,
             query=sifted(kwargs)
         )
 
@@ -485,6 +513,13 @@ class ModularServiceApiClient:
             query=sifted(kwargs)
         )
 
+    def applications_stats(self, **kwargs):
+        return self.make_request(
+            path=Endpoint.APPLICATIONS_STATS,
+            method=HTTPMethod.GET,
+            query=sifted(kwargs)
+        )
+
     def patch_application(self, id, **kwargs):
         return self.make_request(
             path=Endpoint.APPLICATIONS_ID,
@@ -566,6 +601,13 @@ class ModularServiceApiClient:
             query=sifted(kwargs)
         )
 
+    def users_stats(self, **kwargs):
+        return self.make_request(
+            path=Endpoint.USERS_STATS,
+            method=HTTPMethod.GET,
+            query=sifted(kwargs)
+        )
+
     def create_user(self, **kwargs):
         return self.make_request(
             path=Endpoint.USERS,
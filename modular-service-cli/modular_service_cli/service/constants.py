@@ -25,14 +25,20 @@ class Endpoint(str, Enum):
     POLICIES = '/policies'
     CUSTOMERS = '/customers'
     ROLES_NAME = '/roles/{name}'
+    RBAC_EXPORT = '/rbac/export'
+    RBAC_IMPORT = '/rbac/import'
+    USERS_STATS = '/users/stats'
     USERS_WHOAMI = '/users/whoami'
     APPLICATIONS = '/applications'
     TENANTS_NAME = '/tenants/{name}'
     REGIONS_NAME = '/regions/{name}'  # maestro name
+    TENANTS_STATS = '/tenants/stats'
     POLICIES_NAME = '/policies/{name}'
+    TENANTS_SETTINGS = '/tenants/settings'
     USERS_USERNAME = '/users/{username}'
     CUSTOMERS_NAME = '/customers/{name}'
     APPLICATIONS_ID = '/applications/{id}'
+    APPLICATIONS_STATS = '/applications/stats'
     DOC_SWAGGER_JSON = '/doc/swagger.json'
     USERS_RESET_PASSWORD = '/users/reset-password'
     TENANTS_NAME_REGIONS = '/tenants/{name}/regions'
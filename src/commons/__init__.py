@@ -109,7 +109,9 @@ class NextToken:
 
     def __init__(self, lak: dict | int | None = None):
         """
-        Wrapper over dynamodb last_evaluated_key and pymongo offset
+        Wrapper over dynamodb last_evaluated_key and the keys of the last
+        returned Mongo document (see models.pagination). Pymongo offsets
+        issued before are rejected there
         :param lak:
         """
         self._lak = lak
@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import Callable, Generic, Hashable, Iterable, TypeVar
+
+T = TypeVar('T')
+
+
+class IndexedCache(Generic[T]):
+    """
+    Keeps all items of a small and rarely changed collection in memory.
+    Items are loaded in bulk by the given function the first time they
+    are needed and then can be looked up by any of declared keys. They are
+    loaded again when ttl passes or after invalidate() is called.
+    Returned items are shared, do not change them
+    """
+
+    __slots__ = ('_loader', '_key_funcs', '_ttl', '_lock', '_items',
+                 '_indexes', '_loaded_at')
+
+    def __init__(self, loader: Callable[[], Iterable[T]],
+                 indexes: dict[str, Callable[[T], Hashable]],
+                 ttl: float):
+        """
+        :param loader: returns all the items
+        :param indexes: index name to a function that returns item's key
+        in that index. Keys must be unique within an index
+        :param ttl: seconds after which items are loaded again
+        """
+        self._loader = loader
+        self._key_funcs = indexes
+        self._ttl = ttl
+        self._lock = threading.Lock()
+
+        self._items: tuple[T, ...] = ()
+        self._indexes: dict[str, dict[Hashable, T]] = {}
+        self._loaded_at: float | None = None
+
+    def _expired(self) -> bool:
+        return (self._loaded_at is None or
+                time.monotonic() - self._loaded_at >= self._ttl)
+
+    def _load(self) -> None:
+        items = tuple(self._loader())
+        self._indexes = {
+            name: {func(item): item for item in items}
+            for name, func in self._key_funcs.items()
+        }
+        self._items = items
+        self._loaded_at = time.monotonic()
+
+    def _ensure(self) -> None:
+        if not self._expired():
+            return
+        with self._lock:
+            if self._expired():  # could be loaded by another thread
+                self._load()
+
+    def all(self) -> tuple[T, ...]:
+        self._ensure()
+        return self._items
+
+    def get(self, index: str, key: Hashable) -> T | None:
+        self._ensure()
+        return self._indexes[index].get(key)
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
@@ -29,15 +29,22 @@ class Endpoint(str, Enum):
     POLICIES = '/policies'
     CUSTOMERS = '/customers'
     HEALTH_LIVE = '/health/live'
+    RBAC_EXPORT = '/rbac/export'
+    RBAC_IMPORT = '/rbac/import'
     ROLES_NAME = '/roles/{name}'
+    USERS_STATS = '/users/stats'
     USERS_WHOAMI = '/users/whoami'
     APPLICATIONS = '/applications'
     TENANTS_NAME = '/tenants/{name}'
     REGIONS_NAME = '/regions/{name}'  # maestro name
+    TENANTS_STATS = '/tenants/stats'
+    TENANTS_BATCH = '/tenants/batch'
     POLICIES_NAME = '/policies/{name}'
+    TENANTS_SETTINGS = '/tenants/settings'
     USERS_USERNAME = '/users/{username}'
     CUSTOMERS_NAME = '/customers/{name}'
     APPLICATIONS_ID = '/applications/{id}'
+    APPLICATIONS_STATS = '/applications/stats'
     DOC_SWAGGER_JSON = '/doc/swagger.json'
     USERS_RESET_PASSWORD = '/users/reset-password'
     TENANTS_NAME_REGIONS = '/tenants/{name}/regions'
@@ -122,6 +129,7 @@ class Env(str, Enum):
 
     # external envs
     AWS_REGION = 'AWS_REGION', 'us-east-1'
+    AWS_LAMBDA_INITIALIZATION_TYPE = 'AWS_LAMBDA_INITIALIZATION_TYPE'
     SERVICE_MODE = 'MODULAR_SERVICE_MODE', 'saas'
     LOG_LEVEL = 'MODULAR_SERVICE_LOG_LEVEL', 'INFO'
     COGNITO_USER_POOL_NAME = 'MODULAR_SERVICE_COGNITO_USER_POOL_NAME'
@@ -137,6 +145,31 @@ class Env(str, Enum):
 
     SYSTEM_USER_PASSWORD = 'MODULAR_SERVICE_SYSTEM_USER_PASSWORD'
 
+    # seconds to keep all regions in memory of each worker
+    REGIONS_CACHE_TTL = 'MODULAR_SERVICE_REGIONS_CACHE_TTL', '300'
+    # seconds to remember whether a customer exists and is active
+    CUSTOMERS_CACHE_TTL = 'MODULAR_SERVICE_CUSTOMERS_CACHE_TTL', '30'
+    # seconds to keep counts of tenants, applications and users
+    STATS_CACHE_TTL = 'MODULAR_SERVICE_STATS_CACHE_TTL', '30'
+    # seconds to keep responses to requests with Idempotency-Key header
+    IDEMPOTENCY_KEYS_TTL = 'MODULAR_SERVICE_IDEMPOTENCY_KEYS_TTL', '86400'
+
+    # where to keep rate limits: memory (of each worker), shared (by
+    # gunicorn workers) or mongo (by all servers). Not limited if not set
+    RATE_LIMIT_BACKEND = 'MODULAR_SERVICE_RATE_LIMIT_BACKEND'
+    # requests per second of one user and of all users of a customer
+    RATE_LIMIT_USER = 'MODULAR_SERVICE_RATE_LIMIT_USER', '10'
+    RATE_LIMIT_CUSTOMER = 'MODULAR_SERVICE_RATE_LIMIT_CUSTOMER', '50'
+
+    # bucket where Lambda puts NDJSON exports. On-prem they are streamed
+    EXPORTS_BUCKET_NAME = 'MODULAR_SERVICE_EXPORTS_BUCKET_NAME'
+    # seconds a presigned url of an export is valid
+    EXPORTS_URL_EXPIRATION = 'MODULAR_SERVICE_EXPORTS_URL_EXPIRATION', '3600'
+
+    # build all controllers when the handler is initialized instead of
+    # doing that on the first request to each of them
+    WARMUP = 'MODULAR_SERVICE_WARMUP'
+
     def __str__(self):
         return self.value
 
@@ -147,6 +180,12 @@ class Env(str, Enum):
     def is_docker(cls) -> bool:
         return cls.SERVICE_MODE.get() == 'docker'
 
+    @classmethod
+    def need_warmup(cls) -> bool:
+        if cls.AWS_LAMBDA_INITIALIZATION_TYPE.get() == 'provisioned-concurrency':
+            return True
+        return str(cls.WARMUP.get()).lower() in ('true', '1', 'yes')
+
 
 class Permission(str, Enum):
     """
@@ -192,6 +231,9 @@ class Permission(str, Enum):
     POLICY_UPDATE = 'policy:update'
     POLICY_DELETE = 'policy:delete'
 
+    RBAC_EXPORT = 'rbac:export'
+    RBAC_IMPORT = 'rbac:import'
+
     TENANT_SETTING_SET = 'tenant_setting:set'
     TENANT_SETTING_DESCRIBE = 'tenant_setting:describe'
 
@@ -232,6 +274,8 @@ class Permission(str, Enum):
 
 LAMBDA_URL_HEADER_CONTENT_TYPE_UPPER = 'Content-Type'
 JSON_CONTENT_TYPE = 'application/json'
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
 
 TYPE_ATTR = 'type'
 DESCRIPTION_ATTR = 'description'
@@ -2,11 +2,12 @@ import base64
 import json
 import os
 from http import HTTPStatus
-from typing import Iterable, TypedDict, TypeVar, Final, Any
+from typing import Iterable, Iterator, TypedDict, TypeVar, Final, Any
 
 from commons.__version__ import __version__
 from commons.constants import (JSON_CONTENT_TYPE,
-                               LAMBDA_URL_HEADER_CONTENT_TYPE_UPPER, Env)
+                               LAMBDA_URL_HEADER_CONTENT_TYPE_UPPER,
+                               NDJSON_CONTENT_TYPE, Env)
 
 Content = dict | list | str | Iterable | None
 
@@ -72,7 +73,7 @@ class LambdaResponse:
 
     def _common_headers(self) -> dict[str, str]:
         headers = {
-            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,Idempotency-Key',
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Methods': '*',
             'Accept-Version': __version__,  # TODO API think about header name
@@ -177,6 +178,39 @@ class JsonLambdaResponse(LambdaResponse):
         }
 
 
+class NdjsonResponse(LambdaResponse):
+    """
+    Newline-delimited JSON, one line per item. Items are serialized
+    lazily while the body is iterated so that a DB cursor can be streamed
+    without keeping all the items in memory. Such a body can be sent only
+    by the on-prem server, Lambda output must be a string
+    """
+
+    def __init__(self, items: Iterable, code: HTTPStatus = HTTPStatus.OK):
+        super().__init__(
+            code=code,
+            content=items,
+            headers={LAMBDA_URL_HEADER_CONTENT_TYPE_UPPER: NDJSON_CONTENT_TYPE}
+        )
+
+    def iter_lines(self) -> Iterator[bytes]:
+        for item in self._content:
+            yield json.dumps(
+                item,
+                sort_keys=True,
+                separators=(',', ':'),
+                default=JsonLambdaResponse._default
+            ).encode() + b'\n'
+
+    def build(self) -> LambdaOutput:
+        return {
+            'headers': self._common_headers(),
+            'body': self.iter_lines(),  # type: ignore
+            'isBase64Encoded': False,
+            'statusCode': self._code.value
+        }
+
+
 class ResponseFactory:
     """
     Builds some common JSON responses
@@ -1,8 +1,12 @@
 from http import HTTPStatus
+import importlib
 import inspect
-from typing import Generator
+import json
+import math
+import threading
+from typing import TYPE_CHECKING, Callable, Generator
 
-from pydantic import BaseModel
+from modular_sdk.commons.exception import ModularException
 from routes import Mapper
 from routes.route import Route
 
@@ -13,35 +17,33 @@ from commons.abstract_lambda import (
     EventProcessorLambdaHandler,
     ProcessedEvent,
 )
-from commons.constants import Endpoint, HTTPMethod, Permission, REQUEST_METHOD_WSGI_ENV
-from commons.lambda_response import ResponseFactory
-from commons.log_helper import get_logger
-from lambdas.modular_api_handler.processors.abstract_processor import (
-    AbstractCommandProcessor,
-)
-from lambdas.modular_api_handler.processors.application_processor import (
-    ApplicationProcessor,
-)
-from lambdas.modular_api_handler.processors.customer_processor import CustomerProcessor
-from lambdas.modular_api_handler.processors.parent_processor import ParentProcessor
-from lambdas.modular_api_handler.processors.policies_processor import PolicyProcessor
-from lambdas.modular_api_handler.processors.region_processor import RegionProcessor
-from lambdas.modular_api_handler.processors.role_processor import RoleProcessor
-from lambdas.modular_api_handler.processors.health_processor import HealthCheckProcessor
-from lambdas.modular_api_handler.processors.tenant_in_region_processor import (
-    TenantRegionProcessor,
+from commons.constants import (
+    REQUEST_METHOD_WSGI_ENV,
+    Endpoint,
+    Env,
+    HTTPMethod,
+    Permission,
 )
-from lambdas.modular_api_handler.processors.users_processor import UsersProcessor
-from lambdas.modular_api_handler.processors.tenant_processor import TenantProcessor
-from lambdas.modular_api_handler.processors.tenant_settings_processor import (
-    TenantSettingsProcessor,
+from commons.lambda_response import (
+    JsonLambdaResponse,
+    LambdaForceExit,
+    LambdaOutput,
+    ResponseFactory,
 )
-from lambdas.modular_api_handler.processors.swagger_processor import SwaggerProcessor
-from services.customer_mutator_service import CustomerMutatorService
+from commons.log_helper import get_logger
+from lambdas.modular_api_handler.registry import CONTROLLERS, ROUTES
 from services import SP
-from services.openapi_spec_generator import EndpointInfo
-from services.rbac_service import RBACService
-from validators.response import MessageModel, common_responses
+from services.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from lambdas.modular_api_handler.processors.abstract_processor import (
+        AbstractCommandProcessor,
+    )
+    from services.customer_mutator_service import CustomerMutatorService
+    from services.idempotency_service import IdempotencyService
+    from services.openapi_spec_generator import EndpointInfo
+    from services.rate_limiter import RateLimiter, RouteLimit
+    from services.rbac_service import RBACService
 
 _LOG = get_logger('modular_api_handler')
 
@@ -77,7 +79,7 @@ class RestrictCustomerEventProcessor(AbstractEventProcessor):
         (Endpoint.USERS_USERNAME, HTTPMethod.GET),
     }
 
-    def __init__(self, customer_service: CustomerMutatorService):
+    def __init__(self, customer_service: 'CustomerMutatorService'):
         self._cs = customer_service
 
     def __call__(self, event: ProcessedEvent) -> ProcessedEvent:
@@ -96,7 +98,7 @@ class RestrictCustomerEventProcessor(AbstractEventProcessor):
                     'Please, provide customer_id param to make a request on '
                     'his behalf'
                 ).exc()
-            if not self._cs.get(cid):
+            if not self._cs.does_exist(cid):
                 raise ResponseFactory(HTTPStatus.BAD_REQUEST).message(
                     f'Customer {cid} does not exist. You cannot make a request'
                     f' on his behalf'
@@ -110,13 +112,48 @@ class RestrictCustomerEventProcessor(AbstractEventProcessor):
         return event
 
 
+class RateLimitEventProcessor(AbstractEventProcessor):
+    """
+    Rejects requests of users and customers that exceed their rate limits
+    or the limits of the route with 429. Goes before other processors so
+    that rejected requests do not reach the DB. Endpoints without auth are
+    not limited
+    """
+    __slots__ = ('_limiter', '_costs', '_routes')
+
+    def __init__(self, limiter: 'RateLimiter',
+                 costs: dict[tuple[Endpoint, HTTPMethod], int],
+                 routes: dict[tuple[Endpoint, HTTPMethod], 'RouteLimit']):
+        self._limiter = limiter
+        self._costs = costs
+        self._routes = routes
+
+    def __call__(self, event: ProcessedEvent) -> ProcessedEvent:
+        if not event['cognito_user_id']:
+            return event
+        wait = self._limiter.acquire(
+            user=event['cognito_user_id'],
+            customer=event['cognito_customer'],
+            cost=self._costs.get((event['resource'], event['method']), 1),
+            route=self._routes.get((event['resource'], event['method']))
+        )
+        if wait:
+            _LOG.info(f'Rate limit exceeded, retry after {wait:.2f}s')
+            raise JsonLambdaResponse(
+                code=HTTPStatus.TOO_MANY_REQUESTS,
+                content={'message': 'Too many requests, slow down'},
+                headers={'Retry-After': str(math.ceil(wait))}
+            ).exc()
+        return event
+
+
 class CheckPermissionEventProcessor(AbstractEventProcessor):
     """
     Processor that restricts rbac permission
     """
     __slots__ = ('_rs', '_mapping')
 
-    def __init__(self, rbac_service: RBACService,
+    def __init__(self, rbac_service: 'RBACService',
                  mapping: dict[tuple[Endpoint, HTTPMethod], Permission | None]):
         self._rs = rbac_service
         self._mapping = mapping
@@ -146,70 +183,123 @@ class CheckPermissionEventProcessor(AbstractEventProcessor):
 
 
 class ModularApiHandler(EventProcessorLambdaHandler):
-    controller_classes = (
-        PolicyProcessor,
-        RoleProcessor,
-        CustomerProcessor,
-        TenantProcessor,
-        TenantRegionProcessor,
-        ApplicationProcessor,
-        ParentProcessor,
-        RegionProcessor,
-        TenantSettingsProcessor,
-        HealthCheckProcessor,
-        SwaggerProcessor,
-        UsersProcessor
-    )
-    __slots__ = ('_mapper', '_controllers', 'processors')
+    """
+    Routes and permissions are taken from the static registry so that
+    controllers are imported and built lazily, on the first request to
+    one of their routes. Set MODULAR_SERVICE_WARMUP or use provisioned
+    concurrency to build all of them during initialization.
+    POST requests of authenticated users with Idempotency-Key header are
+    executed once per key, retries get the stored response.
+    Identical GET requests of a user that come concurrently (a worker
+    with threads) share one execution and its response
+    """
+    __slots__ = ('_mapper', '_controllers', '_lock', '_coalesced',
+                 '_flight', 'processors')
 
     def __init__(self):
         self._mapper: Mapper | None = None
-        self._controllers: dict[str, AbstractCommandProcessor] = {}
-
-        self.processors = (
-            ApiGatewayEventProcessor(),
-            RestrictCustomerEventProcessor(
-                customer_service=SP.customer_service
-            ),
-            CheckPermissionEventProcessor(
-                rbac_service=SP.rbac_service,
-                mapping=self._build_permissions_mapping()
+        self._controllers: dict[str, 'AbstractCommandProcessor'] = {}
+        # threads of a worker must not build the same controller twice
+        self._lock = threading.Lock()
+        self._coalesced = self._build_coalesced_routes()
+        self._flight: SingleFlight[LambdaOutput] = SingleFlight()
+
+        processors: list[AbstractEventProcessor] = [
+            ApiGatewayEventProcessor()
+        ]
+        if (limiter := SP.rate_limiter) is not None:
+            processors.append(RateLimitEventProcessor(
+                limiter=limiter,
+                costs=self._build_costs_mapping(),
+                routes=self._build_route_limits()
+            ))
+        processors.append(RestrictCustomerEventProcessor(
+            customer_service=SP.customer_service
+        ))
+        processors.append(CheckPermissionEventProcessor(
+            rbac_service=SP.rbac_service,
+            mapping=self._build_permissions_mapping()
+        ))
+        self.processors = tuple(processors)
+        if Env.need_warmup():
+            self.warmup()
+
+    @staticmethod
+    def _build_permissions_mapping(
+    ) -> dict[tuple[Endpoint, HTTPMethod], Permission | None]:
+        return {(r.path, r.method): r.permission for r in ROUTES}
+
+    @staticmethod
+    def _build_costs_mapping() -> dict[tuple[Endpoint, HTTPMethod], int]:
+        return {(r.path, r.method): r.cost for r in ROUTES}
+
+    @staticmethod
+    def _build_route_limits(
+    ) -> dict[tuple[Endpoint, HTTPMethod], 'RouteLimit']:
+        from services.rate_limiter import RouteLimit
+        return {
+            (r.path, r.method): RouteLimit.per_minute(
+                route=f'{r.method.value} {r.path.value}',
+                user=r.user_rpm,
+                customer=r.customer_rpm
             )
-        )
+            for r in ROUTES if r.user_rpm or r.customer_rpm
+        }
+
+    @staticmethod
+    def _build_coalesced_routes() -> set[tuple[Endpoint, HTTPMethod]]:
+        return {(r.path, r.method) for r in ROUTES
+                if r.method == HTTPMethod.GET and r.require_auth}
+
+    @staticmethod
+    def get_controller_class(name: str
+                             ) -> type['AbstractCommandProcessor']:
+        return getattr(importlib.import_module(CONTROLLERS[name]), name)
 
-    def _build_permissions_mapping(self) -> dict[tuple[Endpoint, HTTPMethod], Permission | None]:
-        res = {}
-        for route in self.mapper.matchlist:
-            route: Route
-            kargs = route._kargs
-            for method in route.conditions['method']:
-                if isinstance(method, str):
-                    method = HTTPMethod(method.upper())
-                path = Endpoint(route.routepath)  # should always match
-                res[(path, method)] = kargs.get('_permission')
-        return res
-
-    def get_controller(self, controller_class: type[AbstractCommandProcessor]
-                       ) -> AbstractCommandProcessor:
-        name = controller_class.controller_name()
-        if name not in self._controllers:
-            self._controllers[name] = controller_class.build()
-        return self._controllers[name]
-
-    def _build_mapper(self) -> Mapper:
+    def get_controller(self, name: str) -> 'AbstractCommandProcessor':
+        controller = self._controllers.get(name)
+        if controller is not None:
+            return controller
+        with self._lock:
+            if name not in self._controllers:
+                _LOG.debug(f'Loading controller {name}')
+                self._controllers[name] = \
+                    self.get_controller_class(name).build()
+            return self._controllers[name]
+
+    def warmup(self) -> None:
+        """
+        Imports and builds all the controllers
+        """
+        _LOG.info('Warming up all the controllers')
+        for name in CONTROLLERS:
+            self.get_controller(name)
+
+    @staticmethod
+    def _build_mapper() -> Mapper:
         mapper = Mapper()
-        for controller_class in self.controller_classes:
-            controller = self.get_controller(controller_class)
-            mapper.extend(controller.routes())
+        for entry in ROUTES:
+            mapper.extend((Route(
+                name=None,
+                routepath=entry.path.value,
+                controller=entry.controller,
+                action=entry.action,
+                conditions={'method': (entry.method,)},
+                _require_auth=entry.require_auth,
+                _permission=entry.permission
+            ),))
         return mapper
 
     @property
     def mapper(self) -> Mapper:
-        if not self._mapper:
-            _LOG.debug('Building mapper')
-            self._mapper = self._build_mapper()
-            _LOG.debug('Mapper was built')
-        return self._mapper
+        if self._mapper:
+            return self._mapper
+        with self._lock:
+            if not self._mapper:
+                _LOG.debug('Building mapper')
+                self._mapper = self._build_mapper()
+                _LOG.debug('Mapper was built')
+            return self._mapper
 
     def handle_request(self, event: ProcessedEvent, context: RequestContext):
         path, method = event['path'], event['method']
@@ -226,9 +316,9 @@ class ModularApiHandler(EventProcessorLambdaHandler):
                   '_permission')
         for k in to_pop:
             match_result.pop(k, None)
-        # it's expected that the mapper is configured properly because
+        # it's expected that the registry is configured properly because
         # if it is, there could be no KeyError
-        handler = self._controllers[controller].get_action_handler(action)
+        handler = self.get_controller(controller).get_action_handler(action)
         match method:
             case HTTPMethod.GET:
                 body = event['query']
@@ -240,48 +330,108 @@ class ModularApiHandler(EventProcessorLambdaHandler):
             # if you need to access raw event data inside event
             _LOG.debug('Expanding handler payload with raw event')
             params['_pe'] = event
+        if method == HTTPMethod.POST and event['cognito_user_id']:
+            idempotency: 'IdempotencyService' = SP.idempotency_service
+            if key := idempotency.get_key(event):
+                _LOG.debug('Executing request with idempotency key')
+                return idempotency.execute(
+                    event=event,
+                    key=key,
+                    func=lambda: handler(**params)
+                )
+        if (event['resource'], method) in self._coalesced \
+                and event['cognito_user_id']:
+            return self._coalesce(event, lambda: handler(**params))
         return handler(**params)
 
-    def iter_endpoint(self) -> Generator[EndpointInfo, None, None]:
+    def _coalesce(self, event: ProcessedEvent,
+                  func: Callable[[], LambdaOutput]) -> LambdaOutput:
+        """
+        Requests are identical if they are made by the same user to the
+        same path with the same query and Accept header. Errors are shared
+        as well. Only responses with a string body are shared, a streamed
+        body is an iterator that can be read only once, so the waiting
+        requests are executed on their own then
+        """
+        def execute() -> LambdaOutput:
+            try:
+                return func()
+            except LambdaForceExit as e:
+                return e.build()
+            except ModularException as e:
+                return ResponseFactory(int(e.code)).message(e.content).build()
+
+        accept = next((
+            str(value) for name, value in (event['headers'] or {}).items()
+            if name.lower() == 'accept'
+        ), None)
+        key = (
+            event['cognito_user_id'],
+            event['cognito_customer'],
+            event['path'],
+            json.dumps(event['query'], sort_keys=True, default=str),
+            accept
+        )
+        output, shared = self._flight.do(
+            key, execute, share=lambda o: isinstance(o['body'], str)
+        )
+        if shared:
+            _LOG.debug('Returning the response of a concurrent request')
+            output = {**output, 'headers': dict(output['headers'])}
+        return output
+
+    def iter_endpoint(self) -> Generator['EndpointInfo', None, None]:
         """
         For swagger. The collection of EndpointInfo(s) can be hardcoded or
         generated some other way. I think this is quite convenient. Just add
-        a new endpoint and it will automatically appear in swagger
+        a new endpoint and it will automatically appear in swagger. Summaries
+        and responses are declared by controllers so all of them are loaded
         :return:
         """
-        for route in self.mapper.matchlist:
-            route: Route
-            kargs = route._kargs
-            controller, action = kargs['controller'], kargs['action']
-            handler = self._controllers[controller].get_action_handler(action)
-            annotations = handler.__annotations__
-            req = annotations.get('event')
-            if not isinstance(req, type) or not issubclass(req, BaseModel):
-                req = None
-
-            # expanding responses with common ones
-            responses = kargs.get('_responses') or []
-            existing = {r[0] for r in responses}
-            for code, model, description in common_responses:
-                if code in existing:
-                    continue
-                responses.append((code, model, description))
-            if '{' in route.routepath and HTTPStatus.NOT_FOUND not in existing:
-                responses.append(
-                    (HTTPStatus.NOT_FOUND, MessageModel, 'Entity is not found')
-                )
-            responses.sort(key=lambda x: x[0])
-
-            for method in route.conditions['method']:
-                yield EndpointInfo(
-                    path=route.routepath,
-                    method=method if isinstance(method, HTTPMethod) else HTTPMethod(method.upper()),
-                    summary=kargs.get('_summary'),
-                    description=kargs.get('_description'),
-                    request_model=req,
-                    responses=responses,
-                    auth=kargs['_require_auth']
+        from pydantic import BaseModel
+
+        from services.openapi_spec_generator import EndpointInfo
+        from validators.response import MessageModel, common_responses
+
+        self.warmup()
+        for name in CONTROLLERS:
+            for route in self.get_controller_class(name).routes():
+                route: Route
+                kargs = route._kargs
+                controller, action = kargs['controller'], kargs['action']
+                handler = self.get_controller(controller).get_action_handler(
+                    action
                 )
+                annotations = handler.__annotations__
+                req = annotations.get('event')
+                if not isinstance(req, type) or not issubclass(req, BaseModel):
+                    req = None
+
+                # expanding responses with common ones
+                responses = kargs.get('_responses') or []
+                existing = {r[0] for r in responses}
+                for code, model, description in common_responses:
+                    if code in existing:
+                        continue
+                    responses.append((code, model, description))
+                if ('{' in route.routepath
+                        and HTTPStatus.NOT_FOUND not in existing):
+                    responses.append(
+                        (HTTPStatus.NOT_FOUND, MessageModel,
+                         'Entity is not found')
+                    )
+                responses.sort(key=lambda x: x[0])
+
+                for method in route.conditions['method']:
+                    yield EndpointInfo(
+                        path=route.routepath,
+                        method=method if isinstance(method, HTTPMethod) else HTTPMethod(method.upper()),
+                        summary=kargs.get('_summary'),
+                        description=kargs.get('_description'),
+                        request_model=req,
+                        responses=responses,
+                        auth=kargs['_require_auth']
+                    )
 
 
 HANDLER = ModularApiHandler()
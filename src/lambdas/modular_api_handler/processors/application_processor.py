@@ -2,7 +2,6 @@ from http import HTTPStatus
 
 from modular_sdk.commons.constants import ApplicationType
 from modular_sdk.models.application import Application
-from modular_sdk.services.application_service import ApplicationService
 from modular_sdk.services.impl.maestro_credentials_service import (
     AWSCredentialsApplicationMeta,
     AWSCredentialsApplicationSecret,
@@ -25,8 +24,15 @@ from lambdas.modular_api_handler.processors.abstract_processor import (
     AbstractCommandProcessor,
 )
 from services import SERVICE_PROVIDER
+from services.application_mutator_service import ApplicationMutatorService
 from services.customer_mutator_service import CustomerMutatorService
+from services.export_service import (
+    EXPORT_DESCRIPTION,
+    EXPORT_RESPONSE,
+    ExportService,
+)
 from services.parent_mutator_service import ParentMutatorService
+from services.stats_service import StatsService
 from validators.request import (
     ApplicationPatch,
     ApplicationPostAWSCredentials,
@@ -35,23 +41,33 @@ from validators.request import (
     ApplicationPostAZURECredentials,
     ApplicationPostGCPServiceAccount,
     ApplicationQuery,
+    BaseFieldsModel,
     BaseModel,
 )
-from validators.response import ApplicationResponse, ApplicationsResponse, MessageModel
+from validators.response import (
+    ApplicationResponse,
+    ApplicationsResponse,
+    ApplicationsStatsResponse,
+    MessageModel,
+)
 from validators.utils import validate_kwargs
 
 _LOG = get_logger(__name__)
 
 
 class ApplicationProcessor(AbstractCommandProcessor):
-    def __init__(self, application_service: ApplicationService,
+    def __init__(self, application_service: ApplicationMutatorService,
                  customer_service: CustomerMutatorService,
                  parent_service: ParentMutatorService,
-                 ssm_client: AbstractSSMClient):
+                 ssm_client: AbstractSSMClient,
+                 export_service: ExportService,
+                 stats_service: StatsService):
         self.application_service = application_service
         self.customer_service = customer_service
         self.parent_service = parent_service
         self.ssm = ssm_client
+        self.export_service = export_service
+        self.stats_service = stats_service
 
     @classmethod
     def routes(cls) -> tuple[Route, ...]:
@@ -101,7 +117,18 @@ class ApplicationProcessor(AbstractCommandProcessor):
                 Endpoint.APPLICATIONS,
                 HTTPMethod.GET,
                 'query',
-                response=(HTTPStatus.OK, ApplicationsResponse, None),
+                response=[(HTTPStatus.OK, ApplicationsResponse, None),
+                          EXPORT_RESPONSE],
+                description=EXPORT_DESCRIPTION,
+                permission=Permission.APPLICATION_DESCRIBE
+            ),
+            cls.route(
+                Endpoint.APPLICATIONS_STATS,
+                HTTPMethod.GET,
+                'stats',
+                response=(HTTPStatus.OK, ApplicationsStatsResponse, None),
+                description='Returns the number of applications by type. '
+                            'Counts can be a few seconds behind',
                 permission=Permission.APPLICATION_DESCRIBE
             ),
             cls.route(
@@ -133,10 +160,12 @@ class ApplicationProcessor(AbstractCommandProcessor):
     @classmethod
     def build(cls) -> 'ApplicationProcessor':
         return cls(
-            application_service=SERVICE_PROVIDER.modular.application_service(),
+            application_service=SERVICE_PROVIDER.application_service,
             customer_service=SERVICE_PROVIDER.customer_service,
             parent_service=SERVICE_PROVIDER.parent_service,
-            ssm_client=SERVICE_PROVIDER.ssm
+            ssm_client=SERVICE_PROVIDER.ssm,
+            export_service=SERVICE_PROVIDER.export_service,
+            stats_service=SERVICE_PROVIDER.stats_service
         )
 
     @validate_kwargs
@@ -157,6 +186,7 @@ class ApplicationProcessor(AbstractCommandProcessor):
         )
         _LOG.debug('Saving application')
         self.application_service.save(app)
+        self.stats_service.application_created(app)
 
         return build_response(
             content=self.application_service.get_dto(app),
@@ -191,6 +221,7 @@ class ApplicationProcessor(AbstractCommandProcessor):
         )
         _LOG.debug('Saving application')
         self.application_service.save(app)
+        self.stats_service.application_created(app)
         return build_response(
             content=self.application_service.get_dto(app),
             code=HTTPStatus.CREATED
@@ -226,6 +257,7 @@ class ApplicationProcessor(AbstractCommandProcessor):
         )
         _LOG.debug('Saving application')
         self.application_service.save(app)
+        self.stats_service.application_created(app)
         return build_response(
             content=self.application_service.get_dto(app),
             code=HTTPStatus.CREATED
@@ -260,6 +292,7 @@ class ApplicationProcessor(AbstractCommandProcessor):
         )
         _LOG.debug('Saving application')
         self.application_service.save(app)
+        self.stats_service.application_created(app)
         return build_response(
             content=self.application_service.get_dto(app),
             code=HTTPStatus.CREATED
@@ -289,24 +322,33 @@ class ApplicationProcessor(AbstractCommandProcessor):
         )
         _LOG.debug('Saving application')
         self.application_service.save(app)
+        self.stats_service.application_created(app)
         return build_response(
             content=self.application_service.get_dto(app),
             code=HTTPStatus.CREATED
         )
 
     @validate_kwargs
-    def query(self, event: ApplicationQuery):
+    def query(self, event: ApplicationQuery, _pe: ProcessedEvent):
+        export = self.export_service.is_requested(_pe)
+        projection = self.application_service.projection(event.fields_to_get)
         cursor = self.application_service.list(
             customer=event.customer_id,
             _type=event.type.value if event.type else None,
             deleted=False,
-            limit=event.limit,
-            last_evaluated_key=NextToken.from_input(event.next_token).value,
+            limit=None if export else event.limit,
+            last_evaluated_key=None if export else
+            NextToken.from_input(event.next_token).value,
+            attributes_to_get=projection.attributes_to_get
         )
-        items = list(cursor)
+        dtos = (projection.trim(self.application_service.get_dto(app))
+                for app in cursor)
+        if export:
+            return self.export_service.respond(dtos, 'applications')
+        items = list(dtos)
 
         return ResponseFactory().items(
-            it=map(self.application_service.get_dto, items),
+            it=items,
             next_token=NextToken(cursor.last_evaluated_key)
         ).build()
 
@@ -318,11 +360,20 @@ class ApplicationProcessor(AbstractCommandProcessor):
         return item
 
     @validate_kwargs
-    def get(self, event: BaseModel, id: str):
+    def stats(self, event: BaseModel):
+        return build_response(
+            content=self.stats_service.applications(event.customer_id)
+        )
+
+    @validate_kwargs
+    def get(self, event: BaseFieldsModel, id: str):
+        projection = self.application_service.projection(event.fields_to_get)
         item = self._get_application(id, event.customer_id)
         if not item:
             raise ResponseFactory(HTTPStatus.NOT_FOUND).default().exc()
-        return build_response(content=self.application_service.get_dto(item))
+        return build_response(
+            content=projection.trim(self.application_service.get_dto(item))
+        )
 
     @validate_kwargs
     def patch(self, event: ApplicationPatch, _pe: ProcessedEvent, id: str):
@@ -349,4 +400,5 @@ class ApplicationProcessor(AbstractCommandProcessor):
         self.application_service.mark_deleted(
             application=application
         )
+        self.stats_service.application_deleted(application)
         return build_response(content='Application was deleted.')
@@ -12,7 +12,7 @@ from lambdas.modular_api_handler.processors.abstract_processor import (
 )
 from services import SERVICE_PROVIDER
 from services.customer_mutator_service import CustomerMutatorService
-from validators.request import CustomerPatch, CustomerPost, CustomerQuery, BaseModel
+from validators.request import CustomerPatch, CustomerPost, CustomerQuery, BaseModel, BaseFieldsModel
 from validators.response import CustomerResponse, CustomersResponse
 from validators.utils import validate_kwargs
 
@@ -86,16 +86,19 @@ class CustomerProcessor(AbstractCommandProcessor):
     def query(self, event: CustomerQuery):
         _LOG.debug('Describe customer event')
 
+        projection = self.customer_service.projection(event.fields_to_get)
         cursor = self.customer_service.i_get_customer(
             is_active=event.is_active,
             limit=event.limit,
             name=event.customer_id,
             last_evaluated_key=NextToken.from_input(event.next_token).value,
+            attributes_to_get=projection.attributes_to_get
         )
-        items = list(cursor)
+        items = [projection.trim(self.customer_service.get_dto(customer))
+                 for customer in cursor]
 
         return ResponseFactory().items(
-            it=map(self.customer_service.get_dto, items),
+            it=items,
             next_token=NextToken(cursor.last_evaluated_key)
         ).build()
 
@@ -119,21 +122,19 @@ class CustomerProcessor(AbstractCommandProcessor):
         return self.customer_service.get(name)
 
     @validate_kwargs
-    def get(self, event: BaseModel, name: str):
+    def get(self, event: BaseFieldsModel, name: str):
+        projection = self.customer_service.projection(event.fields_to_get)
         item = self._get_customer(name, event.customer_id)
         if not item:
             raise ResponseFactory(HTTPStatus.NOT_FOUND).default().exc()
-        return build_response(self.customer_service.get_dto(item))
+        return build_response(
+            projection.trim(self.customer_service.get_dto(item))
+        )
 
     @validate_kwargs
     def post(self, event: CustomerPost):
         name = event.name
         _LOG.debug(f'Creating customer \'{name}\'')
-        existing = self.customer_service.get(name)
-        if existing:
-            raise ResponseFactory(HTTPStatus.CONFLICT).message(
-                f'Customer {name} already exists'
-            ).exc()
         customer = self.customer_service.build(
             name=name,
             display_name=event.display_name,
@@ -141,7 +142,10 @@ class CustomerProcessor(AbstractCommandProcessor):
         )
 
         _LOG.debug('Saving customer')
-        self.customer_service.save(customer=customer)
+        if not self.customer_service.insert(customer):
+            raise ResponseFactory(HTTPStatus.CONFLICT).message(
+                f'Customer {name} already exists'
+            ).exc()
         return build_response(content=self.customer_service.get_dto(customer))
 
     @validate_kwargs
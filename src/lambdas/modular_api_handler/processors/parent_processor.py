@@ -43,7 +43,7 @@ class ParentProcessor(AbstractCommandProcessor):
         return cls(
             customer_service=SERVICE_PROVIDER.customer_service,
             parent_service=SERVICE_PROVIDER.parent_service,
-            application_service=SERVICE_PROVIDER.modular.application_service(),
+            application_service=SERVICE_PROVIDER.application_service,
             tenant_service=SERVICE_PROVIDER.tenant_service
         )
 
@@ -98,12 +98,6 @@ class PolicyProcessor(AbstractCommandProcessor):
 
     @validate_kwargs
     def post(self, event: PolicyPost):
-
-        if self.rbac_service.get_policy(event.customer_id, event.name):
-            raise ResponseFactory(HTTPStatus.CONFLICT).message(
-                f'Policy with name \'{event.name}\' already exists.'
-            ).exc()
-
         policy = self.rbac_service.build_policy(
             customer=event.customer_id,
             name=event.name,
@@ -111,7 +105,10 @@ class PolicyProcessor(AbstractCommandProcessor):
                                    event.permissions))
         )
         _LOG.debug('Saving policy')
-        self.rbac_service.save(policy)
+        if not self.rbac_service.insert(policy):
+            raise ResponseFactory(HTTPStatus.CONFLICT).message(
+                f'Policy with name \'{event.name}\' already exists.'
+            ).exc()
 
         return build_response(
             code=HTTPStatus.CREATED,
@@ -120,22 +117,20 @@ class PolicyProcessor(AbstractCommandProcessor):
 
     @validate_kwargs
     def patch(self, event: PolicyPatch, name: str):
-        item = self.rbac_service.get_policy(event.customer_id, name)
+        _LOG.debug('Updating policy')
+        item = self.rbac_service.patch_policy(
+            customer=event.customer_id,
+            name=name,
+            to_attach=map(operator.attrgetter('value'),
+                          event.permissions_to_attach),
+            to_detach=map(operator.attrgetter('value'),
+                          event.permissions_to_detach),
+            replace=bool(event.permissions)
+        )
         if not item:
             raise ResponseFactory(HTTPStatus.NOT_FOUND).message(
                 'Policy not found'
             ).exc()
-        permissions = set(item.permissions or ())
-        permissions.difference_update(
-            map(operator.attrgetter('value'), event.permissions_to_detach)
-        )
-        permissions.update(
-            map(operator.attrgetter('value'), event.permissions_to_attach)
-        )
-        item.permissions = sorted(permissions)
-        _LOG.debug('Saving policy')
-        self.rbac_service.save(item)
-
         return build_response(self.rbac_service.get_dto(item))
 
     @validate_kwargs
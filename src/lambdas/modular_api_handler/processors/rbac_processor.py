@@ -0,0 +1,81 @@
+from http import HTTPStatus
+
+from routes.route import Route
+
+from commons.constants import Endpoint, HTTPMethod, Permission
+from commons.lambda_response import build_response
+from commons.log_helper import get_logger
+from lambdas.modular_api_handler.processors.abstract_processor import (
+    AbstractCommandProcessor,
+)
+from services import SERVICE_PROVIDER
+from services.rbac_service import RBACService
+from validators.request import BaseModel, RBACImportPost
+from validators.response import RBACExportResponse, RBACImportResponse
+from validators.utils import validate_kwargs
+
+_LOG = get_logger(__name__)
+
+
+class RBACProcessor(AbstractCommandProcessor):
+    def __init__(self, rbac_service: RBACService):
+        self.rbac_service = rbac_service
+
+    @classmethod
+    def build(cls) -> 'RBACProcessor':
+        return cls(
+            rbac_service=SERVICE_PROVIDER.rbac_service
+        )
+
+    @classmethod
+    def routes(cls) -> tuple[Route, ...]:
+        return (
+            cls.route(
+                Endpoint.RBAC_EXPORT,
+                HTTPMethod.GET,
+                'export',
+                summary='Export all policies and roles of the customer',
+                response=(HTTPStatus.OK, RBACExportResponse, None),
+                permission=Permission.RBAC_EXPORT
+            ),
+            cls.route(
+                Endpoint.RBAC_IMPORT,
+                HTTPMethod.POST,
+                'import_',
+                summary='Make policies and roles of the customer equal to '
+                        'the given ones',
+                response=(HTTPStatus.OK, RBACImportResponse, None),
+                permission=Permission.RBAC_IMPORT
+            ),
+        )
+
+    @validate_kwargs
+    def export(self, event: BaseModel):
+        return build_response(self.rbac_service.export(event.customer_id))
+
+    @validate_kwargs
+    def import_(self, event: RBACImportPost):
+        policies = [
+            self.rbac_service.build_policy(
+                customer=event.customer_id,
+                name=item.name,
+                permissions=sorted(item.permissions)
+            ) for item in event.policies
+        ]
+        roles = [
+            self.rbac_service.build_role(
+                customer=event.customer_id,
+                name=item.name,
+                policies=sorted(item.policies),
+                expiration=item.expiration
+            ) for item in event.roles
+        ]
+        _LOG.debug(f'Syncing {len(policies)} policies and {len(roles)} roles')
+        changes = self.rbac_service.sync(
+            customer=event.customer_id,
+            policies=policies,
+            roles=roles,
+            prune=event.prune,
+            dry_run=event.dry_run
+        )
+        return build_response({'dry_run': event.dry_run, **changes})
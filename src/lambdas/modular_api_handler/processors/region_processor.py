@@ -1,7 +1,9 @@
 from http import HTTPStatus
+from itertools import islice
 
 from routes.route import Route
 
+from commons import NextToken
 from commons.constants import Endpoint, HTTPMethod, Permission
 from commons.lambda_response import ResponseFactory, build_response
 from commons.log_helper import get_logger
@@ -11,7 +13,7 @@ from lambdas.modular_api_handler.processors.abstract_processor import (
 from services import SERVICE_PROVIDER
 from services.region_mutator_service import RegionMutatorService
 from services.tenant_mutator_service import TenantMutatorService
-from validators.request import BaseModel, RegionPost
+from validators.request import BaseModel, RegionPost, RegionQuery
 from validators.response import RegionResponse, RegionsResponse
 from validators.utils import validate_kwargs
 
@@ -74,45 +76,46 @@ class RegionProcessor(AbstractCommandProcessor):
         return build_response(content=self.region_service.get_dto(item))
 
     @validate_kwargs
-    def query(self, event: BaseModel):
-
-        _LOG.debug('Describing all regions')
-        # TODO for modular-sdk -> rewrite get_all_regions
-        regions = self.region_service.get_all_regions(only_active=False)
-
-        return build_response(
-            content=map(self.region_service.get_dto, regions)
+    def query(self, event: RegionQuery):
+        _LOG.debug('Describing regions')
+        lak = NextToken.from_input(event.next_token).value
+        cursor = self.region_service.iter_regions(
+            cloud=event.cloud.value if event.cloud else None,
+            is_active=event.is_active,
+            start_after=lak.get('maestro_name') if isinstance(lak, dict)
+            else None
         )
+        if event.limit is None:  # regions were not paginated before
+            return ResponseFactory().items(
+                it=map(self.region_service.get_dto, cursor)
+            ).build()
+        # one more item tells whether there is the next page
+        items = list(islice(cursor, event.limit + 1))
+        next_token = NextToken()
+        if len(items) > event.limit:
+            items.pop()
+            next_token = NextToken({'maestro_name': items[-1].maestro_name})
+        return ResponseFactory().items(
+            it=map(self.region_service.get_dto, items),
+            next_token=next_token
+        ).build()
 
     @validate_kwargs
     def post(self, event: RegionPost):
-
-        maestro_name = event.maestro_name
-        existing_region = self.region_service.get_region(
-            region_name=maestro_name)
-        if existing_region:
-            _LOG.error(f'Region {maestro_name} already exists.')
-            raise ResponseFactory(HTTPStatus.CONFLICT).message(
-                f'Region {maestro_name} already exists.'
-            ).exc()
-
         _LOG.debug('Creating region')
         region = self.region_service.create(
-            maestro_name=maestro_name,
+            maestro_name=event.maestro_name,
             native_name=event.native_name,
             region_id=event.region_id,
             cloud=event.cloud,
             is_active=True
         )
-        _LOG.debug('Saving region')
-        self.region_service.save(region_item=region)
-
         return build_response(content=self.region_service.get_dto(region))
 
     @validate_kwargs
     def delete(self, event: BaseModel, name: str):
 
-        region = self.region_service.get_region(name)
+        region = self.region_service.get_region(name, cached=False)
         if not region:
             return build_response(code=HTTPStatus.NO_CONTENT)
 
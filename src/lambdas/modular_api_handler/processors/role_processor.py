@@ -6,7 +6,6 @@ from commons import NextToken
 from commons.constants import Endpoint, HTTPMethod, Permission
 from commons.lambda_response import ResponseFactory, build_response
 from commons.log_helper import get_logger
-from commons.time_helper import utc_iso
 from lambdas.modular_api_handler.processors.abstract_processor import (
     AbstractCommandProcessor,
 )
@@ -94,10 +93,6 @@ class RoleProcessor(AbstractCommandProcessor):
 
     @validate_kwargs
     def post(self, event: RolePost):
-        if self.rbac_service.get_role(event.customer_id, event.name):
-            raise ResponseFactory(HTTPStatus.CONFLICT).message(
-                f'Role with name \'{event.name}\' already exists.'
-            ).exc()
         for policy in event.policies:
             if not self.rbac_service.get_policy(event.customer_id, policy):
                 raise ResponseFactory(HTTPStatus.BAD_REQUEST).message(
@@ -110,7 +105,10 @@ class RoleProcessor(AbstractCommandProcessor):
             expiration=event.expiration
         )
         _LOG.debug('Saving role')
-        self.rbac_service.save(role)
+        if not self.rbac_service.insert(role):
+            raise ResponseFactory(HTTPStatus.CONFLICT).message(
+                f'Role with name \'{event.name}\' already exists.'
+            ).exc()
 
         return build_response(
             code=HTTPStatus.CREATED,
@@ -119,19 +117,18 @@ class RoleProcessor(AbstractCommandProcessor):
 
     @validate_kwargs
     def patch(self, event: RolePatch, name: str):
-        item = self.rbac_service.get_role(event.customer_id, name)
+        _LOG.debug('Updating role')
+        item = self.rbac_service.patch_role(
+            customer=event.customer_id,
+            name=name,
+            to_attach=event.policies_to_attach,
+            to_detach=event.policies_to_detach,
+            expiration=event.expiration
+        )
         if not item:
             raise ResponseFactory(HTTPStatus.NOT_FOUND).message(
                 'Role not found'
             ).exc()
-        policies = set(item.policies or ())
-        policies.difference_update(event.policies_to_detach)
-        policies.update(event.policies_to_attach)
-        item.policies = list(policies)
-        if event.expiration:
-            item.expiration = utc_iso(event.expiration)
-        _LOG.debug('Saving role')
-        self.rbac_service.save(item)
         return build_response(self.rbac_service.get_dto(item))
 
     @validate_kwargs
@@ -1,6 +1,6 @@
 from http import HTTPStatus
 
-from modular_sdk.models.tenant import Tenant
+from modular_sdk.models.region import RegionModel
 from routes.route import Route
 
 from commons.constants import Endpoint, HTTPMethod, Permission
@@ -12,6 +12,7 @@ from lambdas.modular_api_handler.processors.abstract_processor import (
 from services import SERVICE_PROVIDER
 from services.region_mutator_service import RegionMutatorService
 from services.tenant_mutator_service import TenantMutatorService
+from services.tenant_resolver import TenantResolver
 from validators.request import TenantRegionDelete, BaseModel, TenantRegionPost
 from validators.response import RegionsResponse
 from validators.utils import validate_kwargs
@@ -21,15 +22,18 @@ _LOG = get_logger(__name__)
 
 class TenantRegionProcessor(AbstractCommandProcessor):
     def __init__(self, tenant_service: TenantMutatorService,
-                 region_service: RegionMutatorService):
+                 region_service: RegionMutatorService,
+                 tenant_resolver: TenantResolver):
         self.tenant_service = tenant_service
         self.region_service = region_service
+        self.tenant_resolver = tenant_resolver
 
     @classmethod
     def build(cls) -> 'TenantRegionProcessor':
         return cls(
             tenant_service=SERVICE_PROVIDER.tenant_service,
-            region_service=SERVICE_PROVIDER.region_service
+            region_service=SERVICE_PROVIDER.region_service,
+            tenant_resolver=SERVICE_PROVIDER.tenant_resolver
         )
 
     @classmethod
@@ -58,22 +62,10 @@ class TenantRegionProcessor(AbstractCommandProcessor):
             )
         )
 
-    def _get_tenant(self, name: str, customer_id: str) -> Tenant | None:
-        item = self.tenant_service.get(name)
-        if not item:
-            item = next(self.tenant_service.i_get_by_acc(
-                acc=name, limit=1
-            ), None)
-        if not item or item.customer_name != customer_id:
-            return
-        return item
-
     @validate_kwargs
     def get(self, event: BaseModel, name: str):
-        name = name.upper()
-
         _LOG.debug(f'Describing tenant by name \'{name}\'')
-        tenant = self._get_tenant(name, event.customer_id)
+        tenant = self.tenant_resolver.resolve(name, event.customer_id)
         if not tenant:
             _LOG.debug(f'Tenant \'{name}\' does not exist.')
             raise ResponseFactory(HTTPStatus.NOT_FOUND).message(
@@ -84,32 +76,36 @@ class TenantRegionProcessor(AbstractCommandProcessor):
             self.region_service.get_dto(region) for region in tenant.regions
         ])
 
+    def _get_regions(self, names: list[str]) -> list[RegionModel]:
+        """
+        Returns regions from the catalog in the given order
+        """
+        regions = {
+            region.maestro_name: region
+            for region in self.region_service.get_regions(names)
+        }
+        if missing := [name for name in names if name not in regions]:
+            missing = ', '.join(f'\'{name}\'' for name in missing)
+            _LOG.debug(f'Region {missing} is not supported.')
+            raise ResponseFactory(HTTPStatus.NOT_FOUND).message(
+                f'Region {missing} is not supported.'
+            ).exc()
+        return [regions[name] for name in names]
+
     @validate_kwargs
     def post(self, event: TenantRegionPost, name: str):
-        name = name.upper()
-
-        tenant = self._get_tenant(name, event.customer_id)
+        tenant = self.tenant_resolver.resolve(name, event.customer_id)
         if not tenant:
             _LOG.debug(f'Tenant \'{name}\' does not exist.')
             raise ResponseFactory(HTTPStatus.NOT_FOUND).message(
                 f'Tenant \'{name}\' does not exist.'
             ).exc()
+        regions = self._get_regions(event.regions)
 
-        region_name = event.region
-        region = self.region_service.get_region(region_name=region_name)
-        if not region:
-            _LOG.debug(f'Region \'{region_name}\' is not supported.')
-            raise ResponseFactory(HTTPStatus.NOT_FOUND).message(
-                f'Region \'{region_name}\'  is not supported.'
-            ).exc()
-
-        _LOG.debug(f'Activating region \'{region_name}\' in tenant '
+        _LOG.debug(f'Activating regions {event.regions} in tenant '
                    f'\'{name}\'')
-        self.region_service.activate_region_in_tenant(tenant=tenant,
-                                                      region=region)
-
-        _LOG.debug('Saving tenant')
-        self.tenant_service.save(tenant=tenant)
+        self.region_service.activate_regions_in_tenant(tenant=tenant,
+                                                       regions=regions)
 
         return build_response([
             self.region_service.get_dto(region) for region in tenant.regions
@@ -117,30 +113,19 @@ class TenantRegionProcessor(AbstractCommandProcessor):
 
     @validate_kwargs
     def delete(self, event: TenantRegionDelete, name: str):
-        name = name.upper()
-
         _LOG.debug(f'Describing tenant by name \'{name}\'')
-        tenant = self._get_tenant(name, event.customer_id)
+        tenant = self.tenant_resolver.resolve(name, event.customer_id)
         if not tenant:
             _LOG.debug(f'Tenant \'{name}\' does not exist.')
             raise ResponseFactory(HTTPStatus.NOT_FOUND).message(
                 f'Tenant \'{name}\' does not exist.'
             ).exc()
-        region_name = event.region
-        region = self.region_service.get_region(region_name=region_name)
-        if not region:
-            _LOG.debug(f'Region \'{region_name}\' is not supported.')
-            raise ResponseFactory(HTTPStatus.NOT_FOUND).message(
-                f'Region \'{region_name}\'  is not supported.'
-            ).exc()
+        regions = self._get_regions(event.regions)
 
-        _LOG.debug(f'Deactivating region \'{region_name}\' from tenant '
+        _LOG.debug(f'Deactivating regions {event.regions} from tenant '
                    f'\'{name}\'')
-        self.region_service.delete_region_from_tenant(
+        self.region_service.deactivate_regions_in_tenant(
             tenant=tenant,
-            region=region
+            regions=regions
         )
-
-        _LOG.debug('Saving tenant')
-        self.tenant_service.save(tenant=tenant)
         return build_response(code=HTTPStatus.NO_CONTENT)
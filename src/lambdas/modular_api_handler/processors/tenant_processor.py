@@ -4,6 +4,7 @@ from modular_sdk.models.tenant import Tenant
 from routes.route import Route
 
 from commons import NextToken
+from commons.abstract_lambda import ProcessedEvent
 from commons.constants import Endpoint, HTTPMethod, Permission
 from commons.lambda_response import ResponseFactory, build_response
 from commons.log_helper import get_logger
@@ -12,9 +13,28 @@ from lambdas.modular_api_handler.processors.abstract_processor import (
 )
 from services import SERVICE_PROVIDER
 from services.customer_mutator_service import CustomerMutatorService
+from services.export_service import (
+    EXPORT_DESCRIPTION,
+    EXPORT_RESPONSE,
+    ExportService,
+)
+from services.stats_service import StatsService
 from services.tenant_mutator_service import TenantMutatorService
-from validators.request import BaseModel, TenantPost, TenantQuery
-from validators.response import MessageModel, TenantResponse, TenantsResponse
+from services.tenant_resolver import TenantResolver
+from validators.request import (
+    BaseFieldsModel,
+    BaseModel,
+    TenantBatchPost,
+    TenantPost,
+    TenantQuery,
+)
+from validators.response import (
+    MessageModel,
+    TenantBatchResponse,
+    TenantResponse,
+    TenantsResponse,
+    TenantsStatsResponse,
+)
 from validators.utils import validate_kwargs
 
 _LOG = get_logger(__name__)
@@ -22,15 +42,24 @@ _LOG = get_logger(__name__)
 
 class TenantProcessor(AbstractCommandProcessor):
     def __init__(self, customer_service: CustomerMutatorService,
-                 tenant_service: TenantMutatorService):
+                 tenant_service: TenantMutatorService,
+                 tenant_resolver: TenantResolver,
+                 export_service: ExportService,
+                 stats_service: StatsService):
         self.customer_service: CustomerMutatorService = customer_service
         self.tenant_service: TenantMutatorService = tenant_service
+        self.tenant_resolver: TenantResolver = tenant_resolver
+        self.export_service: ExportService = export_service
+        self.stats_service: StatsService = stats_service
 
     @classmethod
     def build(cls) -> 'TenantProcessor':
         return cls(
             customer_service=SERVICE_PROVIDER.customer_service,
-            tenant_service=SERVICE_PROVIDER.tenant_service
+            tenant_service=SERVICE_PROVIDER.tenant_service,
+            tenant_resolver=SERVICE_PROVIDER.tenant_resolver,
+            export_service=SERVICE_PROVIDER.export_service,
+            stats_service=SERVICE_PROVIDER.stats_service
         )
 
     @classmethod
@@ -40,7 +69,28 @@ class TenantProcessor(AbstractCommandProcessor):
                 Endpoint.TENANTS,
                 HTTPMethod.GET,
                 'query',
-                response=(HTTPStatus.OK, TenantsResponse, None),
+                response=[(HTTPStatus.OK, TenantsResponse, None),
+                          EXPORT_RESPONSE],
+                description=EXPORT_DESCRIPTION,
+                permission=Permission.TENANT_DESCRIBE
+            ),
+            cls.route(
+                Endpoint.TENANTS_BATCH,
+                HTTPMethod.POST,
+                'create_batch',
+                response=(HTTPStatus.MULTI_STATUS, TenantBatchResponse, None),
+                description='Creates up to 100 tenants. Each of them is '
+                            'created or rejected independently, the result '
+                            'is reported for each one',
+                permission=Permission.TENANT_CREATE
+            ),
+            cls.route(
+                Endpoint.TENANTS_STATS,
+                HTTPMethod.GET,
+                'stats',
+                response=(HTTPStatus.OK, TenantsStatsResponse, None),
+                description='Returns the number of tenants by cloud and '
+                            'state. Counts can be a few seconds behind',
                 permission=Permission.TENANT_DESCRIBE
             ),
             cls.route(
@@ -88,108 +138,138 @@ class TenantProcessor(AbstractCommandProcessor):
         )
 
     @validate_kwargs
-    def query(self, event: TenantQuery):
+    def query(self, event: TenantQuery, _pe: ProcessedEvent):
+        export = self.export_service.is_requested(_pe)
+        projection = self.tenant_service.projection(event.fields_to_get)
         cursor = self.tenant_service.i_get_tenant_by_customer(
             customer_id=event.customer_id,
             active=event.is_active,
             cloud=event.cloud.value if event.cloud else None,
-            limit=event.limit,
-            last_evaluated_key=NextToken.from_input(event.next_token).value,
+            search=event.search,
+            limit=None if export else event.limit,
+            last_evaluated_key=None if export else
+            NextToken.from_input(event.next_token).value,
+            attributes_to_get=projection.attributes_to_get
         )
-        items = list(cursor)
+        dtos = (projection.trim(self.tenant_service.get_dto(tenant))
+                for tenant in cursor)
+        if export:
+            return self.export_service.respond(dtos, 'tenants')
+        items = list(dtos)
 
         return ResponseFactory().items(
-            it=map(self.tenant_service.get_dto, items),
+            it=items,
             next_token=NextToken(cursor.last_evaluated_key)
         ).build()
 
-    def _get_tenant(self, name: str, customer_id: str) -> Tenant | None:
-        item = self.tenant_service.get(name)
-        if not item:
-            item = next(self.tenant_service.i_get_by_acc(
-                acc=name, limit=1
-            ), None)
-        if not item or item.customer_name != customer_id:
-            return
-        return item
+    @validate_kwargs
+    def stats(self, event: BaseModel):
+        return build_response(
+            content=self.stats_service.tenants(event.customer_id)
+        )
 
     @validate_kwargs
-    def get(self, event: BaseModel, name: str):
-        name = name.upper()
-        tenant = self._get_tenant(name, event.customer_id)
+    def get(self, event: BaseFieldsModel, name: str):
+        projection = self.tenant_service.projection(event.fields_to_get)
+        tenant = self.tenant_resolver.resolve(name, event.customer_id)
         if not tenant:
             raise ResponseFactory(HTTPStatus.NOT_FOUND).default().exc()
-        return build_response(content=self.tenant_service.get_dto(tenant))
+        return build_response(
+            content=projection.trim(self.tenant_service.get_dto(tenant))
+        )
+
+    def _build_tenant(self, item: TenantPost, customer: str) -> Tenant:
+        return self.tenant_service.create(
+            tenant_name=item.name,
+            display_name=item.display_name,
+            customer_name=customer,
+            cloud=item.cloud,
+            acc=item.account_id,
+            is_active=True,
+            read_only=item.read_only,
+            contacts={
+                'primary_contacts': list(item.primary_contacts),
+                'secondary_contacts': list(item.secondary_contacts),
+                'tenant_manager_contacts': list(item.tenant_manager_contacts),
+                'default_owner': item.default_owner
+            }
+        )
 
     @validate_kwargs
     def create(self, event: TenantPost):
         name = event.name
         acc = event.account_id
-        if self.tenant_service.get(tenant_name=name):
-            _LOG.warning(f'Tenant with name \'{name}\' already exist.')
-            raise ResponseFactory(HTTPStatus.CONFLICT).message(
-                f'Tenant with name \'{name}\' already exist.'
-            ).exc()
-
-        by_acc = next(self.tenant_service.i_get_by_acc(
-            acc=acc, limit=1
-        ), None)
-        if by_acc:
-            _LOG.warning(f'Tenant with account id \'{acc}\' already exist.')
-            raise ResponseFactory(HTTPStatus.CONFLICT).message(
-                f'Tenant with account id \'{acc}\' already exist.'
-            ).exc()
-
         _LOG.debug('Creating tenant')
-        tenant = self.tenant_service.create(
-            tenant_name=name,
-            display_name=event.display_name,
-            customer_name=event.customer_id,
-            cloud=event.cloud,
-            acc=acc,
-            is_active=True,
-            read_only=event.read_only,
-            contacts={
-                'primary_contacts': list(event.primary_contacts),
-                'secondary_contacts': list(event.secondary_contacts),
-                'tenant_manager_contacts': list(event.tenant_manager_contacts),
-                'default_owner': event.default_owner
-            }
-        )
+        tenant = self._build_tenant(event, event.customer_id)
         _LOG.debug('Saving tenant')
-        self.tenant_service.save(tenant=tenant)
+        if not self.tenant_service.insert(tenant):
+            if self.tenant_service.get(tenant_name=name):
+                message = f'Tenant with name \'{name}\' already exist.'
+            else:
+                message = f'Tenant with account id \'{acc}\' already exist.'
+            _LOG.warning(message)
+            raise ResponseFactory(HTTPStatus.CONFLICT).message(message).exc()
+        self.stats_service.tenant_created(tenant)
         return build_response(
             content=self.tenant_service.get_dto(tenant),
             code=HTTPStatus.CREATED
         )
 
+    @validate_kwargs
+    def create_batch(self, event: TenantBatchPost):
+        tenants = [
+            self._build_tenant(item, event.customer_id)
+            for item in event.tenants
+        ]
+        _LOG.debug(f'Saving {len(tenants)} tenants')
+        errors = self.tenant_service.insert_many(tenants)
+        items = []
+        for tenant, error in zip(tenants, errors):
+            if error:
+                items.append({
+                    'name': tenant.name,
+                    'code': HTTPStatus.CONFLICT.value,
+                    'message': error
+                })
+            else:
+                self.stats_service.tenant_created(tenant)
+                items.append({
+                    'name': tenant.name,
+                    'code': HTTPStatus.CREATED.value,
+                    'data': self.tenant_service.get_dto(tenant)
+                })
+        _LOG.debug(f'{errors.count(None)} tenants were created')
+        return ResponseFactory(HTTPStatus.MULTI_STATUS).items(items).build()
+
     @validate_kwargs
     def activate(self, event: BaseModel, name: str):
-        name = name.upper()
-        tenant = self._get_tenant(name, event.customer_id)
+        tenant = self.tenant_resolver.resolve(name, event.customer_id)
         if not tenant:
             raise ResponseFactory(HTTPStatus.NOT_FOUND).default().exc()
-        self.tenant_service.activate(tenant)
+        if self.tenant_service.activate(tenant):
+            self.stats_service.tenant_state_changed(tenant, active=True)
         return build_response(content=self.tenant_service.get_dto(tenant))
 
     @validate_kwargs
     def deactivate(self, event: BaseModel, name: str):
-        name = name.upper()
-        tenant = self._get_tenant(name, event.customer_id)
+        tenant = self.tenant_resolver.resolve(name, event.customer_id)
         if not tenant:
             raise ResponseFactory(HTTPStatus.NOT_FOUND).default().exc()
-        self.tenant_service.deactivate(tenant)
+        if self.tenant_service.deactivate(tenant):
+            self.stats_service.tenant_state_changed(tenant, active=False)
         return build_response(content=self.tenant_service.get_dto(tenant))
 
     @validate_kwargs
     def delete(self, event: BaseModel, name: str):
-        name = name.upper()
-        tenant = self._get_tenant(name, event.customer_id)
+        tenant = self.tenant_resolver.resolve(name, event.customer_id)
 
         if not tenant:
             _LOG.warning(f'Tenant {name} did not exist before')
             return build_response(code=HTTPStatus.NO_CONTENT)
 
-        _LOG.debug(f'Deactivating tenant \'{name}\'')
-        self.tenant_service.remove(tenant)
+        _LOG.debug(f'Deleting tenant \'{name}\'')
+        deleted = self.tenant_service.remove(tenant)
+        self.tenant_resolver.forget(tenant)
+        if deleted:
+            self.stats_service.tenant_deleted(tenant)
         return build_response(code=HTTPStatus.NO_CONTENT)
@@ -1,78 +1,108 @@
 from http import HTTPStatus
 
-from modular_sdk.services.tenant_settings_service import TenantSettingsService
 from routes.route import Route
 
 from commons import NextToken
+from commons.abstract_lambda import ProcessedEvent
 from commons.constants import Endpoint, HTTPMethod, Permission
 from commons.lambda_response import ResponseFactory, build_response
 from lambdas.modular_api_handler.processors.abstract_processor import (
     AbstractCommandProcessor,
 )
 from services import SP
-from modular_sdk.models.tenant import Tenant
-from services.tenant_mutator_service import TenantMutatorService
-from validators.request import TenantSettingQuery, TenantSettingPut
+from services.export_service import (
+    EXPORT_DESCRIPTION,
+    EXPORT_RESPONSE,
+    ExportService,
+)
+from services.tenant_resolver import TenantResolver
+from services.tenant_settings_mutator_service import (
+    TenantSettingsMutatorService,
+)
+from validators.request import (
+    TenantSettingPut,
+    TenantSettingQuery,
+    TenantSettingsKeyQuery,
+)
 from validators.response import TenantSettingsResponse
 from validators.utils import validate_kwargs
 
 
 class TenantSettingsProcessor(AbstractCommandProcessor):
-    def __init__(self, tenant_settings_service: TenantSettingsService,
-                 tenant_service: TenantMutatorService):
+    def __init__(self, tenant_settings_service: TenantSettingsMutatorService,
+                 tenant_resolver: TenantResolver,
+                 export_service: ExportService):
         self._tss = tenant_settings_service
-        self._ts = tenant_service
+        self._tr = tenant_resolver
+        self._es = export_service
 
     @classmethod
     def build(cls) -> 'TenantSettingsProcessor':
         return cls(
-            tenant_settings_service=SP.modular.tenant_settings_service(),
-            tenant_service=SP.tenant_service
+            tenant_settings_service=SP.tenant_settings_service,
+            tenant_resolver=SP.tenant_resolver,
+            export_service=SP.export_service
         )
 
     @classmethod
     def routes(cls) -> tuple[Route, ...]:
         return (
+            cls.route(
+                Endpoint.TENANTS_SETTINGS,
+                HTTPMethod.GET,
+                'query_by_key',
+                summary='List settings with the given key across all '
+                        'tenants of the customer',
+                description=EXPORT_DESCRIPTION,
+                response=[(HTTPStatus.OK, TenantSettingsResponse, None),
+                          EXPORT_RESPONSE],
+                permission=Permission.TENANT_SETTING_DESCRIBE
+            ),
             cls.route(
                 Endpoint.TENANTS_NAME_SETTINGS,
                 HTTPMethod.GET,
                 'query',
                 summary='List settings all settings for this tenant',
-                response=(HTTPStatus.OK, TenantSettingsResponse, None),
+                description=EXPORT_DESCRIPTION,
+                response=[(HTTPStatus.OK, TenantSettingsResponse, None),
+                          EXPORT_RESPONSE],
                 permission=Permission.TENANT_SETTING_DESCRIBE
             ),
             cls.route(
                 Endpoint.TENANTS_NAME_SETTINGS,
                 HTTPMethod.PUT,
                 'put',
-                summary='Put some setting value',
+                summary='Put one setting value or many settings at once',
                 response=(HTTPStatus.OK, TenantSettingsResponse, None),
                 permission=Permission.TENANT_SETTING_SET
             ),
         )
 
-    def _get_tenant(self, name: str, customer_id: str) -> Tenant | None:
-        item = self._ts.get(name)
-        if not item:
-            item = next(self._ts.i_get_by_acc(acc=name, limit=1), None)
-        if not item or item.customer_name != customer_id:
-            return
-        return item
-
     @validate_kwargs
-    def query(self, event: TenantSettingQuery, name: str):
-        name = name.upper()
-        tenant = self._get_tenant(name, event.customer_id)
+    def query(self, event: TenantSettingQuery, _pe: ProcessedEvent,
+              name: str):
+        tenant = self._tr.resolve(name, event.customer_id)
         if not tenant:
             raise ResponseFactory(HTTPStatus.NOT_FOUND).message(
                 'Tenant not found'
             ).exc()
+        keys = event.keys_to_get
+        if len(keys) > 1:
+            return ResponseFactory().items(
+                it=map(self._tss.get_dto,
+                       self._tss.batch_get(tenant.name, keys)),
+            ).build()
+        export = self._es.is_requested(_pe)
         cursor = self._tss.i_get_by_tenant(
             tenant=tenant.name,
-            key=event.key,
-            limit=event.limit,
-            last_evaluated_key=NextToken.from_input(event.next_token).value,
+            key=keys[0] if keys else None,
+            limit=None if export else event.limit,
+            last_evaluated_key=None if export else
+            NextToken.from_input(event.next_token).value,
         )
+        if export:
+            return self._es.respond(map(self._tss.get_dto, cursor),
+                                    'tenant-settings')
         items = list(cursor)
 
         return ResponseFactory().items(
@@ -80,18 +110,43 @@ class TenantSettingsProcessor(AbstractCommandProcessor):
             next_token=NextToken(cursor.last_evaluated_key)
         ).build()
 
+    @validate_kwargs
+    def query_by_key(self, event: TenantSettingsKeyQuery,
+                     _pe: ProcessedEvent):
+        if self._es.is_requested(_pe):
+            return self._es.respond(
+                map(self._tss.get_dto, self._tss.iter_by_key(
+                    key=event.key, customer_id=event.customer_id
+                )),
+                'tenant-settings'
+            )
+        items, lek = self._tss.query_by_key(
+            key=event.key,
+            customer_id=event.customer_id,
+            limit=event.limit,
+            last_evaluated_key=NextToken.from_input(event.next_token).value,
+        )
+        return ResponseFactory().items(
+            it=map(self._tss.get_dto, items),
+            next_token=NextToken(lek)
+        ).build()
+
     @validate_kwargs
     def put(self, event: TenantSettingPut, name: str):
-        name = name.upper()
-        tenant = self._get_tenant(name, event.customer_id)
+        tenant = self._tr.resolve(name, event.customer_id)
         if not tenant:
             raise ResponseFactory(HTTPStatus.NOT_FOUND).message(
                 'Tenant not found'
             ).exc()
-        ts = self._tss.create(
-            tenant_name=tenant.name,
-            key=event.key,
-            value=event.value
-        )
-        self._tss.save(ts)
-        return build_response(self._tss.get_dto(ts))
+        items = [
+            self._tss.create(tenant_name=tenant.name, key=key, value=value)
+            for key, value in event.settings.items()
+        ]
+        if 'settings' not in event.model_fields_set:
+            # one setting put the old way
+            self._tss.save(items[0])
+            return build_response(self._tss.get_dto(items[0]))
+        self._tss.batch_save(items)
+        return ResponseFactory().items(
+            it=map(self._tss.get_dto, items),
+        ).build()
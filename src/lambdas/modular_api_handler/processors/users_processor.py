@@ -15,10 +15,18 @@ from lambdas.modular_api_handler.processors.abstract_processor import (
 from services import SP
 from services.clients.cognito import BaseAuthClient, UserWrapper
 from services.customer_mutator_service import CustomerMutatorService
+from services.export_service import (
+    EXPORT_DESCRIPTION,
+    EXPORT_RESPONSE,
+    ExportService,
+)
 from services.rbac_service import RBACService
+from services.stats_service import StatsService
+from services.unit_of_work import UnitOfWork, UnitOfWorkConflict
 from validators.request import BaseModel, UserPatchModel, UserPostModel, \
     BasePaginationModel, SignUpPost, SignInPost, RefreshPostModel, UserResetPasswordModel
-from validators.response import UserResponse, UsersResponse, MessageModel, SignInResponse
+from validators.response import UserResponse, UsersResponse, MessageModel, \
+    SignInResponse, UsersStatsResponse
 from validators.utils import validate_kwargs
 
 _LOG = get_logger(__name__)
@@ -27,17 +35,23 @@ _LOG = get_logger(__name__)
 class UsersProcessor(AbstractCommandProcessor):
     def __init__(self, users_client: BaseAuthClient,
                  rbac_service: RBACService,
-                 customer_service: CustomerMutatorService):
+                 customer_service: CustomerMutatorService,
+                 export_service: ExportService,
+                 stats_service: StatsService):
         self.users_client = users_client
         self.rbac_service = rbac_service
         self._cs = customer_service
+        self.export_service = export_service
+        self.stats_service = stats_service
 
     @classmethod
     def build(cls) -> 'UsersProcessor':
         return cls(
             users_client=SP.users_client,
             rbac_service=SP.rbac_service,
-            customer_service=SP.customer_service
+            customer_service=SP.customer_service,
+            export_service=SP.export_service,
+            stats_service=SP.stats_service
         )
 
     @classmethod
@@ -52,12 +66,23 @@ class UsersProcessor(AbstractCommandProcessor):
                 require_auth=True,
                 permission=Permission.USERS_GET_CALLER
             ),
+            cls.route(
+                Endpoint.USERS_STATS,
+                HTTPMethod.GET,
+                'stats',
+                summary='Returns the number of users by role',
+                response=[(HTTPStatus.OK, UsersStatsResponse, None)],
+                require_auth=True,
+                permission=Permission.USERS_DESCRIBE
+            ),
             cls.route(
                 Endpoint.USERS,
                 HTTPMethod.GET,
                 'query',
                 summary='Query multiple users',
-                response=[(HTTPStatus.OK, UsersResponse, None)],
+                description=EXPORT_DESCRIPTION,
+                response=[(HTTPStatus.OK, UsersResponse, None),
+                          EXPORT_RESPONSE],
                 require_auth=True,
                 permission=Permission.USERS_DESCRIBE
             ),
@@ -139,12 +164,18 @@ class UsersProcessor(AbstractCommandProcessor):
         )
 
     @validate_kwargs
-    def query(self, event: BasePaginationModel):
+    def query(self, event: BasePaginationModel, _pe: ProcessedEvent):
+        export = self.export_service.is_requested(_pe)
         cursor = self.users_client.query_users(
             customer=event.customer_id,
-            limit=event.limit,
-            next_token=NextToken.from_input(event.next_token).value
+            limit=None if export else event.limit,
+            next_token=None if export else
+            NextToken.from_input(event.next_token).value
         )
+        if export:
+            return self.export_service.respond(
+                (i.get_dto() for i in cursor), 'users'
+            )
         items = list(cursor)
         return ResponseFactory().items(
             it=(i.get_dto() for i in items),
@@ -172,8 +203,13 @@ class UsersProcessor(AbstractCommandProcessor):
         )
         # seems like we need this additional step for cognito
         self.users_client.set_user_password(event.username, event.password)
+        self.stats_service.user_created(event.customer_id, event.role_name)
         return build_response(user.get_dto())
 
+    @validate_kwargs
+    def stats(self, event: BaseModel):
+        return build_response(self.stats_service.users(event.customer_id))
+
     @validate_kwargs
     def get(self, event: BaseModel, username: str):
         item = self.users_client.get_user_by_username(username)
@@ -191,6 +227,7 @@ class UsersProcessor(AbstractCommandProcessor):
                 'User not found'
             ).exc()
         params = dict()
+        previous_role = item.role
         if event.role_name:
             params['role'] = event.role_name
             item.role = event.role_name
@@ -199,6 +236,9 @@ class UsersProcessor(AbstractCommandProcessor):
             **params
         )
         self.users_client.update_user_attributes(to_update)
+        if item.role != previous_role:
+            self.stats_service.user_deleted(item.customer, previous_role)
+            self.stats_service.user_created(item.customer, item.role)
         if event.password:
             _LOG.info('Password was provided. Updating user password')
             self.users_client.set_user_password(username, event.password)
@@ -212,6 +252,7 @@ class UsersProcessor(AbstractCommandProcessor):
             return build_response(code=HTTPStatus.NO_CONTENT)
         # users exists and it belongs to this customer
         self.users_client.delete_user(username)
+        self.stats_service.user_deleted(user.customer, user.role)
         return build_response(code=HTTPStatus.NO_CONTENT)
 
     @validate_kwargs
@@ -227,10 +268,6 @@ class UsersProcessor(AbstractCommandProcessor):
 
     @validate_kwargs
     def signup(self, event: SignUpPost):
-        if self._cs.get(event.customer_name):
-            raise ResponseFactory(HTTPStatus.CONFLICT).message(
-                f'Customer {event.customer_name} already exists'
-            ).exc()
         if self.users_client.does_user_exist(event.username):
             raise ResponseFactory(HTTPStatus.CONFLICT).message(
                 f'User {event.username} already exists'
@@ -252,17 +289,53 @@ class UsersProcessor(AbstractCommandProcessor):
             name='admin_role',  # default main role
             policies=['admin_policy']
         )
-        self.rbac_service.save(role)
-        self.rbac_service.save(policy)
-        self._cs.save(customer)
-        self.users_client.signup_user(
+        user = self.users_client.build_user_item(
             username=event.username,
             password=event.password,
             customer=event.customer_name,
             role='admin_role',
             is_system=False
         )
-        _LOG.debug(f'Saving user: {event.username}')
+        uow = UnitOfWork()
+        uow.insert(customer)
+        uow.insert(policy)
+        uow.insert(role)
+        if user:
+            uow.insert(user)
+        _LOG.debug('Saving customer, its admin policy, role and user')
+        try:
+            uow.commit()
+        except UnitOfWorkConflict as e:
+            if e.item is customer:
+                message = f'Customer {event.customer_name} already exists'
+            elif e.item is policy:
+                message = (f'Policy admin_policy of customer '
+                           f'{event.customer_name} already exists')
+            elif e.item is role:
+                message = (f'Role admin_role of customer '
+                           f'{event.customer_name} already exists')
+            else:
+                message = f'User {event.username} already exists'
+            raise ResponseFactory(HTTPStatus.CONFLICT).message(message).exc()
+        finally:
+            self._cs.invalidate(event.customer_name)
+        if not user:
+            _LOG.debug(f'Signing up user: {event.username}')
+            try:
+                self.users_client.signup_user(
+                    username=event.username,
+                    password=event.password,
+                    customer=event.customer_name,
+                    role='admin_role',
+                    is_system=False
+                )
+            except Exception:
+                _LOG.exception('Could not sign up user, undoing the '
+                               'customer, policy and role')
+                uow.rollback()
+                self._cs.invalidate(event.customer_name)
+                raise
+            self.stats_service.user_created(event.customer_name, 'admin_role')
         return build_response(content=f'The user {event.username} was created')
 
     @validate_kwargs
@@ -0,0 +1,257 @@
+"""
+Static registry of all the routes. It allows to build the mapper and
+permissions mapping without importing controllers. A controller is
+imported and built only when a request for one of its routes comes
+(or during warmup). tests/test_registry.py keeps the registry in sync
+with routes that controllers declare
+"""
+from typing import NamedTuple
+
+from commons.constants import Endpoint, HTTPMethod, Permission
+
+_PROCESSORS = 'lambdas.modular_api_handler.processors'
+
+# controller name -> module that contains the controller class with such name
+CONTROLLERS: dict[str, str] = {
+    'PolicyProcessor': f'{_PROCESSORS}.policies_processor',
+    'RoleProcessor': f'{_PROCESSORS}.role_processor',
+    'RBACProcessor': f'{_PROCESSORS}.rbac_processor',
+    'CustomerProcessor': f'{_PROCESSORS}.customer_processor',
+    'TenantProcessor': f'{_PROCESSORS}.tenant_processor',
+    'TenantRegionProcessor': f'{_PROCESSORS}.tenant_in_region_processor',
+    'ApplicationProcessor': f'{_PROCESSORS}.application_processor',
+    'RegionProcessor': f'{_PROCESSORS}.region_processor',
+    'TenantSettingsProcessor': f'{_PROCESSORS}.tenant_settings_processor',
+    'HealthCheckProcessor': f'{_PROCESSORS}.health_processor',
+    'SwaggerProcessor': f'{_PROCESSORS}.swagger_processor',
+    'UsersProcessor': f'{_PROCESSORS}.users_processor',
+}
+
+
+class RouteEntry(NamedTuple):
+    path: Endpoint
+    method: HTTPMethod
+    controller: str
+    action: str
+    permission: Permission | None
+    require_auth: bool = True
+    # rate limit tokens that a request takes, more for heavy endpoints
+    cost: int = 1
+    # requests per minute to this route by one user and by all users of a
+    # customer, limited separately from other routes. Not limited if None
+    user_rpm: int | None = None
+    customer_rpm: int | None = None
+
+
+# the order matters, the mapper matches routes one by one
+ROUTES: tuple[RouteEntry, ...] = (
+    # PolicyProcessor
+    RouteEntry(Endpoint.POLICIES_NAME, HTTPMethod.GET,
+               'PolicyProcessor', 'get',
+               Permission.POLICY_DESCRIBE),
+    RouteEntry(Endpoint.POLICIES, HTTPMethod.GET,
+               'PolicyProcessor', 'query',
+               Permission.POLICY_DESCRIBE),
+    RouteEntry(Endpoint.POLICIES, HTTPMethod.POST,
+               'PolicyProcessor', 'post',
+               Permission.POLICY_CREATE),
+    RouteEntry(Endpoint.POLICIES_NAME, HTTPMethod.PATCH,
+               'PolicyProcessor', 'patch',
+               Permission.POLICY_UPDATE),
+    RouteEntry(Endpoint.POLICIES_NAME, HTTPMethod.DELETE,
+               'PolicyProcessor', 'delete',
+               Permission.POLICY_DELETE),
+
+    # RoleProcessor
+    RouteEntry(Endpoint.ROLES_NAME, HTTPMethod.GET,
+               'RoleProcessor', 'get',
+               Permission.ROLE_DESCRIBE),
+    RouteEntry(Endpoint.ROLES, HTTPMethod.GET,
+               'RoleProcessor', 'query',
+               Permission.ROLE_DESCRIBE),
+    RouteEntry(Endpoint.ROLES, HTTPMethod.POST,
+               'RoleProcessor', 'post',
+               Permission.ROLE_CREATE),
+    RouteEntry(Endpoint.ROLES_NAME, HTTPMethod.PATCH,
+               'RoleProcessor', 'patch',
+               Permission.ROLE_UPDATE),
+    RouteEntry(Endpoint.ROLES_NAME, HTTPMethod.DELETE,
+               'RoleProcessor', 'delete',
+               Permission.ROLE_DELETE),
+
+    # RBACProcessor
+    RouteEntry(Endpoint.RBAC_EXPORT, HTTPMethod.GET,
+               'RBACProcessor', 'export',
+               Permission.RBAC_EXPORT, cost=5,
+               user_rpm=30, customer_rpm=60),
+    RouteEntry(Endpoint.RBAC_IMPORT, HTTPMethod.POST,
+               'RBACProcessor', 'import_',
+               Permission.RBAC_IMPORT, cost=10,
+               user_rpm=6, customer_rpm=12),
+
+    # CustomerProcessor
+    RouteEntry(Endpoint.CUSTOMERS, HTTPMethod.GET,
+               'CustomerProcessor', 'query',
+               Permission.CUSTOMER_DESCRIBE),
+    RouteEntry(Endpoint.CUSTOMERS_NAME, HTTPMethod.GET,
+               'CustomerProcessor', 'get',
+               Permission.CUSTOMER_DESCRIBE),
+    RouteEntry(Endpoint.CUSTOMERS, HTTPMethod.POST,
+               'CustomerProcessor', 'post',
+               Permission.CUSTOMER_CREATE),
+    RouteEntry(Endpoint.CUSTOMERS_NAME, HTTPMethod.PATCH,
+               'CustomerProcessor', 'patch',
+               Permission.CUSTOMER_UPDATE),
+    RouteEntry(Endpoint.CUSTOMERS_NAME_ACTIVATE, HTTPMethod.POST,
+               'CustomerProcessor', 'activate',
+               Permission.CUSTOMER_ACTIVATE),
+    RouteEntry(Endpoint.CUSTOMERS_NAME_DEACTIVATE, HTTPMethod.POST,
+               'CustomerProcessor', 'deactivate',
+               Permission.CUSTOMER_DEACTIVATE),
+
+    # TenantProcessor
+    RouteEntry(Endpoint.TENANTS, HTTPMethod.GET,
+               'TenantProcessor', 'query',
+               Permission.TENANT_DESCRIBE),
+    RouteEntry(Endpoint.TENANTS_BATCH, HTTPMethod.POST,
+               'TenantProcessor', 'create_batch',
+               Permission.TENANT_CREATE, cost=10,
+               user_rpm=30, customer_rpm=60),
+    # must be matched before /tenants/{name}
+    RouteEntry(Endpoint.TENANTS_SETTINGS, HTTPMethod.GET,
+               'TenantSettingsProcessor', 'query_by_key',
+               Permission.TENANT_SETTING_DESCRIBE),
+    RouteEntry(Endpoint.TENANTS_STATS, HTTPMethod.GET,
+               'TenantProcessor', 'stats',
+               Permission.TENANT_DESCRIBE),
+    RouteEntry(Endpoint.TENANTS_NAME, HTTPMethod.GET,
+               'TenantProcessor', 'get',
+               Permission.TENANT_DESCRIBE),
+    RouteEntry(Endpoint.TENANTS, HTTPMethod.POST,
+               'TenantProcessor', 'create',
+               Permission.TENANT_CREATE),
+    RouteEntry(Endpoint.TENANTS_NAME_ACTIVATE, HTTPMethod.POST,
+               'TenantProcessor', 'activate',
+               Permission.TENANT_ACTIVATE),
+    RouteEntry(Endpoint.TENANTS_NAME_DEACTIVATE, HTTPMethod.POST,
+               'TenantProcessor', 'deactivate',
+               Permission.TENANT_DEACTIVATE),
+    RouteEntry(Endpoint.TENANTS_NAME, HTTPMethod.DELETE,
+               'TenantProcessor', 'delete',
+               Permission.TENANT_DELETE),
+
+    # TenantRegionProcessor
+    RouteEntry(Endpoint.TENANTS_NAME_REGIONS, HTTPMethod.GET,
+               'TenantRegionProcessor', 'get',
+               Permission.TENANT_DESCRIBE_REGION),
+    RouteEntry(Endpoint.TENANTS_NAME_REGIONS, HTTPMethod.POST,
+               'TenantRegionProcessor', 'post',
+               Permission.TENANT_CREATE_REGION),
+    RouteEntry(Endpoint.TENANTS_NAME_REGIONS, HTTPMethod.DELETE,
+               'TenantRegionProcessor', 'delete',
+               Permission.TENANT_DELETE_REGION),
+
+    # ApplicationProcessor
+    RouteEntry(Endpoint.APPLICATIONS_AWS_ROLE, HTTPMethod.POST,
+               'ApplicationProcessor', 'post_aws_role',
+               Permission.APPLICATION_CREATE),
+    RouteEntry(Endpoint.APPLICATIONS_AWS_CREDENTIALS, HTTPMethod.POST,
+               'ApplicationProcessor', 'post_aws_credentials',
+               Permission.APPLICATION_CREATE),
+    RouteEntry(Endpoint.APPLICATIONS_AZURE_CREDENTIALS, HTTPMethod.POST,
+               'ApplicationProcessor', 'post_azure_credentials',
+               Permission.APPLICATION_CREATE),
+    RouteEntry(Endpoint.APPLICATIONS_AZURE_CERTIFICATE, HTTPMethod.POST,
+               'ApplicationProcessor', 'post_azure_certificate',
+               Permission.APPLICATION_CREATE),
+    RouteEntry(Endpoint.APPLICATIONS_GCP_SERVICE_ACCOUNT, HTTPMethod.POST,
+               'ApplicationProcessor', 'post_gcp_service_account',
+               Permission.APPLICATION_CREATE),
+    RouteEntry(Endpoint.APPLICATIONS, HTTPMethod.GET,
+               'ApplicationProcessor', 'query',
+               Permission.APPLICATION_DESCRIBE),
+    # must be matched before /applications/{id}
+    RouteEntry(Endpoint.APPLICATIONS_STATS, HTTPMethod.GET,
+               'ApplicationProcessor', 'stats',
+               Permission.APPLICATION_DESCRIBE),
+    RouteEntry(Endpoint.APPLICATIONS_ID, HTTPMethod.GET,
+               'ApplicationProcessor', 'get',
+               Permission.APPLICATION_DESCRIBE),
+    RouteEntry(Endpoint.APPLICATIONS_ID, HTTPMethod.PATCH,
+               'ApplicationProcessor', 'patch',
+               Permission.APPLICATION_UPDATE),
+    RouteEntry(Endpoint.APPLICATIONS_ID, HTTPMethod.DELETE,
+               'ApplicationProcessor', 'delete',
+               Permission.APPLICATION_DELETE),
+
+    # RegionProcessor
+    RouteEntry(Endpoint.REGIONS, HTTPMethod.GET,
+               'RegionProcessor', 'query',
+               Permission.REGION_DESCRIBE),
+    RouteEntry(Endpoint.REGIONS_NAME, HTTPMethod.GET,
+               'RegionProcessor', 'get',
+               Permission.REGION_DESCRIBE),
+    RouteEntry(Endpoint.REGIONS, HTTPMethod.POST,
+               'RegionProcessor', 'post',
+               Permission.REGION_CREATE),
+    RouteEntry(Endpoint.REGIONS_NAME, HTTPMethod.DELETE,
+               'RegionProcessor', 'delete',
+               Permission.REGION_DELETE),
+
+    # TenantSettingsProcessor
+    RouteEntry(Endpoint.TENANTS_NAME_SETTINGS, HTTPMethod.GET,
+               'TenantSettingsProcessor', 'query',
+               Permission.TENANT_SETTING_DESCRIBE),
+    RouteEntry(Endpoint.TENANTS_NAME_SETTINGS, HTTPMethod.PUT,
+               'TenantSettingsProcessor', 'put',
+               Permission.TENANT_SETTING_SET),
+
+    # HealthCheckProcessor
+    RouteEntry(Endpoint.HEALTH_LIVE, HTTPMethod.GET,
+               'HealthCheckProcessor', 'get',
+               None, False),
+
+    # SwaggerProcessor
+    RouteEntry(Endpoint.DOC, HTTPMethod.GET,
+               'SwaggerProcessor', 'get',
+               None, False),
+    RouteEntry(Endpoint.DOC_SWAGGER_JSON, HTTPMethod.GET,
+               'SwaggerProcessor', 'get_spec',
+               None, False),
+
+    # UsersProcessor
+    RouteEntry(Endpoint.USERS_WHOAMI, HTTPMethod.GET,
+               'UsersProcessor', 'whoami',
+               Permission.USERS_GET_CALLER),
+    # must be matched before /users/{username}
+    RouteEntry(Endpoint.USERS_STATS, HTTPMethod.GET,
+               'UsersProcessor', 'stats',
+               Permission.USERS_DESCRIBE),
+    RouteEntry(Endpoint.USERS, HTTPMethod.GET,
+               'UsersProcessor', 'query',
+               Permission.USERS_DESCRIBE),
+    RouteEntry(Endpoint.USERS, HTTPMethod.POST,
+               'UsersProcessor', 'post',
+               Permission.USERS_CREATE),
+    RouteEntry(Endpoint.USERS_USERNAME, HTTPMethod.GET,
+               'UsersProcessor', 'get',
+               Permission.USERS_DESCRIBE),
+    RouteEntry(Endpoint.USERS_USERNAME, HTTPMethod.PATCH,
+               'UsersProcessor', 'patch',
+               Permission.USERS_UPDATE),
+    RouteEntry(Endpoint.USERS_USERNAME, HTTPMethod.DELETE,
+               'UsersProcessor', 'delete',
+               Permission.USERS_DELETE),
+    RouteEntry(Endpoint.SIGNUP, HTTPMethod.POST,
+               'UsersProcessor', 'signup',
+               None, False),
+    RouteEntry(Endpoint.SIGNIN, HTTPMethod.POST,
+               'UsersProcessor', 'signin',
+               None, False),
+    RouteEntry(Endpoint.REFRESH, HTTPMethod.POST,
+               'UsersProcessor', 'refresh',
+               None, False),
+    RouteEntry(Endpoint.USERS_RESET_PASSWORD, HTTPMethod.POST,
+               'UsersProcessor', 'reset_password',
+               Permission.USERS_RESET_PASSWORD),
+)
@@ -16,7 +16,13 @@ from typing import Any, Callable, Literal
 
 import pymongo
 from modular_sdk.commons.constants import Cloud, Env as ModularSDKEnv, DBBackend
-from modular_sdk.models.pynamongo.indexes_creator import IndexesCreator
+from modular_sdk.models.pynamongo.indexes_creator import (
+    IndexesCreator,
+    ensure_indexes,
+    extract_cmp_dict,
+    index_information_to_index_models,
+    iter_comparing,
+)
 
 from commons import dereference_json
 from commons.__version__ import __version__
@@ -48,6 +54,9 @@ DUMP_PERMISSIONS_ACTION = 'dump-permissions'
 CREATE_SYSTEM_USER_ACTION = 'create-system-user'
 UPDATE_DEPLOYMENT_RESOURCES_ACTION = 'update-deployment-resources'
 ACTIVATE_REGIONS_ACTION = 'activate-regions'
+PROFILE_STARTUP_ACTION = 'profile-startup'
+SYNC_TENANT_REGIONS_ACTION = 'sync-tenant-regions'
+SYNC_COUNTERS_ACTION = 'sync-counters'
 
 SYSTEM_USER = 'system_user'
 
@@ -117,6 +126,15 @@ def build_parser() -> argparse.ArgumentParser:
         help='Number of gunicorn workers. Must be specified only '
         'if --gunicorn flag is set',
     )
+    parser_run.add_argument(
+        '-nt',
+        '--threads',
+        type=int,
+        required=False,
+        help='Number of threads of each gunicorn worker. Concurrent '
+        'identical GET requests that come to one worker share one '
+        'execution. Must be specified only if --gunicorn flag is set',
+    )
     parser_run.add_argument(
         '--host',
         default=DEFAULT_HOST,
@@ -151,6 +169,63 @@ def build_parser() -> argparse.ArgumentParser:
         UPDATE_DEPLOYMENT_RESOURCES_ACTION,
         help='Updates api definition insider deployment_resources.json',
     )
+    _ = sub_parsers.add_parser(
+        SYNC_TENANT_REGIONS_ACTION,
+        help='Fills ModularServiceTenantRegions table from existing '
+        'tenants. Needed only for DynamoDB',
+    )
+    _ = sub_parsers.add_parser(
+        SYNC_COUNTERS_ACTION,
+        help='Recounts tenants, applications and users kept in DynamoDB '
+        'and Cognito and rewrites ModularServiceCounters table',
+    )
+
+    # profile-startup
+    parser_profile = sub_parsers.add_parser(
+        PROFILE_STARTUP_ACTION,
+        help='Measures cold start of the lambda handler in a fresh '
+        'interpreter: per-module import times, handler construction, '
+        'first request latency and time to first byte. Exits with '
+        'non-zero code if any of the given thresholds is exceeded',
+    )
+    parser_profile.add_argument(
+        '--path',
+        default='/health/live',
+        help='Endpoint without auth that is requested (default: %(default)s)',
+    )
+    parser_profile.add_argument(
+        '--top',
+        type=int,
+        default=20,
+        help='Number of the slowest modules to show (default: %(default)s)',
+    )
+    parser_profile.add_argument(
+        '--max-import',
+        type=float,
+        help='Threshold for handler module import time, ms',
+    )
+    parser_profile.add_argument(
+        '--max-construction',
+        type=float,
+        help='Threshold for handler construction time, ms',
+    )
+    parser_profile.add_argument(
+        '--max-first-request',
+        type=float,
+        help='Threshold for the first request latency, ms',
+    )
+    parser_profile.add_argument(
+        '--max-ttfb',
+        type=float,
+        help='Threshold for time from interpreter start till the first '
+        'response, ms',
+    )
+    parser_profile.add_argument(
+        '-f',
+        '--filename',
+        type=Path,
+        help='Optional file to write the report to as JSON',
+    )
     return parser
 
 
@@ -213,6 +288,7 @@ class Run(ActionHandler):
         port: int = DEFAULT_PORT,
         gunicorn: bool = False,
         workers: int | None = None,
+        threads: int | None = None,
     ):
         from onprem.app import OnPremApiBuilder
 
@@ -225,11 +301,19 @@ class Run(ActionHandler):
             _LOG.warning(
                 '--workers is ignored because you are not running Gunicorn'
             )
+        if not gunicorn and threads:
+            _LOG.warning(
+                '--threads is ignored because you are not running Gunicorn'
+            )
 
         os.environ[Env.SERVICE_MODE] = 'docker'
 
         stage = 'dev'  # todo get from somewhere
         app = OnPremApiBuilder().build(stage)
+        # shared memory buckets must be allocated by the master before
+        # gunicorn forks workers, otherwise each worker gets its own
+        from services import SP
+        SP.rate_limiter
 
         if gunicorn:
             workers = workers or DEFAULT_NUMBER_OF_WORKERS
@@ -238,6 +322,7 @@ class Run(ActionHandler):
             options = {
                 'bind': f'{host}:{port}',
                 'workers': workers,
+                'threads': threads,
                 'timeout': 60,
                 'max_requests': 512,
                 'max_requests_jitter': 64,
@@ -282,11 +367,35 @@ class CreateSystemUser(ActionHandler):
 class CreateIndexes(ActionHandler):
     @staticmethod
     def models() -> tuple:
+        from models.counter import Counter
+        from models.idempotency_key import IdempotencyKey
         from models.policy import Policy
+        from models.rate_limit_bucket import RateLimitBucket
         from models.role import Role
         from models.user import User
 
-        return Policy, Role, User
+        return Policy, Role, User, Counter, IdempotencyKey, RateLimitBucket
+
+    @staticmethod
+    def additional_indexes() -> dict:
+        """
+        Indexes of service models that cannot be declared as PynamoDB indexes
+        """
+        from models.user import User
+        from pymongo.operations import IndexModel
+
+        return {
+            User: (
+                # keyset pagination of users by customer
+                IndexModel(
+                    keys=[
+                        (User.customer.attr_name, pymongo.ASCENDING),
+                        ('_id', pymongo.ASCENDING),
+                    ],
+                    name='customer-id-index',
+                ),
+            ),
+        }
 
     @staticmethod
     def modular_sdk_models() -> tuple:
@@ -318,16 +427,191 @@ class CreateIndexes(ActionHandler):
             TenantSettings,
         )
 
+    @staticmethod
+    def modular_sdk_additional_indexes() -> dict:
+        """
+        Indexes that cannot be declared on modular sdk models
+        """
+        from modular_sdk.models.application import Application
+        from modular_sdk.models.customer import Customer
+        from modular_sdk.models.region import RegionAttr, RegionModel
+        from modular_sdk.models.tenant import Tenant
+        from modular_sdk.models.tenant_settings import TenantSettings
+        from pymongo.operations import IndexModel
+
+        return {
+            RegionModel: (
+                # regions are created with conditional upserts, these make
+                # concurrent creates of the same region fail. The primary
+                # index created by modular-sdk is not unique, and Mongo
+                # does not allow another index with the same keys, so
+                # these use different orders of keys
+                IndexModel(
+                    keys=[(RegionModel.maestro_name.attr_name,
+                           pymongo.DESCENDING)],
+                    name='r-unique-index',
+                    unique=True,
+                ),
+                IndexModel(
+                    keys=[
+                        (RegionModel.cloud.attr_name, pymongo.ASCENDING),
+                        (RegionModel.native_name.attr_name, pymongo.ASCENDING),
+                    ],
+                    name='c-nn-unique-index',
+                    unique=True,
+                ),
+                IndexModel(
+                    keys=[(RegionModel.region_id.attr_name, pymongo.ASCENDING)],
+                    name='rId-index',
+                    unique=True,
+                    partialFilterExpression={
+                        RegionModel.region_id.attr_name: {'$type': 'string'}
+                    },
+                ),
+            ),
+            Customer: (
+                # customers are created with conditional upserts, see
+                # regions' indexes
+                IndexModel(
+                    keys=[(Customer.name.attr_name, pymongo.DESCENDING)],
+                    name='n-unique-index',
+                    unique=True,
+                ),
+            ),
+            Tenant: (
+                # tenants are created with conditional upserts, see
+                # regions' indexes
+                IndexModel(
+                    keys=[(Tenant.name.attr_name, pymongo.DESCENDING)],
+                    name='n-unique-index',
+                    unique=True,
+                ),
+                IndexModel(
+                    keys=[(Tenant.project.attr_name, pymongo.DESCENDING)],
+                    name='acc-unique-index',
+                    unique=True,
+                    partialFilterExpression={
+                        Tenant.project.attr_name: {'$type': 'string'}
+                    },
+                ),
+                # multikey, tenants by activated region
+                IndexModel(
+                    keys=[
+                        (
+                            f'{Tenant.regions.attr_name}.'
+                            f'{RegionAttr.maestro_name.attr_name}',
+                            pymongo.ASCENDING,
+                        ),
+                        (Tenant.is_active.attr_name, pymongo.ASCENDING),
+                    ],
+                    name='r.r-act-index',
+                ),
+                # keyset pagination of tenants by customer
+                IndexModel(
+                    keys=[
+                        (Tenant.customer_name.attr_name, pymongo.ASCENDING),
+                        ('_id', pymongo.ASCENDING),
+                    ],
+                    name='ctmr-id-index',
+                ),
+                # prefix search of customer's tenants, one for each branch
+                # of the $or
+                IndexModel(
+                    keys=[
+                        (Tenant.customer_name.attr_name, pymongo.ASCENDING),
+                        (Tenant.display_name_to_lower.attr_name,
+                         pymongo.ASCENDING),
+                    ],
+                    name='ctmr-dntl-index',
+                ),
+                IndexModel(
+                    keys=[
+                        (Tenant.customer_name.attr_name, pymongo.ASCENDING),
+                        (Tenant.project.attr_name, pymongo.ASCENDING),
+                    ],
+                    name='ctmr-acc-index',
+                ),
+            ),
+            Application: (
+                # keyset pagination of applications by customer
+                IndexModel(
+                    keys=[
+                        (Application.customer_id.attr_name, pymongo.ASCENDING),
+                        (Application.type.attr_name, pymongo.ASCENDING),
+                        ('_id', pymongo.ASCENDING),
+                    ],
+                    name='cid-t-id-index',
+                ),
+            ),
+            TenantSettings: (
+                # keyset pagination of settings by key
+                IndexModel(
+                    keys=[
+                        (TenantSettings.key.attr_name, pymongo.ASCENDING),
+                        ('_id', pymongo.ASCENDING),
+                    ],
+                    name='k-id-index',
+                ),
+            ),
+        }
+
+    @staticmethod
+    def drop_changed(indexes, collection) -> None:
+        """
+        ensure_indexes skips an index if another one with the same name
+        exists. Drops such indexes if their options differ so that they
+        are created again
+        """
+        existing = {
+            index.document['name']: extract_cmp_dict(index)
+            for index in index_information_to_index_models(
+                collection.index_information()
+            )
+        }
+        for index in indexes:
+            name = index.document['name']
+            if name in existing and existing[name] != extract_cmp_dict(index):
+                _LOG.info(f'Options of index {name} changed, dropping it')
+                collection.drop_index(name)
+
+    @staticmethod
+    def missing(indexes, collection) -> list[str]:
+        """
+        ensure_indexes only logs the indexes it could not create, e.g.
+        unique ones that existing duplicates do not allow. Returns names
+        of the given indexes that the collection does not have
+        """
+        actual = tuple(index_information_to_index_models(
+            collection.index_information()
+        ))
+        return [
+            needed.document['name']
+            for needed, existing in iter_comparing(indexes, actual)
+            if existing is None
+        ]
+
     def __call__(self):
         _LOG.debug('Going to sync indexes with code')
         from models import PynamoDBToPymongoAdapterSingleton
         from modular_sdk.models.pynamongo.models import ModularBaseModel
 
+        failed = []
         if Env.is_docker():
             creator = IndexesCreator(db=PynamoDBToPymongoAdapterSingleton.get_instance().mongo_database)
+            additional = self.additional_indexes()
             for model in self.models():
                 _LOG.info(f'Going to sync indexes for {model.Meta.table_name}')
-                creator.sync(model)
+                indexes = additional.get(model, ())
+                creator.sync(model, always_keep=(
+                    '_id_', *(i.document['name'] for i in indexes)
+                ))
+                if indexes:
+                    collection = model.mongo_adapter().get_collection(model)
+                    ensure_indexes(indexes, collection)
+                    failed.extend(
+                        f'{model.Meta.table_name}.{name}'
+                        for name in self.missing(indexes, collection)
+                    )
         if ModularSDKEnv.DB_BACKEND.get() == DBBackend.MONGO:
             creator = IndexesCreator(db=ModularBaseModel.mongo_adapter().mongo_database)
             for model in self.modular_sdk_models():
@@ -344,6 +628,20 @@ class CreateIndexes(ActionHandler):
                         f'Could not ensure indexes for model {model.Meta.table_name}',
                         exc_info=True
                     )
+            for model, indexes in self.modular_sdk_additional_indexes().items():
+                _LOG.info(f'Going to ensure additional indexes for {model.Meta.table_name}')
+                collection = model.mongo_adapter().get_collection(model)
+                self.drop_changed(indexes, collection)
+                ensure_indexes(indexes, collection)
+                failed.extend(
+                    f'{model.Meta.table_name}.{name}'
+                    for name in self.missing(indexes, collection)
+                )
+        if failed:
+            _LOG.error(f'Indexes {", ".join(failed)} were not created. '
+                       f'Resolve the conflicts, e.g. duplicates of unique '
+                       f'keys, and run create-indexes again')
+            exit(1)
 
 
 class GenerateOpenApi(ActionHandler):
@@ -474,8 +772,9 @@ class ActivateRegions(ActionHandler):
             # TODO: this is definitely a kludge
             return
         rs = SP.region_service
+        existing = {region.maestro_name for region in rs.get_all_regions()}
         for region in AWS_REGIONS:
-            if rs.get_region(region_name=region):
+            if region in existing:
                 continue
             _LOG.debug(f'Activation {region}')
             # rs.create is too expensive
@@ -491,6 +790,219 @@ class ActivateRegions(ActionHandler):
         _LOG.info('Regions were created')
 
 
+class SyncTenantRegions(ActionHandler):
+    def __call__(self):
+        from modular_sdk.models.tenant import Tenant
+
+        from models.tenant_region import TenantRegion
+
+        if Tenant.is_mongo_model():
+            _LOG.warning(
+                'Tenants are kept in Mongo, their regions are indexed '
+                'by create-indexes'
+            )
+            return
+        existing = set()
+        with TenantRegion.batch_write() as batch:
+            for tenant in Tenant.scan(
+                attributes_to_get=(
+                    Tenant.name,
+                    Tenant.customer_name,
+                    Tenant.regions,
+                )
+            ):
+                for region in tenant.regions or ():
+                    batch.save(
+                        TenantRegion(
+                            region_name=region.maestro_name,
+                            tenant_name=tenant.name,
+                            customer_name=tenant.customer_name,
+                        )
+                    )
+                    existing.add((region.maestro_name, tenant.name))
+        removed = 0
+        with TenantRegion.batch_write() as batch:
+            for item in TenantRegion.scan(
+                attributes_to_get=(
+                    TenantRegion.region_name,
+                    TenantRegion.tenant_name,
+                )
+            ):
+                if (item.region_name, item.tenant_name) not in existing:
+                    batch.delete(item)
+                    removed += 1
+        _LOG.info(
+            f'{len(existing)} tenant regions were synced, '
+            f'{removed} stale ones were removed'
+        )
+
+
+class SyncCounters(ActionHandler):
+    def __call__(self):
+        from services import SP
+
+        written = SP.stats_service.recount()
+        _LOG.info(f'{written} counters were synced')
+
+
+class ProfileStartup(ActionHandler):
+    """
+    Each measurement is done in a fresh interpreter because everything
+    that matters for a cold start is cached after the first import
+    """
+
+    handler_module = 'lambdas.modular_api_handler.handler'
+    # executed in a child interpreter, prints the first response as soon
+    # as it is ready and then the collected metrics
+    script = """
+import json, sys, time
+start = time.perf_counter()
+import {module} as module
+imported = time.perf_counter()
+from services import SP
+SP.__dict__.clear()  # so that services are built again
+handler = module.ModularApiHandler()
+constructed = time.perf_counter()
+from commons import RequestContext
+event = {{
+    'httpMethod': 'GET',
+    'path': {path!r},
+    'headers': {{}},
+    'requestContext': {{'resourcePath': {path!r}, 'path': {path!r}}},
+}}
+code = handler.lambda_handler(event, RequestContext())['statusCode']
+first = time.perf_counter()
+print(code, flush=True)
+handler.lambda_handler(event, RequestContext())
+second = time.perf_counter()
+print(json.dumps({{
+    'import': (imported - start) * 1e3,
+    'construction': (constructed - imported) * 1e3,
+    'first_request': (first - constructed) * 1e3,
+    'warm_request': (second - first) * 1e3,
+    'status': code,
+}}), flush=True)
+"""
+
+    def _run(self, path: str, importtime: bool = False
+             ) -> tuple[dict, float, str]:
+        """
+        Returns metrics from the child, time to first byte in ms and stderr
+        """
+        import subprocess
+        import tempfile
+        import time
+
+        cmd = [sys.executable]
+        if importtime:
+            cmd.extend(('-X', 'importtime'))
+        cmd.extend(
+            ('-c', self.script.format(module=self.handler_module, path=path))
+        )
+        # stderr goes to a file: importtime output can overfill a pipe
+        # while we are waiting for the first line from stdout
+        with tempfile.TemporaryFile('w+') as stderr:
+            start = time.perf_counter()
+            proc = subprocess.Popen(
+                cmd,
+                cwd=Path(__file__).parent,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                text=True,
+            )
+            first_line = proc.stdout.readline()
+            ttfb = (time.perf_counter() - start) * 1e3
+            out = proc.stdout.read()
+            proc.wait()
+            stderr.seek(0)
+            err = stderr.read()
+        if proc.returncode or not first_line or not out.strip():
+            _LOG.error(f'Child interpreter failed:\n{err}')
+            exit(1)
+        return json.loads(out.strip().splitlines()[-1]), ttfb, err
+
+    @staticmethod
+    def _parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+        """
+        Parses output of "-X importtime". Returns tuples: module name,
+        self time and cumulative time in microseconds
+        """
+        res = []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            try:
+                self_us, cumulative_us, name = line[12:].split('|')
+                res.append((name.strip(), int(self_us), int(cumulative_us)))
+            except ValueError:  # header
+                continue
+        return res
+
+    def __call__(
+        self,
+        path: str,
+        top: int,
+        max_import: float | None = None,
+        max_construction: float | None = None,
+        max_first_request: float | None = None,
+        max_ttfb: float | None = None,
+        filename: Path | None = None,
+    ):
+        metrics, ttfb, _ = self._run(path)
+        metrics['ttfb'] = ttfb
+        _, _, err = self._run(path, importtime=True)
+        modules = self._parse_importtime(err)
+
+        packages: dict[str, int] = {}
+        for name, self_us, _ in modules:
+            root = name.lstrip().split('.')[0]
+            packages[root] = packages.get(root, 0) + self_us
+
+        print('Slowest modules (self time, cumulative time), ms:')
+        for name, self_us, cumulative_us in sorted(
+            modules, key=lambda x: x[1], reverse=True
+        )[:top]:
+            print(f'  {self_us / 1e3:>8.2f} {cumulative_us / 1e3:>8.2f}  '
+                  f'{name.strip()}')
+        print('Import time by top-level package, ms:')
+        for name, self_us in sorted(
+            packages.items(), key=lambda x: x[1], reverse=True
+        )[:top]:
+            print(f'  {self_us / 1e3:>8.2f}  {name}')
+
+        print(f'Handler module import:     {metrics["import"]:>8.2f} ms')
+        print(f'Handler construction:      {metrics["construction"]:>8.2f} ms')
+        print(f'First request ({metrics["status"]}):       '
+              f'{metrics["first_request"]:>8.2f} ms')
+        print(f'Warm request:              {metrics["warm_request"]:>8.2f} ms')
+        print(f'Time to first byte:        {metrics["ttfb"]:>8.2f} ms')
+
+        if filename:
+            with open(filename, 'w') as file:
+                json.dump({
+                    'metrics': metrics,
+                    'modules': [
+                        {'name': n.strip(), 'self_us': s, 'cumulative_us': c}
+                        for n, s, c in modules
+                    ],
+                    'packages': packages,
+                }, file, indent=2)
+
+        failed = False
+        for key, threshold in (
+            ('import', max_import),
+            ('construction', max_construction),
+            ('first_request', max_first_request),
+            ('ttfb', max_ttfb),
+        ):
+            if threshold is not None and metrics[key] > threshold:
+                _LOG.error(f'{key} took {metrics[key]:.2f} ms which exceeds '
+                           f'the threshold of {threshold} ms')
+                failed = True
+        if failed:
+            exit(1)
+
+
 def main(args: list[str] | None = None):
     parser = build_parser()
     arguments = parser.parse_args(args)
@@ -508,6 +1020,9 @@ def main(args: list[str] | None = None):
         (DUMP_PERMISSIONS_ACTION,): DumpPermissions(),
         (UPDATE_DEPLOYMENT_RESOURCES_ACTION,): UpdateDeploymentResources(),
         (ACTIVATE_REGIONS_ACTION,): ActivateRegions(),
+        (PROFILE_STARTUP_ACTION,): ProfileStartup(),
+        (SYNC_TENANT_REGIONS_ACTION,): SyncTenantRegions(),
+        (SYNC_COUNTERS_ACTION,): SyncCounters(),
     }
     func = mapping.get(key) or (lambda **kwargs: _LOG.error('Hello'))
     for dest in ALL_NESTING:
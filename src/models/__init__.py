@@ -1,6 +1,11 @@
 import pymongo
 from modular_sdk.models.pynamongo.adapter import PynamoDBToPymongoAdapter
+from modular_sdk.models.pynamongo.convertors import (
+    PynamoDBModelToMongoDictSerializer,
+)
 from modular_sdk.models.pynamongo.models import Model, SafeUpdateModel
+from pynamodb.attributes import Attribute
+from pynamodb.constants import LIST, STRING, STRING_SET
 
 from commons.constants import Env
 
@@ -15,6 +20,11 @@ class MongoClientSingleton:
         return cls._instance
 
 
+# converts models to Mongo documents and back the same way the adapter
+# does. It is stateless, so one instance is shared
+MONGO_SERIALIZER = PynamoDBModelToMongoDictSerializer()
+
+
 class PynamoDBToPymongoAdapterSingleton:
     _instance = None
 
@@ -29,6 +39,38 @@ class PynamoDBToPymongoAdapterSingleton:
         return cls._instance
 
 
+class UnicodeSetListAttribute(Attribute[list[str]]):
+    """
+    Sorted list of unique strings. DynamoDB keeps it as a string set, so
+    that values can be added and deleted with ADD and DELETE actions. The
+    Mongo adapter does not support sets, there it is an array. Items saved
+    to DynamoDB as lists before are read as well
+    """
+    null = True  # DynamoDB does not keep empty sets
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('default', list)
+        super().__init__(**kwargs)
+
+    @property
+    def attr_type(self) -> str:
+        return LIST if Env.is_docker() else STRING_SET
+
+    def serialize(self, value):
+        values = sorted(set(value))
+        if Env.is_docker():
+            return [{STRING: v} for v in values]
+        return values or None
+
+    def get_value(self, value: dict):
+        if LIST in value:
+            return [v[STRING] for v in value[LIST]]
+        return super().get_value(value)
+
+    def deserialize(self, value):
+        return sorted(set(value))
+
+
 class BaseModel(Model):
     @classmethod
     def is_mongo_model(cls) -> bool:
@@ -0,0 +1,21 @@
+from pynamodb.attributes import NumberAttribute, UnicodeAttribute
+
+from commons.constants import Env
+from models import BaseModel
+
+
+class Counter(BaseModel):
+    """
+    Number of customer's items with specific attributes, e.g. active AWS
+    tenants. DynamoDB cannot count items without reading them all so the
+    counters are updated whenever the items are written by this service.
+    Items kept in Mongo are counted with aggregation instead
+    """
+
+    class Meta:
+        table_name = 'ModularServiceCounters'
+        region = Env.AWS_REGION.get()
+
+    customer = UnicodeAttribute(hash_key=True, attr_name='c')
+    key = UnicodeAttribute(range_key=True, attr_name='k')  # tenants#AWS#active
+    value = NumberAttribute(default=0, attr_name='v')
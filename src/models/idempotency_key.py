@@ -0,0 +1,21 @@
+from pynamodb.attributes import TTLAttribute, UnicodeAttribute
+
+from commons.constants import Env
+from models import BaseModel
+
+
+class IdempotencyKey(BaseModel):
+    """
+    Response to the first request made by a user with specific
+    Idempotency-Key header. The response is empty while that request is
+    being processed
+    """
+
+    class Meta:
+        table_name = 'ModularServiceIdempotencyKeys'
+        region = Env.AWS_REGION.get()
+
+    id = UnicodeAttribute(hash_key=True, attr_name='id')  # user_id:key
+    fingerprint = UnicodeAttribute(attr_name='f')  # of method, path and body
+    response = UnicodeAttribute(null=True, attr_name='r')  # json
+    expire_at = TTLAttribute(attr_name='e')
@@ -0,0 +1,127 @@
+"""
+Write operations that need the same semantic for DynamoDB and Mongo but
+cannot be expressed through the common PynamoDB interface because the
+Mongo adapter ignores conditions
+"""
+from typing import TYPE_CHECKING, Any, Iterable
+
+from modular_sdk.models.pynamongo.convertors import (
+    convert_condition_expression,
+    convert_update_expression,
+    merge_update_expressions,
+)
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from pynamodb.exceptions import DeleteError, PutError, UpdateError
+from pynamodb.models import Model
+
+from models import MONGO_SERIALIZER
+
+if TYPE_CHECKING:
+    from pymongo.client_session import ClientSession
+    from pynamodb.expressions.condition import Condition
+    from pynamodb.expressions.update import Action
+
+CONDITIONAL_CHECK_FAILED = 'ConditionalCheckFailedException'
+# how many times to reload an item that is changed concurrently before
+# giving up on a conditional update
+CONDITIONAL_UPDATE_ATTEMPTS = 3
+
+
+def insert_if_not_exists(item: Model,
+                         unique: Iterable[dict[str, Any]] = (),
+                         session: 'ClientSession | None' = None) -> bool:
+    """
+    Saves the item only if there is no item with the same primary key.
+    Makes one request: PutItem with attribute_not_exists condition for
+    DynamoDB and upsert with $setOnInsert for Mongo. Returns False if the
+    item was not saved because it already exists
+    :param item:
+    :param unique: Mongo only. Additional filters of serialized attributes
+    that must not match any document, e.g. [{'acc': '123'}]. Make sure
+    each of them is covered by a unique index, otherwise concurrent
+    inserts are not rejected. DynamoDB cannot check attributes other than
+    the primary key in one request
+    :param session: Mongo only. Session of a transaction to insert within
+    """
+    if item.is_mongo_model():
+        adapter = item.mongo_adapter()
+        ser = MONGO_SERIALIZER
+        query = ser.instance_serialized_keys(item)
+        if unique:
+            query = {'$or': [query, *unique]}
+        try:
+            res = adapter.get_collection(item).update_one(
+                query, {'$setOnInsert': ser.serialize(item)}, upsert=True,
+                session=session
+            )
+        except DuplicateKeyError:  # unique index and concurrent insert
+            return False
+        if res.upserted_id is None:
+            return False
+        ser.set_mongo_id(item, res.upserted_id)
+        return True
+    try:
+        item.save(
+            condition=type(item)._hash_key_attribute().does_not_exist()
+        )
+    except PutError as e:
+        if e.cause_response_code == CONDITIONAL_CHECK_FAILED:
+            return False
+        raise
+    return True
+
+
+def update_if(item: Model, actions: list['Action'],
+              condition: 'Condition') -> bool:
+    """
+    Updates the item only if it exists and matches the condition. Makes
+    one request: UpdateItem with the condition for DynamoDB and
+    find_one_and_update with the condition added to the filter for Mongo.
+    Returns False if the item was not updated. The item is updated in
+    memory only if it was updated in the database
+    """
+    if item.is_mongo_model():
+        ser = MONGO_SERIALIZER
+        query = ser.instance_serialized_keys(item)
+        query.update(convert_condition_expression(condition))
+        doc = item.mongo_adapter().get_collection(item).find_one_and_update(
+            query,
+            merge_update_expressions(map(convert_update_expression, actions)),
+            return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            return False
+        ser.deserialize_to(item, doc)
+        return True
+    try:
+        item.update(
+            actions=actions,
+            condition=type(item)._hash_key_attribute().exists() & condition
+        )
+    except UpdateError as e:
+        if e.cause_response_code == CONDITIONAL_CHECK_FAILED:
+            return False
+        raise
+    return True
+
+
+def delete_if(item: Model, condition: 'Condition') -> bool:
+    """
+    Deletes the item only if it exists and matches the condition. Makes
+    one request. Returns False if the item was not deleted
+    """
+    if item.is_mongo_model():
+        query = MONGO_SERIALIZER.instance_serialized_keys(item)
+        query.update(convert_condition_expression(condition))
+        res = item.mongo_adapter().get_collection(item).delete_one(query)
+        return bool(res.deleted_count)
+    try:
+        item.delete(
+            condition=type(item)._hash_key_attribute().exists() & condition
+        )
+    except DeleteError as e:
+        if e.cause_response_code == CONDITIONAL_CHECK_FAILED:
+            return False
+        raise
+    return True
@@ -0,0 +1,272 @@
+"""
+Keyset pagination for list queries. PynamoDB's query and scan are used as
+they are for DynamoDB. The Mongo adapter emulates last evaluated key with
+an offset so each page costs skip(offset) plus count_documents over the
+whole result. Here the Mongo cursor is sorted by the key of the query and
+the next page starts right after the last returned item. The key of the
+last item is given back as last evaluated key, so the cost of a page does
+not depend on its number as long as the query is covered by an index
+(see CreateIndexes in main.py). Integer keys issued by the adapter are
+offsets in another order, so they are rejected with 400.
+DynamoDB applies the limit of a query before its filter. PynamoDB reads
+more pages to fill the page, but gives last evaluated key of the last read
+page even if nothing after it matches the filter, so the client gets an
+empty page. Filtered DynamoDB queries are wrapped to return the key only
+if one more item matches
+"""
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any, Iterator, TypeVar
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from modular_sdk.commons import ModularException
+from modular_sdk.models.pynamongo.convertors import (
+    convert_attributes_to_get,
+    convert_condition_expression,
+)
+from pymongo import ASCENDING
+from pynamodb.models import Model
+
+from commons.log_helper import get_logger
+from models import MONGO_SERIALIZER
+
+if TYPE_CHECKING:
+    from pymongo.cursor import Cursor
+    from pynamodb.expressions.condition import Condition
+    from pynamodb.indexes import Index
+    from pynamodb.pagination import ResultIterator
+
+    from modular_sdk.models.pynamongo.convertors import (
+        PynamoDBModelToMongoDictSerializer,
+    )
+
+_LOG = get_logger(__name__)
+_MT = TypeVar('_MT', bound=Model)
+
+MONGO_ID = '_id'
+
+
+class KeysetResultIterator(Iterator[_MT]):
+    """
+    Mocks ResultIterator from PynamoDB. The cursor must be limited to one
+    item more than the page so that the last evaluated key is returned
+    only if there is something after the page
+    """
+    __slots__ = ('_cursor', '_model', '_ser', '_keys', '_limit', '_count',
+                 '_last', '_more')
+
+    def __init__(self, cursor: 'Cursor', model: type[_MT],
+                 serializer: 'PynamoDBModelToMongoDictSerializer',
+                 keys: tuple[str, ...], limit: int | None = None):
+        self._cursor = cursor
+        self._model = model
+        self._ser = serializer
+        self._keys = keys
+        self._limit = limit
+        self._count = 0
+        self._last = None
+        self._more = False
+
+    def __iter__(self) -> 'KeysetResultIterator':
+        return self
+
+    def __next__(self) -> _MT:
+        if self._limit and self._count >= self._limit:
+            self._more = next(self._cursor, None) is not None
+            raise StopIteration
+        item = self._cursor.__next__()
+        self._count += 1
+        self._last = {key: item.get(key) for key in self._keys}
+        return self._ser.deserialize(self._model, item)
+
+    def next(self) -> _MT:
+        return self.__next__()
+
+    @property
+    def last_evaluated_key(self) -> dict | None:
+        if not self._more or self._last is None:
+            return None
+        return {
+            key: str(value) if isinstance(value, ObjectId) else value
+            for key, value in self._last.items()
+        }
+
+    @property
+    def total_count(self) -> int:
+        return self._count
+
+
+class FilteredResultIterator(Iterator[_MT]):
+    """
+    Wraps ResultIterator of a filtered DynamoDB query that is not limited
+    by PynamoDB, only its pages are. Stops after the limit and reads on
+    until one more item matches to know whether there is a next page
+    """
+    __slots__ = ('_it', '_limit', '_count', '_last', '_more')
+
+    def __init__(self, it: 'ResultIterator[_MT]', limit: int):
+        self._it = it
+        self._limit = limit
+        self._count = 0
+        self._last = None
+        self._more = False
+
+    def __iter__(self) -> 'FilteredResultIterator':
+        return self
+
+    def __next__(self) -> _MT:
+        if self._count >= self._limit:
+            self._more = next(self._it, None) is not None
+            raise StopIteration
+        item = self._it.__next__()
+        self._count += 1
+        if self._count == self._limit:
+            self._last = self._it.last_evaluated_key
+        return item
+
+    def next(self) -> _MT:
+        return self.__next__()
+
+    @property
+    def last_evaluated_key(self) -> dict | None:
+        if not self._more:
+            return None
+        return self._last
+
+    @property
+    def total_count(self) -> int:
+        return self._count
+
+
+def _seek(keys: tuple[str, ...], last_evaluated_key: dict) -> dict | None:
+    """
+    Filter that matches items after the given key in ascending order of
+    keys: (k1 > v1) or (k1 == v1 and k2 > v2) ...
+    """
+    values = []
+    for key in keys:
+        if key not in last_evaluated_key:
+            _LOG.warning(f'Last evaluated key does not contain {key}')
+            return None
+        value = last_evaluated_key[key]
+        if key == MONGO_ID:
+            try:
+                value = ObjectId(value)
+            except (InvalidId, TypeError):
+                _LOG.warning('Invalid _id in last evaluated key')
+                return None
+        values.append(value)
+    ors = []
+    for i, key in enumerate(keys):
+        cond = dict(zip(keys[:i], values[:i]))
+        cond[key] = {'$gt': values[i]}
+        ors.append(cond)
+    if len(ors) == 1:
+        return ors[0]
+    return {'$or': ors}
+
+
+def _find(model: type[_MT], query: dict, keys: tuple[str, ...],
+          limit: int | None, last_evaluated_key: dict | int | None,
+          attributes_to_get) -> KeysetResultIterator[_MT]:
+    filters = [query] if query else []
+    if isinstance(last_evaluated_key, int):
+        # offsets issued by the adapter before would skip or repeat items
+        raise ModularException(
+            code=HTTPStatus.BAD_REQUEST.value,
+            content='next_token was issued by a previous version and is not '
+                    'supported anymore. Start from the first page'
+        )
+    if isinstance(last_evaluated_key, dict):
+        if (seek := _seek(keys, last_evaluated_key)) is not None:
+            filters.append(seek)
+    match len(filters):
+        case 0:
+            q = {}
+        case 1:
+            q = filters[0]
+        case _:
+            q = {'$and': filters}
+    projection = convert_attributes_to_get(attributes_to_get)
+    if projection:
+        projection = list({*projection, *keys})
+    cursor = model.mongo_adapter().get_collection(model).find(
+        q,
+        projection=projection or None,
+        limit=limit + 1 if limit else 0,
+        sort=[(key, ASCENDING) for key in keys]
+    )
+    return KeysetResultIterator(cursor=cursor, model=model,
+                                serializer=MONGO_SERIALIZER, keys=keys,
+                                limit=limit)
+
+
+def _conditions(*conditions: 'Condition | None') -> dict:
+    q = {}
+    for condition in conditions:
+        if condition is not None:
+            q.update(convert_condition_expression(condition))
+    return q
+
+
+def query(model: type[_MT], hash_key: Any,
+          range_key_condition: 'Condition | None' = None,
+          filter_condition: 'Condition | None' = None,
+          index: 'Index | None' = None,
+          limit: int | None = None,
+          last_evaluated_key: dict | int | None = None,
+          attributes_to_get: list | None = None,
+          rate_limit: int | None = None) -> Iterator[_MT]:
+    """
+    Query of the model or of its index. Mongo results are sorted by range
+    key. Items of an index can have equal keys, so _id is added to them
+    """
+    if not model.is_mongo_model():
+        filtered = filter_condition is not None and bool(limit)
+        it = (index or model).query(
+            hash_key=hash_key,
+            range_key_condition=range_key_condition,
+            filter_condition=filter_condition,
+            limit=None if filtered else limit,
+            last_evaluated_key=last_evaluated_key,
+            attributes_to_get=attributes_to_get,
+            page_size=limit,
+            rate_limit=rate_limit
+        )
+        if filtered:
+            return FilteredResultIterator(it, limit)
+        return it
+    ser = MONGO_SERIALIZER
+    if index is not None:
+        h_attr, r_attr = ser.index_keys(index)
+        q = {h_attr.attr_name: h_attr.serialize(hash_key)}
+        keys = (MONGO_ID,)
+        if r_attr is not None:
+            keys = (r_attr.attr_name, MONGO_ID)
+    else:
+        h_name, r_name = ser.model_keys_names(model)
+        q = {h_name: ser.serialize_keys(model, hash_key, None)[0]}
+        keys = (r_name,) if r_name else (MONGO_ID,)
+    q.update(_conditions(range_key_condition, filter_condition))
+    return _find(model, q, keys, limit, last_evaluated_key,
+                 attributes_to_get)
+
+
+def scan(model: type[_MT], filter_condition: 'Condition | None' = None,
+         limit: int | None = None,
+         last_evaluated_key: dict | int | None = None,
+         attributes_to_get: list | None = None,
+         rate_limit: int | None = None) -> Iterator[_MT]:
+    """
+    Scan of the model. Mongo results are sorted by _id
+    """
+    if not model.is_mongo_model():
+        return model.scan(
+            filter_condition=filter_condition,
+            limit=limit,
+            last_evaluated_key=last_evaluated_key,
+            attributes_to_get=attributes_to_get,
+            rate_limit=rate_limit
+        )
+    return _find(model, _conditions(filter_condition), (MONGO_ID,), limit,
+                 last_evaluated_key, attributes_to_get)
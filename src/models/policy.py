@@ -1,7 +1,7 @@
-from pynamodb.attributes import UnicodeAttribute, ListAttribute
+from pynamodb.attributes import UnicodeAttribute
 
 from commons.constants import Env
-from models import BaseSafeUpdateModel
+from models import BaseSafeUpdateModel, UnicodeSetListAttribute
 
 
 class Policy(BaseSafeUpdateModel):
@@ -11,4 +11,4 @@ class Policy(BaseSafeUpdateModel):
 
     customer = UnicodeAttribute(hash_key=True)
     name = UnicodeAttribute(range_key=True)
-    permissions = ListAttribute(default=list, of=UnicodeAttribute)
+    permissions = UnicodeSetListAttribute()
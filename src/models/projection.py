@@ -0,0 +1,49 @@
+from http import HTTPStatus
+from typing import Iterable
+
+from modular_sdk.commons import ModularException
+from pynamodb.attributes import Attribute
+from pynamodb.models import Model
+
+
+class Projection:
+    """
+    Fields of DTOs a client asked for and attributes of the model that are
+    needed to build them. Attributes are given to PynamoDB as
+    attributes_to_get which becomes ProjectionExpression for DynamoDB and
+    projection for Mongo. Empty fields mean the whole items
+    """
+    __slots__ = '_fields', '_attributes'
+
+    def __init__(self, model: type[Model], fields: Iterable[str] = (),
+                 renamed: dict[str, str] | None = None):
+        """
+        :param model:
+        :param fields: keys of the DTOs
+        :param renamed: keys of DTO that differ from attribute names
+        of the model, e.g. {'account_id': 'project'}
+        """
+        to_field = {v: k for k, v in (renamed or {}).items()}
+        available = {to_field.get(name, name): name
+                     for name in model.get_attributes()}
+        self._fields = frozenset(fields)
+        unknown = self._fields - available.keys()
+        if unknown:
+            raise ModularException(
+                code=HTTPStatus.BAD_REQUEST.value,
+                content=f'Unknown fields: {", ".join(sorted(unknown))}. '
+                        f'Available: {", ".join(sorted(available))}'
+            )
+        attributes = model.get_attributes()
+        self._attributes = [
+            attributes[available[field]] for field in sorted(self._fields)
+        ]
+
+    @property
+    def attributes_to_get(self) -> list[Attribute] | None:
+        return self._attributes or None
+
+    def trim(self, dto: dict) -> dict:
+        if not self._fields:
+            return dto
+        return {k: v for k, v in dto.items() if k in self._fields}
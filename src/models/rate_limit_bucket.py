@@ -0,0 +1,19 @@
+from pynamodb.attributes import NumberAttribute, TTLAttribute, UnicodeAttribute
+
+from commons.constants import Env
+from models import BaseModel
+
+
+class RateLimitBucket(BaseModel):
+    """
+    State of a rate limit shared by all on-prem servers. Used only with
+    Mongo, see MongoRateLimitBackend
+    """
+
+    class Meta:
+        table_name = 'ModularServiceRateLimits'
+        region = Env.AWS_REGION.get()
+
+    id = UnicodeAttribute(hash_key=True, attr_name='id')  # user:<id>
+    tat = NumberAttribute(attr_name='t')  # theoretical arrival time
+    expire_at = TTLAttribute(attr_name='e')
@@ -1,8 +1,8 @@
 from commons.time_helper import utc_datetime
 from commons.constants import Env
-from pynamodb.attributes import UnicodeAttribute, ListAttribute
+from pynamodb.attributes import UnicodeAttribute
 
-from models import BaseSafeUpdateModel
+from models import BaseSafeUpdateModel, UnicodeSetListAttribute
 
 
 class Role(BaseSafeUpdateModel):
@@ -13,7 +13,7 @@ class Role(BaseSafeUpdateModel):
     customer = UnicodeAttribute(hash_key=True)
     name = UnicodeAttribute(range_key=True)
     expiration = UnicodeAttribute(null=True)  # ISO8601, valid to date
-    policies = ListAttribute(default=list, of=UnicodeAttribute)
+    policies = UnicodeSetListAttribute()
 
     @property
     def has_expired(self) -> bool:
@@ -0,0 +1,20 @@
+from pynamodb.attributes import UnicodeAttribute
+
+from commons.constants import Env
+from models import BaseModel
+
+
+class TenantRegion(BaseModel):
+    """
+    Tenants by activated region. DynamoDB cannot index maestro names
+    inside the list of tenant regions so this table duplicates them.
+    Not used with Mongo, tenants' regions are indexed there directly
+    """
+
+    class Meta:
+        table_name = 'ModularServiceTenantRegions'
+        region = Env.AWS_REGION.get()
+
+    region_name = UnicodeAttribute(hash_key=True, attr_name='r')
+    tenant_name = UnicodeAttribute(range_key=True, attr_name='t')
+    customer_name = UnicodeAttribute(attr_name='c')
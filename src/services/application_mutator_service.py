@@ -0,0 +1,47 @@
+from typing import Iterable, Iterator
+
+from modular_sdk.models.application import Application
+from modular_sdk.services.application_service import ApplicationService
+
+from models import pagination
+from models.projection import Projection
+
+
+class ApplicationMutatorService(ApplicationService):
+    @staticmethod
+    def projection(fields: Iterable[str]) -> Projection:
+        return Projection(Application, fields)
+
+    @staticmethod
+    def list(customer: str | None = None, _type: str | None = None,
+             deleted: bool | None = None,
+             limit: int | None = None,
+             last_evaluated_key: dict | int | None = None,
+             attributes_to_get: list | None = None
+             ) -> Iterator[Application]:
+        condition = None
+        rkc = None
+        if isinstance(deleted, bool):
+            condition &= Application.is_deleted == deleted
+        if isinstance(_type, str):
+            rkc &= Application.type == _type
+        if customer:
+            return pagination.query(
+                model=Application,
+                hash_key=customer,
+                range_key_condition=rkc,
+                filter_condition=condition,
+                index=Application.customer_id_type_index,
+                limit=limit,
+                last_evaluated_key=last_evaluated_key,
+                attributes_to_get=attributes_to_get
+            )
+        if rkc is not None:
+            condition &= rkc
+        return pagination.scan(
+            model=Application,
+            filter_condition=condition,
+            limit=limit,
+            last_evaluated_key=last_evaluated_key,
+            attributes_to_get=attributes_to_get
+        )
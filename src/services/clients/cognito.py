@@ -211,6 +211,16 @@ class BaseAuthClient(ABC):
                     ) -> UserWrapper:
         pass
 
+    def build_user_item(self, username: str, password: str,
+                        customer: str | None = None, role: str | None = None,
+                        is_system: bool = False) -> 'User | None':
+        """
+        Returns the item that keeps the user in the service's database so
+        that it can be saved together with other items instead of calling
+        signup_user. None if users are kept outside the database
+        """
+        return
+
     def does_user_exist(self, username: str) -> bool:
         """
         Use only if you don't need the user's data
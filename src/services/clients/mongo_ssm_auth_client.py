@@ -2,11 +2,10 @@ import json
 import secrets
 from datetime import timedelta
 from http import HTTPStatus
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator
 
 import bcrypt
 from jwcrypto import jwt
-from pynamodb.pagination import ResultIterator
 
 from commons.constants import (
     COGNITO_SUB,
@@ -21,7 +20,7 @@ from commons.constants import (
 from commons.lambda_response import ResponseFactory
 from commons.log_helper import get_logger
 from commons.time_helper import utc_datetime, utc_iso
-from models import MongoClientSingleton
+from models import MongoClientSingleton, pagination
 from models.user import User
 from services.clients.cognito import (
     AuthenticationResult,
@@ -47,7 +46,7 @@ UNAUTHORIZED_MESSAGE = 'Unauthorized'
 class MongoAndSSMUsersIterator(UsersIterator):
     __slots__ = ('_it',)
 
-    def __init__(self, it: ResultIterator[User]):
+    def __init__(self, it: Iterator[User]):
         self._it = it
 
     @property
@@ -108,8 +107,9 @@ class MongoAndSSMAuthClient(BaseAuthClient):
         fc = None
         if customer:
             fc = User.customer == customer
-        it = User.scan(
-            limit=limit, last_evaluated_key=next_token, filter_condition=fc
+        it = pagination.scan(
+            model=User, limit=limit, last_evaluated_key=next_token,
+            filter_condition=fc
         )
         return MongoAndSSMUsersIterator(it)
 
@@ -253,22 +253,34 @@ class MongoAndSSMAuthClient(BaseAuthClient):
         role: str | None = None,
         is_system: bool = False,
     ) -> UserWrapper:
-        created_at = utc_datetime()
-        user = User(
-            user_id=username,
-            customer=customer,
-            role=role,
-            is_system=is_system,
-            created_at=utc_iso(created_at),
+        user = self.build_user_item(
+            username, password, customer, role, is_system
         )
-        self._update_password_attr(user, password)
         user.save()
         return UserWrapper(
             username=username,
             customer=customer,
             role=role,
-            created_at=created_at,
+            created_at=utc_datetime(user.created_at),
+        )
+
+    def build_user_item(
+        self,
+        username: str,
+        password: str,
+        customer: str | None = None,
+        role: str | None = None,
+        is_system: bool = False,
+    ) -> User:
+        user = User(
+            user_id=username,
+            customer=customer,
+            role=role,
+            is_system=is_system,
+            created_at=utc_iso(),
         )
+        self._update_password_attr(user, password)
+        return user
 
     def decode_token(self, token: str) -> dict:
         try:
@@ -1,11 +1,76 @@
+import threading
+import time
+from typing import Iterable, Iterator
+
 from modular_sdk.models.customer import Customer
 from modular_sdk.services.customer_service import CustomerService
 from pynamodb.expressions.update import Action
 
+from models import pagination
+from models.projection import Projection
+from models.operations import insert_if_not_exists
+
+# customer that does not exist
+_MISSING = object()
+
 
 class CustomerMutatorService(CustomerService):
+    def __init__(self, state_ttl: float = 30, state_max_size: int = 10_000):
+        """
+        :param state_ttl: seconds to remember whether a customer exists
+        and whether it's active. Changes made via this service are
+        visible immediately, changes made by other workers after ttl
+        :param state_max_size: number of customers to remember
+        """
+        self._state_ttl = state_ttl
+        self._state_max_size = state_max_size
+        # name -> (expiration, is_active or _MISSING)
+        self._state: dict[str, tuple[float, object]] = {}
+        # incremented by each invalidation
+        self._version = 0
+        self._lock = threading.Lock()  # not held while reading the DB
+
+    def _get_state(self, name: str) -> object:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._state.get(name)
+            if cached and cached[0] > now:
+                return cached[1]
+            version = self._version
+        item = Customer.get_nullable(
+            hash_key=name,
+            attributes_to_get=[Customer.name, Customer.is_active]
+        )
+        state = _MISSING if item is None else item.is_active
+        with self._lock:
+            if version != self._version:
+                # changed while it was being read, the state may be outdated
+                return state
+            if len(self._state) >= self._state_max_size:
+                self._state.clear()
+            self._state[name] = (now + self._state_ttl, state)
+        return state
+
+    def does_exist(self, name: str, is_active: bool | None = None) -> bool:
+        """
+        Does not return the customer so the answer can be cached
+        :param name:
+        :param is_active: if None, this attribute is ignored. If bool,
+        customer's state must be equal to it
+        """
+        state = self._get_state(name)
+        if state is _MISSING:
+            return False
+        if isinstance(is_active, bool):
+            return bool(state) == is_active
+        return True
 
-    def build(self, name: str, display_name: str, 
+    def invalidate(self, name: str) -> None:
+        with self._lock:
+            self._version += 1
+            self._state.pop(name, None)
+
+    def build(self, name: str, display_name: str,
               admins: list[str] | None = None,
               is_active: bool = True) -> Customer:
         if not admins:
@@ -17,14 +82,23 @@ class CustomerMutatorService(CustomerService):
             is_active=is_active
         )
 
-    @staticmethod
-    def save(customer: Customer):
+    def save(self, customer: Customer):
         customer.save()
+        self.invalidate(customer.name)
 
-    @staticmethod
-    def update(customer: Customer, actions: list[Action]) -> None:
+    def insert(self, customer: Customer) -> bool:
+        """
+        Saves a new customer with one request. Returns False if a customer
+        with such name already exists
+        """
+        inserted = insert_if_not_exists(customer)
+        self.invalidate(customer.name)
+        return inserted
+
+    def update(self, customer: Customer, actions: list[Action]) -> None:
         if actions:
             customer.update(actions=actions)
+            self.invalidate(customer.name)
 
     def activate(self, customer: Customer) -> None:
         if customer.is_active:
@@ -45,3 +119,29 @@ class CustomerMutatorService(CustomerService):
                 Customer.is_active.set(False),
             ]
         )
+
+    @staticmethod
+    def projection(fields: Iterable[str]) -> Projection:
+        return Projection(Customer, fields)
+
+    @staticmethod
+    def i_get_customer(attributes_to_get: list | None = None,
+                       is_active: bool | None = None,
+                       name: str | None = None,
+                       limit: int | None = None,
+                       last_evaluated_key: dict | int | None = None,
+                       rate_limit: int | None = None
+                       ) -> Iterator[Customer]:
+        condition = None
+        if isinstance(is_active, bool):
+            condition &= Customer.is_active == is_active
+        if name:
+            condition &= Customer.name == name
+        return pagination.scan(
+            model=Customer,
+            filter_condition=condition,
+            limit=limit,
+            last_evaluated_key=last_evaluated_key,
+            attributes_to_get=attributes_to_get,
+            rate_limit=rate_limit
+        )
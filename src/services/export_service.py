@@ -0,0 +1,134 @@
+import uuid
+from http import HTTPStatus
+from itertools import chain
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from commons.constants import NDJSON_CONTENT_TYPE, Env
+from commons.lambda_response import (
+    JsonLambdaResponse,
+    LambdaOutput,
+    NdjsonResponse,
+    ResponseFactory,
+)
+from commons.log_helper import get_logger
+
+if TYPE_CHECKING:
+    from commons.abstract_lambda import ProcessedEvent
+
+_LOG = get_logger(__name__)
+
+# S3 requires all the parts of a multipart upload except the last one to
+# be at least 5mb. This is also the amount of memory an export takes
+PART_SIZE = 8 << 20
+
+EXPORT_DESCRIPTION = (
+    f'Send Accept: {NDJSON_CONTENT_TYPE} header to get all the items as '
+    f'newline-delimited JSON, limit and next_token are ignored then. The '
+    f'on-prem server streams the items, Lambda redirects to a presigned url'
+)
+EXPORT_RESPONSE = (HTTPStatus.SEE_OTHER, None,
+                   'Location header contains a presigned url of the export')
+
+
+class ExportService:
+    """
+    Sends all the items of a collection as newline-delimited JSON to
+    clients that ask for it with Accept header. The on-prem server streams
+    the lines directly from a DB cursor. Lambda cannot return more than 6mb
+    so there the lines are uploaded to S3 part by part and the client is
+    redirected to a presigned url of that object
+    """
+
+    def __init__(self, bucket_name: str | None, url_expiration: int = 3600):
+        self._bucket_name = bucket_name
+        self._url_expiration = url_expiration
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            # boto3 is imported here because it's too heavy for cold start
+            import boto3
+            self._client = boto3.client('s3', region_name=Env.AWS_REGION.get())
+        return self._client
+
+    @staticmethod
+    def is_requested(event: 'ProcessedEvent') -> bool:
+        for key, value in (event.get('headers') or {}).items():
+            if key.lower() == 'accept' and NDJSON_CONTENT_TYPE in str(value):
+                return True
+        return False
+
+    @staticmethod
+    def _iter_parts(lines: Iterator[bytes]) -> Iterator[bytes]:
+        buffer = bytearray()
+        for line in lines:
+            buffer += line
+            if len(buffer) >= PART_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+
+    def _upload(self, key: str, lines: Iterator[bytes]) -> None:
+        bucket = self._bucket_name
+        parts = self._iter_parts(lines)
+        first = next(parts, b'')
+        second = next(parts, None)
+        if second is None:
+            self.client.put_object(Bucket=bucket, Key=key, Body=first,
+                                   ContentType=NDJSON_CONTENT_TYPE)
+            return
+        upload_id = self.client.create_multipart_upload(
+            Bucket=bucket, Key=key, ContentType=NDJSON_CONTENT_TYPE
+        )['UploadId']
+        try:
+            uploaded = [
+                self._upload_part(key, upload_id, number, body)
+                for number, body in enumerate(chain((first, second), parts),
+                                              start=1)
+            ]
+            self.client.complete_multipart_upload(
+                Bucket=bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={'Parts': uploaded}
+            )
+        except Exception:
+            _LOG.exception('Could not upload the export, aborting')
+            self.client.abort_multipart_upload(Bucket=bucket, Key=key,
+                                               UploadId=upload_id)
+            raise
+
+    def _upload_part(self, key: str, upload_id: str, number: int,
+                     body: bytes) -> dict:
+        etag = self.client.upload_part(
+            Bucket=self._bucket_name, Key=key, UploadId=upload_id,
+            PartNumber=number, Body=body
+        )['ETag']
+        return {'ETag': etag, 'PartNumber': number}
+
+    def respond(self, items: Iterable[dict], name: str) -> LambdaOutput:
+        """
+        :param items: dtos, better a lazy iterator over a DB cursor
+        :param name: name of the collection, used in S3 key
+        """
+        response = NdjsonResponse(items)
+        if Env.is_docker():
+            return response.build()
+        if not self._bucket_name:
+            raise ResponseFactory(HTTPStatus.NOT_IMPLEMENTED).message(
+                f'{NDJSON_CONTENT_TYPE} is not available because '
+                f'{Env.EXPORTS_BUCKET_NAME.value} is not configured'
+            ).exc()
+        key = f'exports/{name}/{uuid.uuid4()}.ndjson'
+        _LOG.info(f'Uploading export to {key}')
+        self._upload(key, response.iter_lines())
+        url = self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self._bucket_name, 'Key': key},
+            ExpiresIn=self._url_expiration
+        )
+        return JsonLambdaResponse(
+            code=HTTPStatus.SEE_OTHER,
+            content={'url': url},
+            headers={'Location': url}
+        ).build()
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Callable
+
+from modular_sdk.commons.exception import ModularException
+from pynamodb.exceptions import DeleteError
+
+from commons.constants import IDEMPOTENCY_KEY_HEADER
+from commons.lambda_response import (
+    LambdaForceExit,
+    LambdaOutput,
+    ResponseFactory,
+)
+from commons.log_helper import get_logger
+from models.idempotency_key import IdempotencyKey
+from models.operations import CONDITIONAL_CHECK_FAILED, insert_if_not_exists
+
+if TYPE_CHECKING:
+    from commons.abstract_lambda import ProcessedEvent
+
+_LOG = get_logger(__name__)
+
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+class IdempotencyService:
+    """
+    Makes retries of a request with the same Idempotency-Key header safe.
+    The first request claims the key and its response is stored. Retries
+    get that response without executing the action again. A retry that
+    comes while the first request is still being processed waits for it.
+    Server errors are not stored so that they can be retried
+    """
+
+    def __init__(self, ttl: float = 86400, lock_ttl: float = 60,
+                 wait: float = 10, poll_interval: float = 0.1):
+        """
+        :param ttl: seconds to keep the responses
+        :param lock_ttl: seconds after which the key of a request that
+        never finished (crashed worker) can be claimed again
+        :param wait: seconds to wait for a concurrent request with the
+        same key
+        :param poll_interval:
+        """
+        self._ttl = ttl
+        self._lock_ttl = lock_ttl
+        self._wait = wait
+        self._poll_interval = poll_interval
+
+    @staticmethod
+    def get_key(event: 'ProcessedEvent') -> str | None:
+        expected = IDEMPOTENCY_KEY_HEADER.lower()
+        for key, value in (event.get('headers') or {}).items():
+            if key.lower() == expected and value:
+                return str(value)
+        return None
+
+    @staticmethod
+    def fingerprint(event: 'ProcessedEvent') -> str:
+        return hashlib.sha256(json.dumps(
+            [event['method'], event['path'], event['body']],
+            sort_keys=True,
+            separators=(',', ':'),
+            default=str
+        ).encode()).hexdigest()
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    def _is_expired(self, item: IdempotencyKey) -> bool:
+        return item.expire_at <= self._now()
+
+    def _delete_expired(self, item: IdempotencyKey) -> None:
+        """
+        Expired items are removed by DynamoDB and Mongo some time later.
+        The condition prevents deleting the item if someone else has just
+        claimed the key
+        """
+        now = self._now()
+        if IdempotencyKey.is_mongo_model():
+            adapter = IdempotencyKey.mongo_adapter()
+            adapter.get_collection(IdempotencyKey).delete_one({
+                IdempotencyKey.id.attr_name: item.id,
+                IdempotencyKey.expire_at.attr_name: {'$lte': now}
+            })
+            return
+        try:
+            item.delete(condition=IdempotencyKey.expire_at <= now)
+        except DeleteError as e:
+            if e.cause_response_code != CONDITIONAL_CHECK_FAILED:
+                raise
+
+    def _claim(self, _id: str, fingerprint: str) -> IdempotencyKey | None:
+        item = IdempotencyKey(
+            id=_id,
+            fingerprint=fingerprint,
+            expire_at=self._now() + timedelta(seconds=self._lock_ttl)
+        )
+        if insert_if_not_exists(item):
+            return item
+        return None
+
+    def _stored(self, item: IdempotencyKey, fingerprint: str) -> LambdaOutput:
+        if item.fingerprint != fingerprint:
+            raise ResponseFactory(HTTPStatus.UNPROCESSABLE_ENTITY).message(
+                f'{IDEMPOTENCY_KEY_HEADER} was already used with a different '
+                f'request'
+            ).exc()
+        output = json.loads(item.response)
+        output['headers'][REPLAYED_HEADER] = 'true'
+        return output
+
+    def _acquire(self, _id: str, fingerprint: str
+                 ) -> IdempotencyKey | LambdaOutput:
+        """
+        Returns either the claimed key or the stored response of the
+        first request
+        """
+        deadline = time.monotonic() + self._wait
+        while True:
+            if claimed := self._claim(_id, fingerprint):
+                return claimed
+            item = IdempotencyKey.get_nullable(hash_key=_id)
+            if item is None:
+                continue  # released just now
+            if self._is_expired(item):
+                _LOG.info('Idempotency key has expired, claiming again')
+                self._delete_expired(item)
+                continue
+            if item.response is not None:
+                _LOG.info('Returning the stored response')
+                return self._stored(item, fingerprint)
+            if time.monotonic() >= deadline:
+                raise ResponseFactory(HTTPStatus.CONFLICT).message(
+                    f'A request with the same {IDEMPOTENCY_KEY_HEADER} is '
+                    f'still being processed. Retry later'
+                ).exc()
+            time.sleep(self._poll_interval)
+
+    def _complete(self, item: IdempotencyKey, output: LambdaOutput) -> None:
+        if (output['statusCode'] >= HTTPStatus.INTERNAL_SERVER_ERROR
+                or not isinstance(output['body'], str)):
+            _LOG.info('The response is not stored, releasing the key')
+            item.delete()
+            return
+        item.update(actions=[
+            IdempotencyKey.response.set(json.dumps(output, default=str)),
+            IdempotencyKey.expire_at.set(
+                self._now() + timedelta(seconds=self._ttl)
+            )
+        ])
+
+    def execute(self, event: 'ProcessedEvent', key: str,
+                func: Callable[[], LambdaOutput]) -> LambdaOutput:
+        """
+        Calls the function once per user and key
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise ResponseFactory(HTTPStatus.BAD_REQUEST).message(
+                f'{IDEMPOTENCY_KEY_HEADER} must be at most {MAX_KEY_LENGTH} '
+                f'characters long'
+            ).exc()
+        acquired = self._acquire(
+            _id=f'{event["cognito_user_id"]}:{key}',
+            fingerprint=self.fingerprint(event)
+        )
+        if not isinstance(acquired, IdempotencyKey):
+            return acquired
+        try:
+            output = func()
+        except LambdaForceExit as e:
+            output = e.build()
+        except ModularException as e:
+            output = ResponseFactory(int(e.code)).message(e.content).build()
+        except Exception:
+            acquired.delete()
+            raise
+        self._complete(acquired, output)
+        return output
@@ -0,0 +1,255 @@
+"""
+Token buckets kept as GCRA (generic cell rate algorithm): instead of the
+number of tokens and the time of the last refill each bucket stores only
+the time when it becomes full again (theoretical arrival time). A request
+that takes `cost` tokens moves that time `cost / rate` seconds forward and
+is rejected if it would be more than `burst / rate` seconds ahead of now.
+One number per bucket makes it easy to keep buckets in shared memory or
+update them with compare-and-set in Mongo
+"""
+import multiprocessing
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from pymongo.errors import DuplicateKeyError
+
+from commons.log_helper import get_logger
+from models.rate_limit_bucket import RateLimitBucket
+
+_LOG = get_logger(__name__)
+
+
+class RateLimit(NamedTuple):
+    rate: float  # tokens per second
+    burst: float  # size of the bucket
+
+    @property
+    def interval(self) -> float:
+        return 1 / self.rate
+
+    @property
+    def tolerance(self) -> float:
+        return self.burst / self.rate
+
+
+def _next_tat(tat: float | None, now: float, limit: RateLimit,
+              cost: float) -> tuple[float, float]:
+    """
+    Returns new theoretical arrival time and seconds to wait. The new time
+    must be stored only if there is no need to wait
+    """
+    new = max(tat or now, now) + cost * limit.interval
+    wait = new - limit.tolerance - now
+    return new, wait if wait > 1e-6 else 0.  # float error of the sums
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    def acquire(self, key: str, limit: RateLimit, cost: float = 1
+                ) -> float:
+        """
+        Takes tokens from the bucket. Returns 0 if they are taken,
+        otherwise the number of seconds after which they will be available
+        """
+
+    @abstractmethod
+    def release(self, key: str, limit: RateLimit, cost: float = 1) -> None:
+        """
+        Returns tokens that were taken but not used to the bucket
+        """
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Buckets of one process. Each worker limits requests independently
+    """
+
+    def __init__(self, max_size: int = 100_000):
+        self._buckets: dict[str, float] = {}
+        self._max_size = max_size
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, limit: RateLimit, cost: float = 1
+                ) -> float:
+        now = time.time()
+        with self._lock:
+            tat, wait = _next_tat(self._buckets.get(key), now, limit, cost)
+            if wait:
+                return wait
+            if len(self._buckets) >= self._max_size:
+                self._buckets.clear()
+            self._buckets[key] = tat
+            return 0.
+
+    def release(self, key: str, limit: RateLimit, cost: float = 1) -> None:
+        with self._lock:
+            if key in self._buckets:
+                self._buckets[key] -= cost * limit.interval
+
+
+class SharedMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Buckets in shared memory of all gunicorn workers. Must be created
+    before the workers are forked. Keys are hashed into a fixed number of
+    slots, keys that collide share a bucket
+    """
+
+    def __init__(self, size: int = 16_384):
+        self._size = size
+        self._tats = multiprocessing.Array('d', size)  # zeros, with lock
+
+    def acquire(self, key: str, limit: RateLimit, cost: float = 1
+                ) -> float:
+        now = time.time()
+        slot = zlib.crc32(key.encode()) % self._size
+        with self._tats.get_lock():
+            tat, wait = _next_tat(self._tats[slot], now, limit, cost)
+            if not wait:
+                self._tats[slot] = tat
+            return wait
+
+    def release(self, key: str, limit: RateLimit, cost: float = 1) -> None:
+        slot = zlib.crc32(key.encode()) % self._size
+        with self._tats.get_lock():
+            self._tats[slot] -= cost * limit.interval
+
+
+class MongoRateLimitBackend(RateLimitBackend):
+    """
+    Buckets shared by all the servers. Each bucket is updated with
+    compare-and-set on its previous value
+    """
+    attempts = 3
+
+    def acquire(self, key: str, limit: RateLimit, cost: float = 1
+                ) -> float:
+        # not kept because the client must not be created before fork
+        collection = RateLimitBucket.mongo_adapter().get_collection(
+            RateLimitBucket
+        )
+        id_ = RateLimitBucket.id.attr_name
+        tat_ = RateLimitBucket.tat.attr_name
+        for _ in range(self.attempts):
+            now = time.time()
+            doc = collection.find_one({id_: key})
+            old = doc[tat_] if doc else None
+            tat, wait = _next_tat(old, now, limit, cost)
+            if wait:
+                return wait
+            expire_at = datetime.fromtimestamp(tat, timezone.utc)
+            if doc is None:
+                try:
+                    collection.insert_one({
+                        id_: key, tat_: tat,
+                        RateLimitBucket.expire_at.attr_name: expire_at
+                    })
+                    return 0.
+                except DuplicateKeyError:
+                    continue
+            res = collection.update_one({id_: key, tat_: old}, {'$set': {
+                tat_: tat,
+                RateLimitBucket.expire_at.attr_name: expire_at
+            }})
+            if res.modified_count:
+                return 0.
+        _LOG.warning(f'Bucket {key} is updated concurrently too often')
+        return cost * limit.interval
+
+    def release(self, key: str, limit: RateLimit, cost: float = 1) -> None:
+        RateLimitBucket.mongo_adapter().get_collection(
+            RateLimitBucket
+        ).update_one(
+            {RateLimitBucket.id.attr_name: key},
+            {'$inc': {RateLimitBucket.tat.attr_name: -cost * limit.interval}}
+        )
+
+
+class RouteLimit(NamedTuple):
+    """
+    Limits of requests to one route, kept in buckets of their own so that
+    a hot route is limited without limiting the others. Each request takes
+    one token from them
+    """
+    route: str  # e.g. 'POST /tenants/batch'
+    user: RateLimit | None = None
+    customer: RateLimit | None = None
+
+    @classmethod
+    def per_minute(cls, route: str, user: int | None = None,
+                   customer: int | None = None) -> 'RouteLimit':
+        """
+        All requests of a minute can be made at once
+        """
+        return cls(
+            route=route,
+            user=RateLimit(user / 60, user) if user else None,
+            customer=RateLimit(customer / 60, customer) if customer else None
+        )
+
+
+class RateLimiter:
+    """
+    Requests of a user take tokens from both the user's and the
+    customer's buckets and from the buckets of the route if it has its own
+    limits. A request rejected by one of them takes nothing
+    """
+
+    def __init__(self, backend: RateLimitBackend, user_limit: RateLimit,
+                 customer_limit: RateLimit):
+        self._backend = backend
+        self._user_limit = user_limit
+        self._customer_limit = customer_limit
+
+    def acquire(self, user: str, customer: str | None, cost: float = 1,
+                route: RouteLimit | None = None) -> float:
+        """
+        Returns 0 if the request is allowed, otherwise seconds to wait
+        """
+        buckets = [(f'user:{user}', self._user_limit, cost)]
+        if customer:
+            buckets.append((f'customer:{customer}', self._customer_limit,
+                            cost))
+        if route and route.user:
+            buckets.append((f'user:{user}:{route.route}', route.user, 1))
+        if route and route.customer and customer:
+            buckets.append((f'customer:{customer}:{route.route}',
+                            route.customer, 1))
+        taken = []
+        for key, limit, tokens in buckets:
+            wait = self._backend.acquire(key, limit, tokens)
+            if wait:  # tokens are not spent on a rejected request
+                for args in taken:
+                    self._backend.release(*args)
+                return wait
+            taken.append((key, limit, tokens))
+        return 0.
+
+
+BACKENDS: dict[str, type[RateLimitBackend]] = {
+    'memory': InMemoryRateLimitBackend,
+    'shared': SharedMemoryRateLimitBackend,
+    'mongo': MongoRateLimitBackend,
+}
+
+
+def build_rate_limiter(backend: str, user_rate: float, customer_rate: float,
+                       burst_seconds: float = 2) -> RateLimiter:
+    """
+    :param backend: one of BACKENDS
+    :param user_rate: requests per second of one user
+    :param customer_rate: requests per second of all users of a customer
+    :param burst_seconds: buckets hold tokens for this many seconds
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown rate limit backend: {backend}. '
+                         f'Available: {", ".join(BACKENDS)}')
+    return RateLimiter(
+        backend=BACKENDS[backend](),
+        user_limit=RateLimit(user_rate, user_rate * burst_seconds),
+        customer_limit=RateLimit(customer_rate,
+                                 customer_rate * burst_seconds)
+    )
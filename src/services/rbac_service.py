@@ -1,15 +1,45 @@
 from datetime import datetime
+from http import HTTPStatus
 from itertools import chain
-from typing import Generator
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+    TypedDict,
+    TypeVar,
+)
 
-from pynamodb.pagination import ResultIterator
+from modular_sdk.commons import ModularException
+from pymongo import ReturnDocument
+from pynamodb.constants import LIST
+from pynamodb.expressions.operand import Path
 
 from commons.constants import Permission
 from commons.time_helper import utc_iso
+from models import MONGO_SERIALIZER, UnicodeSetListAttribute, pagination
+from models.operations import (
+    CONDITIONAL_UPDATE_ATTEMPTS,
+    insert_if_not_exists,
+    update_if,
+)
 from models.policy import Policy
 from models.role import Role
 from modular_sdk.models.pynamongo.convertors import instance_as_dict
 
+if TYPE_CHECKING:
+    from pynamodb.expressions.update import Action
+
+RBACItem = TypeVar('RBACItem', Role, Policy)
+
+
+class RBACChanges(TypedDict):
+    created: list[str]
+    updated: list[str]
+    deleted: list[str]
+    unchanged: list[str]
+
 
 class RBACService:
     @staticmethod
@@ -35,6 +65,156 @@ class RBACService:
     def save(item: Role | Policy) -> None:
         item.save()
 
+    @staticmethod
+    def insert(item: Role | Policy) -> bool:
+        """
+        Saves a new item with one request. Returns False if an item with
+        such name already exists within the customer
+        """
+        return insert_if_not_exists(item)
+
+    @staticmethod
+    def _patch_mongo(model: type[Role | Policy], customer: str, name: str,
+                     attribute: UnicodeSetListAttribute, to_attach: set[str],
+                     to_detach: set[str], replace: bool,
+                     to_set: dict[str, object]
+                     ) -> Role | Policy | None:
+        collection = model.mongo_adapter().get_collection(model)
+        attributes = model.get_attributes()
+        keys = {model.customer.attr_name: customer,
+                model.name.attr_name: name}
+        attr = attribute.attr_name
+        if replace:
+            update = {'$set': {
+                attr: sorted(to_attach),
+                **{attributes[n].attr_name: value
+                   for n, value in to_set.items()}
+            }}
+        else:
+            # $pull and $addToSet cannot change the same field in one
+            # update, so the pipeline removes both detached and attached
+            # values and then appends the attached ones
+            update = [{'$set': {
+                attr: {'$concatArrays': [
+                    {'$filter': {
+                        'input': {'$ifNull': [f'${attr}', []]},
+                        'as': 'v',
+                        'cond': {'$not': {'$in': [
+                            '$$v', {'$literal': sorted(to_attach | to_detach)}
+                        ]}}
+                    }},
+                    {'$literal': sorted(to_attach)}
+                ]},
+                **{attributes[n].attr_name: {'$literal': value}
+                   for n, value in to_set.items()}
+            }}]
+        doc = collection.find_one_and_update(
+            keys, update, return_document=ReturnDocument.AFTER
+        )
+        if not doc:
+            return
+        return MONGO_SERIALIZER.deserialize(model, doc)
+
+    @staticmethod
+    def _patch_dynamodb(model: type[Role | Policy], customer: str, name: str,
+                        attribute: UnicodeSetListAttribute,
+                        to_attach: set[str], to_detach: set[str],
+                        replace: bool, to_set: dict[str, object]
+                        ) -> Role | Policy | None:
+        """
+        Values are added and deleted with ADD and DELETE actions of one
+        update. DynamoDB does not allow both actions on one attribute in
+        an update, so if values are attached and detached at once, the new
+        set is written conditioned on the old one. Items that keep the
+        attribute as a list are converted to a set once
+        """
+        attributes = model.get_attributes()
+
+        def values(item: Role | Policy) -> set[str]:
+            python_name = model._dynamo_to_python_attr(attribute.attr_name)
+            return set(getattr(item, python_name) or ())
+
+        def set_values(new: set[str]) -> 'Action':
+            return attribute.set(new) if new else attribute.remove()
+
+        for _ in range(CONDITIONAL_UPDATE_ATTEMPTS):
+            actions = [attributes[n].set(value)
+                       for n, value in to_set.items()]
+            condition = attribute.is_type() | attribute.does_not_exist()
+            if replace:
+                actions.append(set_values(to_attach))
+            elif to_attach and to_detach:
+                item = model.get_nullable(hash_key=customer, range_key=name)
+                if not item:
+                    return
+                old = values(item)
+                actions.append(set_values(
+                    old.difference(to_detach).union(to_attach)
+                ))
+                if old:
+                    condition = attribute == old
+                else:
+                    condition = attribute.does_not_exist()
+            else:
+                if to_attach:
+                    actions.append(attribute.add(to_attach))
+                if to_detach:
+                    actions.append(attribute.delete(to_detach))
+            item = model(customer=customer, name=name)
+            if update_if(item, actions, condition):
+                return item
+            item = model.get_nullable(hash_key=customer, range_key=name)
+            if not item:
+                return
+            # the attribute can be a list saved before, it is made a set
+            # if it is still a list and the update is tried again
+            update_if(item, [set_values(values(item))],
+                      Path(attribute).is_type(LIST))
+        raise ModularException(
+            code=HTTPStatus.CONFLICT.value,
+            content=f'\'{name}\' is being changed concurrently. Try again'
+        )
+
+    def _patch(self, model: type[Role | Policy], customer: str, name: str,
+               attribute: UnicodeSetListAttribute,
+               to_attach: Iterable[str] = (), to_detach: Iterable[str] = (),
+               replace: bool = False,
+               to_set: dict[str, object] | None = None
+               ) -> Role | Policy | None:
+        """
+        Changes only the given list attribute and the given other
+        attributes. Returns the item after update or None if it does not
+        exist
+        :param to_attach: values to add to the list
+        :param to_detach: values to remove from the list. Ignored if replace
+        :param replace: whether to replace the list with to_attach
+        :param to_set: names of other attributes to values to set
+        """
+        if model.is_mongo_model():
+            func = self._patch_mongo
+        else:
+            func = self._patch_dynamodb
+        to_attach = set(to_attach)
+        return func(model, customer, name, attribute, to_attach,
+                    set(to_detach) - to_attach, replace, to_set or {})
+
+    def patch_policy(self, customer: str, name: str,
+                     to_attach: Iterable[str] = (),
+                     to_detach: Iterable[str] = (),
+                     replace: bool = False) -> Policy | None:
+        return self._patch(Policy, customer, name, Policy.permissions,
+                           to_attach, to_detach, replace)
+
+    def patch_role(self, customer: str, name: str,
+                   to_attach: Iterable[str] = (),
+                   to_detach: Iterable[str] = (),
+                   expiration: datetime | None = None) -> Role | None:
+        to_set = {}
+        if expiration:
+            to_set['expiration'] = utc_iso(expiration)
+        return self._patch(Role, customer, name, Role.policies,
+                           to_attach, to_detach, to_set=to_set)
+
     @staticmethod
     def delete(item: Role | Policy) -> None:
         item.delete()
@@ -53,9 +233,10 @@ class RBACService:
 
     @staticmethod
     def iter_roles(customer: str, limit: int | None = None, 
-                   last_evaluated_key: dict | None = None, 
-                   rate_limit: int | None = None) -> ResultIterator[Role]:
-        return Role.query(
+                   last_evaluated_key: dict | int | None = None,
+                   rate_limit: int | None = None) -> Iterator[Role]:
+        return pagination.query(
+            model=Role,
             hash_key=customer,
             limit=limit,
             last_evaluated_key=last_evaluated_key,
@@ -64,15 +245,121 @@ class RBACService:
 
     @staticmethod
     def iter_policies(customer: str, limit: int | None = None, 
-                      last_evaluated_key: dict | None = None, 
-                      rate_limit: int | None = None) -> ResultIterator[Policy]:
-        return Policy.query(
+                      last_evaluated_key: dict | int | None = None,
+                      rate_limit: int | None = None) -> Iterator[Policy]:
+        return pagination.query(
+            model=Policy,
             hash_key=customer,
             limit=limit,
             last_evaluated_key=last_evaluated_key,
             rate_limit=rate_limit
         )
 
+    def export(self, customer: str) -> dict:
+        """
+        All the customer's policies and roles as one document that can be
+        given to sync
+        """
+        policies = [{
+            'name': policy.name,
+            'permissions': sorted(policy.permissions or []),
+        } for policy in self.iter_policies(customer)]
+        roles = []
+        for role in self.iter_roles(customer):
+            dto = {'name': role.name, 'policies': sorted(role.policies or [])}
+            if role.expiration:
+                dto['expiration'] = role.expiration
+            roles.append(dto)
+        return {'policies': policies, 'roles': roles}
+
+    @staticmethod
+    def _same_policy(one: Policy, other: Policy) -> bool:
+        return set(one.permissions or []) == set(other.permissions or [])
+
+    @staticmethod
+    def _same_role(one: Role, other: Role) -> bool:
+        return (set(one.policies or []) == set(other.policies or []) and
+                one.expiration == other.expiration)
+
+    @staticmethod
+    def _diff(existing: dict[str, RBACItem], desired: list[RBACItem],
+              same: Callable[[RBACItem, RBACItem], bool], prune: bool
+              ) -> tuple[RBACChanges, list[RBACItem], list[RBACItem]]:
+        """
+        Returns changes, items to save and items to delete
+        """
+        changes = RBACChanges(created=[], updated=[], deleted=[],
+                              unchanged=[])
+        to_save = []
+        for item in desired:
+            current = existing.get(item.name)
+            if current is None:
+                changes['created'].append(item.name)
+            elif not same(current, item):
+                changes['updated'].append(item.name)
+            else:
+                changes['unchanged'].append(item.name)
+                continue
+            to_save.append(item)
+        to_delete = []
+        if prune:
+            names = {item.name for item in desired}
+            to_delete = [v for k, v in existing.items() if k not in names]
+            changes['deleted'].extend(item.name for item in to_delete)
+        return changes, to_save, to_delete
+
+    @staticmethod
+    def _batch_write(model: type[Role | Policy], to_save: list,
+                     to_delete: list) -> None:
+        if not to_save and not to_delete:
+            return
+        with model.batch_write() as batch:
+            for item in to_save:
+                batch.save(item)
+            for item in to_delete:
+                batch.delete(item)
+
+    def sync(self, customer: str, policies: list[Policy], roles: list[Role],
+             prune: bool = False, dry_run: bool = False
+             ) -> dict[str, RBACChanges]:
+        """
+        Makes the customer's policies and roles equal to the given ones.
+        Reads all the current items with two queries and writes only the
+        changed ones with batch writes. Policies are saved before roles
+        and deleted after them so that roles never refer to missing
+        policies for long
+        :param prune: delete policies and roles that are not given
+        :param dry_run: only compute the changes
+        """
+        existing_policies = {p.name: p for p in self.iter_policies(customer)}
+        existing_roles = {r.name: r for r in self.iter_roles(customer)}
+
+        available = {policy.name for policy in policies}
+        if not prune:
+            available.update(existing_policies)
+        missing = {
+            name for role in roles for name in role.policies or []
+            if name not in available
+        }
+        if missing:
+            raise ModularException(
+                code=HTTPStatus.BAD_REQUEST.value,
+                content=f'Roles refer to policies that will not exist: '
+                        f'{", ".join(sorted(missing))}'
+            )
+
+        policy_changes, policies_to_save, policies_to_delete = self._diff(
+            existing_policies, policies, self._same_policy, prune
+        )
+        role_changes, roles_to_save, roles_to_delete = self._diff(
+            existing_roles, roles, self._same_role, prune
+        )
+        if not dry_run:
+            self._batch_write(Policy, policies_to_save, [])
+            self._batch_write(Role, roles_to_save, roles_to_delete)
+            self._batch_write(Policy, [], policies_to_delete)
+        return {'policies': policy_changes, 'roles': role_changes}
+
     def iter_role_policies(self, role: Role) -> Generator[Policy, None, None]:
         yielded = set()
         for name in role.policies:
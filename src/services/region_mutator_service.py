@@ -1,8 +1,12 @@
-from typing import Optional
+from bisect import bisect_right
 from http import HTTPStatus
+from itertools import islice
+from operator import attrgetter
+from typing import Iterator, Optional
 
 from bson import ObjectId
 
+from commons.cache import IndexedCache
 from commons.log_helper import get_logger
 from modular_sdk.commons import ModularException
 from modular_sdk.commons.constants import CLOUD_PROVIDERS
@@ -10,13 +14,105 @@ from modular_sdk.models.region import RegionModel, RegionAttr
 from modular_sdk.models.tenant import Tenant
 from modular_sdk.services.region_service import RegionService
 from modular_sdk.services.tenant_service import TenantService
+from modular_sdk.models.pynamongo.convertors import attribute_value_to_mongo
+from pynamodb.constants import LIST
+from pynamodb.exceptions import UpdateError
+from pynamodb.expressions.condition import size
+
+from models.operations import (
+    CONDITIONAL_CHECK_FAILED,
+    CONDITIONAL_UPDATE_ATTEMPTS,
+    insert_if_not_exists,
+)
+from models.tenant_region import TenantRegion
 
 _LOG = get_logger(__name__)
 
+# how many tenants to mention when a region cannot be deleted
+ACTIVATED_TENANTS_SAMPLE = 10
+
 
 class RegionMutatorService(RegionService):
-    def __init__(self, tenant_service: TenantService):
+    def __init__(self, tenant_service: TenantService, cache_ttl: float = 300):
+        """
+        :param cache_ttl: seconds to keep the catalog of regions in memory.
+        The catalog is also invalidated when regions are created or
+        deleted via this service
+        """
         super().__init__(tenant_service=tenant_service)
+        self._catalog: IndexedCache[RegionModel] = IndexedCache(
+            # sorted to paginate by maestro name
+            loader=lambda: sorted(
+                RegionModel.scan(), key=attrgetter('maestro_name')
+            ),
+            indexes={
+                'maestro_name': lambda r: r.maestro_name,
+                'native_name_cloud': lambda r: (r.native_name, r.cloud),
+                'region_id': lambda r: r.region_id,
+            },
+            ttl=cache_ttl
+        )
+
+    def get_all_regions(self, only_active: bool = False) -> list[RegionModel]:
+        regions = self._catalog.all()
+        if only_active:
+            return [region for region in regions if region.is_active]
+        return list(regions)
+
+    def iter_regions(self, cloud: Optional[str] = None,
+                     is_active: Optional[bool] = None,
+                     start_after: Optional[str] = None
+                     ) -> Iterator[RegionModel]:
+        """
+        Yields regions ordered by maestro name
+        :param cloud: only regions of this cloud
+        :param is_active: only active or only inactive regions
+        :param start_after: maestro name after which to start
+        """
+        regions = self._catalog.all()
+        start = 0
+        if start_after:
+            start = bisect_right(regions, start_after,
+                                 key=attrgetter('maestro_name'))
+        for region in islice(regions, start, None):
+            if cloud and region.cloud != cloud:
+                continue
+            if is_active is not None and bool(region.is_active) != is_active:
+                continue
+            yield region
+
+    def get_region(self, region_name: str,
+                   cached: bool = True) -> Optional[RegionModel]:
+        """
+        :param cached: whether the region can be taken from the catalog.
+        Pass False if the region must exist in DB right now
+        """
+        if not cached:
+            return RegionService.get_region(region_name)
+        return self._catalog.get('maestro_name', region_name)
+
+    def get_region_by_native_name(self, native_name: str,
+                                  cloud: Optional[str] = None
+                                  ) -> Optional[RegionModel]:
+        if cloud:
+            return self._catalog.get('native_name_cloud', (native_name, cloud))
+        return next((
+            region for region in self._catalog.all()
+            if region.native_name == native_name
+        ), None)
+
+    def get_region_by_id(self, region_id: str) -> Optional[RegionModel]:
+        return self._catalog.get('region_id', region_id)
+
+    def get_regions(self, region_names) -> list[RegionModel]:
+        regions = (
+            self._catalog.get('maestro_name', name)
+            for name in set(region_names)
+        )
+        return [region for region in regions if region]
+
+    def invalidate_cache(self) -> None:
+        self._catalog.invalidate()
 
     def create_light(self, maestro_name: str, native_name: str, cloud: str,
                      region_id: Optional[str] = None,
@@ -48,8 +144,17 @@ class RegionMutatorService(RegionService):
             is_active=is_active
         )
 
-    def create(self, maestro_name: str, native_name: str, region_id: str,
-               cloud: str, is_active=True):
+    def create(self, maestro_name: str, native_name: str, cloud: str,
+               region_id: Optional[str] = None,
+               is_active: bool = True) -> RegionModel:
+        """
+        Creates and saves a region. Maestro name, native name within the
+        cloud and region id (if given) must not be taken. Instead of
+        checking regions before saving, the item is inserted conditionally
+        so that concurrent requests cannot create duplicates. For Mongo it's
+        one request, unique indexes on each of these attributes (created by
+        create-indexes) make a concurrent duplicate fail with 409
+        """
         if cloud not in CLOUD_PROVIDERS:
             _LOG.error(f'Unsupported cloud specified: \'{cloud}\'. '
                        f'Available options: {CLOUD_PROVIDERS}')
@@ -58,113 +163,390 @@ class RegionMutatorService(RegionService):
                 content=f'Unsupported cloud specified: \'{cloud}\'. '
                         f'Available options: {CLOUD_PROVIDERS}'
             )
-        all_region = self.get_all_regions()
-        # todo rewrite this, why should we scan all regions when creating and not even saving one?
-        if region_id:
-            for region in all_region:
-                if region.region_id == region_id and \
-                        maestro_name != region.maestro_name:
-                    _LOG.error(f'The region id {region_id} is already used by '
-                               f'the {region.maestro_name} region.')
-                    raise ModularException(
-                        code=HTTPStatus.BAD_REQUEST.value,
-                        content=f'The region id {region_id} is already used by'
-                                f' the {region.maestro_name} region.')
-        all_region_in_cloud = [region for region in all_region
-                               if region.cloud == cloud]
-        for region in all_region_in_cloud:
-            if region.native_name == native_name and \
-                    maestro_name != region.maestro_name:
-                _LOG.error(f'The native name {native_name} is already '
-                           f'used by the {region.maestro_name} region.')
-                raise ModularException(
-                    code=HTTPStatus.BAD_REQUEST.value,
-                    content=f'The native name {native_name} is already '
-                            f'used by the {region.maestro_name} region.')
-        return RegionModel(
-            region_id=region_id, maestro_name=maestro_name,
-            native_name=native_name, cloud=cloud,
+        region = RegionModel(
+            region_id=region_id or str(ObjectId()),
+            maestro_name=maestro_name,
+            native_name=native_name,
+            cloud=cloud,
             is_active=is_active
         )
+        check_region_id = bool(region_id)
+        unique = [{
+            RegionModel.native_name.attr_name: native_name,
+            RegionModel.cloud.attr_name: cloud
+        }]
+        if check_region_id:
+            unique.append({RegionModel.region_id.attr_name: region.region_id})
+        try:
+            # DynamoDB can check only maestro name within the put itself
+            if not RegionModel.is_mongo_model() and (
+                    RegionService.get_region_by_native_name(native_name,
+                                                            cloud) or
+                    check_region_id and
+                    self._region_id_taken(region.region_id)):
+                self._raise_conflict(region, check_region_id)
+            if not insert_if_not_exists(region, unique=unique):
+                self._raise_conflict(region, check_region_id)
+        finally:
+            # conflict means that the catalog may be outdated as well
+            self.invalidate_cache()
+        return region
+
+    @staticmethod
+    def _region_id_taken(region_id: str) -> bool:
+        if RegionModel.is_mongo_model():
+            return RegionModel.mongo_adapter().get_collection(
+                RegionModel
+            ).find_one(
+                {RegionModel.region_id.attr_name: region_id},
+                {'_id': 1}
+            ) is not None
+        return next(RegionModel.scan(
+            filter_condition=RegionModel.region_id == region_id,
+            attributes_to_get=(RegionModel.maestro_name,)
+        ), None) is not None
+
+    def _raise_conflict(self, region: RegionModel, check_region_id: bool):
+        """
+        Finds out which attribute is taken. Called only when the region
+        was not saved, so these lookups are not done for successful creates
+        """
+        if RegionService.get_region(region.maestro_name):
+            message = f'Region {region.maestro_name} already exists.'
+        elif RegionService.get_region_by_native_name(region.native_name,
+                                                     region.cloud):
+            message = f'The native name {region.native_name} is already ' \
+                      f'used by another region in {region.cloud}.'
+        elif check_region_id and self._region_id_taken(region.region_id):
+            message = f'The region id {region.region_id} is already used ' \
+                      f'by another region.'
+        else:
+            message = f'Region {region.maestro_name} already exists.'
+        _LOG.error(message)
+        raise ModularException(
+            code=HTTPStatus.CONFLICT.value,
+            content=message
+        )
 
     def delete(self, region: RegionModel):
-        tenants = self.tenant_service.scan_tenants(
-            only_active=True)  # TODO 7000 tenants on prod...
         _LOG.debug(f'Searching for activated tenants in region '
                    f'\'{region.maestro_name}\'')
-        activated_tenants = []
-        for tenant in tenants:
-            if tenant.regions:
-                for tenant_region in tenant.regions:
-                    if tenant_region.maestro_name == region.maestro_name:
-                        activated_tenants.append(tenant.name)
+        activated_tenants = list(self.i_tenants_in_region(
+            region_name=region.maestro_name,
+            limit=ACTIVATED_TENANTS_SAMPLE
+        ))
         if activated_tenants:
+            more = ' and others' \
+                if len(activated_tenants) == ACTIVATED_TENANTS_SAMPLE else ''
             raise ModularException(
                 code=HTTPStatus.BAD_REQUEST.value,
                 content=f'There are activated tenants '
-                        f'{activated_tenants} in region {region.maestro_name}')
+                        f'{activated_tenants}{more} in region '
+                        f'{region.maestro_name}')
         region.delete()
+        self.invalidate_cache()
+        self.unlink_region(region.maestro_name)
+
+    @staticmethod
+    def i_tenants_in_region(region_name: str,
+                            limit: Optional[int] = None) -> Iterator[str]:
+        """
+        Yields names of active tenants that have the given region in their
+        list of regions. Uses the multikey index on tenants' regions in
+        Mongo and TenantRegion table in DynamoDB
+        """
+        if Tenant.is_mongo_model():
+            cursor = Tenant.mongo_adapter().get_collection(Tenant).find(
+                {
+                    f'{Tenant.regions.attr_name}.'
+                    f'{RegionAttr.maestro_name.attr_name}': region_name,
+                    Tenant.is_active.attr_name: True
+                },
+                {Tenant.name.attr_name: 1, '_id': 0}
+            )
+            if limit:
+                cursor = cursor.limit(limit)
+            yield from (doc[Tenant.name.attr_name] for doc in cursor)
+            return
+        names = (item.tenant_name for item in TenantRegion.query(
+            hash_key=region_name,
+            attributes_to_get=(TenantRegion.tenant_name,)
+        ))
+        yielded = 0
+        # inactive tenants are filtered out here, the table does not
+        # depend on tenants' state
+        while chunk := list(islice(names, 100)):
+            tenants = list(Tenant.batch_get(
+                chunk, attributes_to_get=(Tenant.name, Tenant.is_active)
+            ))
+            if stale := set(chunk) - {tenant.name for tenant in tenants}:
+                _LOG.info(f'Removing links of {len(stale)} deleted '
+                          f'tenant(s) to region {region_name}')
+                with TenantRegion.batch_write() as batch:
+                    for name in stale:
+                        batch.delete(TenantRegion(region_name=region_name,
+                                                  tenant_name=name))
+            for tenant in tenants:
+                if not tenant.is_active:
+                    continue
+                yield tenant.name
+                yielded += 1
+                if limit and yielded == limit:
+                    return
+
+    @staticmethod
+    def link_regions_to_tenant(tenant: Tenant,
+                               region_names: list[str]) -> None:
+        """
+        Keeps TenantRegion table in sync. Must be called whenever regions
+        are added to tenant's regions. Does nothing for Mongo
+        """
+        if Tenant.is_mongo_model():
+            return
+        with TenantRegion.batch_write() as batch:
+            for name in region_names:
+                batch.save(TenantRegion(
+                    region_name=name,
+                    tenant_name=tenant.name,
+                    customer_name=tenant.customer_name
+                ))
+
+    @staticmethod
+    def unlink_tenant(tenant: Tenant) -> None:
+        """
+        Removes tenant's rows from TenantRegion table. Must be called when
+        the tenant is deleted. Does nothing for Mongo
+        """
+        if Tenant.is_mongo_model():
+            return
+        with TenantRegion.batch_write() as batch:
+            for region in tenant.regions or ():
+                batch.delete(TenantRegion(
+                    region_name=region.maestro_name,
+                    tenant_name=tenant.name
+                ))
+
+    @staticmethod
+    def unlink_region(region_name: str) -> None:
+        """
+        Removes region's rows from TenantRegion table. Must be called when
+        the region is deleted. Does nothing for Mongo
+        """
+        if Tenant.is_mongo_model():
+            return
+        with TenantRegion.batch_write() as batch:
+            for item in TenantRegion.query(
+                    hash_key=region_name,
+                    attributes_to_get=(TenantRegion.tenant_name,)):
+                batch.delete(item)
+
+    @staticmethod
+    def _raise_activated(region_names: list[str]):
+        if len(region_names) == 1:
+            message = f'Region {region_names[0]} is already activated'
+        else:
+            message = (f'Regions {", ".join(region_names)} are already '
+                       f'activated')
+        raise ModularException(
+            code=HTTPStatus.BAD_REQUEST.value,
+            content=message
+        )
+
+    @staticmethod
+    def _raise_changed(tenant: Tenant):
+        raise ModularException(
+            code=HTTPStatus.CONFLICT.value,
+            content=f'Tenant \'{tenant.name}\' is being changed '
+                    f'concurrently. Try again'
+        )
 
-    def activate_region_in_tenant(self, tenant: Tenant, region: RegionModel):
-        region = self.region_model_to_attr(region)
-        if tenant.regions:
-            if self.check_region_is_not_activated(
-                    region_to_add=region,
-                    tenant_regions=tenant.regions):
-                _LOG.debug(f'Region \'{region.maestro_name}\' added to tenant '
-                           f'\'{tenant.name}\'')
-                tenant.regions.append(region)
+    @staticmethod
+    def _refresh(tenant: Tenant) -> None:
+        try:
+            tenant.refresh()
+        except Tenant.DoesNotExist:
+            raise ModularException(
+                code=HTTPStatus.NOT_FOUND.value,
+                content=f'Tenant \'{tenant.name}\' does not exist.'
+            )
+
+    @staticmethod
+    def _check_not_activated(tenant: Tenant, region_names: list[str]):
+        existing = {region.maestro_name for region in tenant.regions or ()}
+        if activated := [n for n in region_names if n in existing]:
+            RegionMutatorService._raise_activated(activated)
+
+    def activate_regions_in_tenant(self, tenant: Tenant,
+                                   regions: list[RegionModel]) -> None:
+        """
+        Appends the regions to tenant's regions with one conditional
+        update instead of rewriting the whole tenant. Nothing is changed
+        if any of the regions is already in the tenant. The given tenant
+        is updated in memory as well
+        """
+        regions = [self.region_model_to_attr(region) for region in regions]
+        names = [region.maestro_name for region in regions]
+        self._check_not_activated(tenant, names)
+        if Tenant.is_mongo_model():
+            res = Tenant.mongo_adapter().get_collection(Tenant).update_one(
+                {
+                    Tenant.name.attr_name: tenant.name,
+                    f'{Tenant.regions.attr_name}.'
+                    f'{RegionAttr.maestro_name.attr_name}': {'$nin': names}
+                },
+                {'$push': {Tenant.regions.attr_name: {
+                    '$each': attribute_value_to_mongo(
+                        {LIST: Tenant.regions.serialize(regions)}
+                    )
+                }}}
+            )
+            if not res.matched_count:
+                # deleted or some of the regions are activated meanwhile
+                self._refresh(tenant)
+                self._check_not_activated(tenant, names)
+                self._raise_changed(tenant)
+            if tenant.regions is None:
+                tenant.regions = []
+            tenant.regions.extend(regions)
+        else:
+            self._activate_dynamodb(tenant, regions)
+        _LOG.debug(f'Regions {names} added to tenant \'{tenant.name}\'')
+        self.link_regions_to_tenant(tenant, names)
+
+    def _activate_dynamodb(self, tenant: Tenant,
+                           regions: list[RegionAttr]) -> None:
+        """
+        DynamoDB cannot check whether a list contains a map with the given
+        key, so the update is conditioned on the size of the list that was
+        checked. Regions are only appended, so the same size means the
+        same regions. Tenant is reloaded and checked again if it changed
+        """
+        names = [region.maestro_name for region in regions]
+        for _ in range(CONDITIONAL_UPDATE_ATTEMPTS):
+            self._check_not_activated(tenant, names)
+            if tenant.regions:
+                condition = size(Tenant.regions) == len(tenant.regions)
             else:
-                raise ModularException(
-                    code=HTTPStatus.BAD_REQUEST.value,
-                    content=f'Region {region.maestro_name} is already '
-                            f'activated'
+                condition = (Tenant.regions.does_not_exist() |
+                             (size(Tenant.regions) == 0))
+            try:
+                tenant.update(
+                    actions=[Tenant.regions.set(
+                        (Tenant.regions | []).append(regions)
+                    )],
+                    condition=Tenant.name.exists() & condition
                 )
-        else:
-            tenant.regions = [region]
+                return
+            except UpdateError as e:
+                if e.cause_response_code != CONDITIONAL_CHECK_FAILED:
+                    raise
+            _LOG.info(f'Tenant \'{tenant.name}\' was changed, reloading')
+            self._refresh(tenant)
+        self._raise_changed(tenant)
 
     @staticmethod
-    def delete_region_from_tenant(tenant: Tenant, region: RegionModel):
+    def _indexes_to_deactivate(tenant: Tenant,
+                               region_names: list[str]) -> list[int]:
+        """
+        Returns indexes of the regions in tenant's regions. Raises if any
+        of the regions cannot be deactivated
+        """
         if not tenant.regions:
             _LOG.error(f'Tenant \'{tenant.name}\' does not have any regions')
             raise ModularException(
                 code=HTTPStatus.NOT_FOUND.value,
                 content=f'Tenant \'{tenant.name}\' does not have any regions'
             )
-        target_region = None
-        for tenant_region in tenant.regions:
-            if tenant_region.maestro_name == region.maestro_name:
-                target_region = tenant_region
-
-        if not target_region:
-            _LOG.error(f'Region \'{region.maestro_name}\' does not exist in '
+        indexes = {
+            region.maestro_name: i for i, region in enumerate(tenant.regions)
+        }
+        if missing := [n for n in region_names if n not in indexes]:
+            missing = ', '.join(f'\'{n}\'' for n in missing)
+            _LOG.error(f'Region {missing} does not exist in '
                        f'\'{tenant.name}\' tenant.')
             raise ModularException(
                 code=HTTPStatus.NOT_FOUND.value,
-                content=f'Region \'{region.maestro_name}\' does not exist in '
+                content=f'Region {missing} does not exist in '
                         f'\'{tenant.name}\' tenant.'
             )
-
-        if target_region and not target_region.is_active:
-            _LOG.warning(f'Region \'{region.maestro_name}\' is already '
-                         f'deactivated for tenant \'{tenant.name}\'.')
+        if inactive := [n for n in region_names
+                        if not tenant.regions[indexes[n]].is_active]:
+            inactive = ', '.join(f'\'{n}\'' for n in inactive)
+            _LOG.warning(f'Region {inactive} is already deactivated for '
+                         f'tenant \'{tenant.name}\'.')
             raise ModularException(
                 code=HTTPStatus.BAD_REQUEST.value,
-                content=f'Region \'{region.maestro_name}\' is already '
-                        f'deactivated for tenant \'{tenant.name}\'.'
+                content=f'Region {inactive} is already deactivated for '
+                        f'tenant \'{tenant.name}\'.'
             )
+        return [indexes[n] for n in region_names]
 
-        _LOG.debug(f'Deactivating region \'{region.maestro_name}\' for '
-                   f'tenant \'{tenant.name}\'')
-        target_region.is_active = False
+    @staticmethod
+    def _deactivate_mongo(tenant: Tenant, region_names: list[str],
+                          indexes: list[int]) -> bool:
+        regions = Tenant.regions.attr_name
+        name_attr = RegionAttr.maestro_name.attr_name
+        active_attr = RegionAttr.is_active.attr_name
+        query = {Tenant.name.attr_name: tenant.name}
+        update = {}
+        for name, i in zip(region_names, indexes):
+            query[f'{regions}.{i}.{name_attr}'] = name
+            query[f'{regions}.{i}.{active_attr}'] = True
+            update[f'{regions}.{i}.{active_attr}'] = False
+        res = Tenant.mongo_adapter().get_collection(Tenant).update_one(
+            query, {'$set': update}
+        )
+        return bool(res.matched_count)
 
     @staticmethod
-    def save(region_item):
+    def _deactivate_dynamodb(tenant: Tenant, region_names: list[str],
+                             indexes: list[int]) -> bool:
+        actions, condition = [], Tenant.name.exists()
+        for name, i in zip(region_names, indexes):
+            item = Tenant.regions[i]
+            actions.append(item.is_active.set(False))
+            condition &= (item.maestro_name == name)
+            condition &= (item.is_active == True)  # noqa: E712
+        try:
+            tenant.update(actions=actions, condition=condition)
+        except UpdateError as e:
+            if e.cause_response_code != CONDITIONAL_CHECK_FAILED:
+                raise
+            return False
+        return True
+
+    def deactivate_regions_in_tenant(self, tenant: Tenant,
+                                     regions: list[RegionModel]) -> None:
+        """
+        Sets is_active to False only for the given regions of the tenant
+        with one update conditioned on these regions still being active
+        at their places. Nothing is changed if any of the regions cannot
+        be deactivated. The given tenant is updated in memory as well
+        """
+        names = [region.maestro_name for region in regions]
+        if Tenant.is_mongo_model():
+            deactivate = self._deactivate_mongo
+        else:
+            deactivate = self._deactivate_dynamodb
+        _LOG.debug(f'Deactivating regions {names} for '
+                   f'tenant \'{tenant.name}\'')
+        for _ in range(CONDITIONAL_UPDATE_ATTEMPTS):
+            indexes = self._indexes_to_deactivate(tenant, names)
+            if deactivate(tenant, names, indexes):
+                for i in indexes:
+                    tenant.regions[i].is_active = False
+                return
+            _LOG.info(f'Tenant \'{tenant.name}\' was changed, reloading')
+            self._refresh(tenant)
+        self._raise_changed(tenant)
+
+    def save(self, region_item):
         region_item.save()
+        self.invalidate_cache()
 
-    @staticmethod
-    def update(region_item: RegionModel, actions: list) -> None:
+    def update(self, region_item: RegionModel, actions: list) -> None:
         region_item.update(actions=actions)
+        self.invalidate_cache()
 
     @staticmethod
     def deactivate(region: RegionAttr):
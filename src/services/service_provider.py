@@ -1,22 +1,52 @@
+import functools
 import os
-from functools import cached_property
+import threading
 from typing import TYPE_CHECKING
 
 from commons import SingletonMeta
 
 if TYPE_CHECKING:
     from modular_sdk.services.ssm_service import AbstractSSMClient
+    from services.application_mutator_service import (
+        ApplicationMutatorService,
+    )
     from services.environment_service import EnvironmentService
+    from services.export_service import ExportService
+    from services.idempotency_service import IdempotencyService
     from services.parent_mutator_service import ParentMutatorService
     from services.customer_mutator_service import CustomerMutatorService
+    from services.rate_limiter import RateLimiter
     from services.rbac_service import RBACService
+    from services.stats_service import StatsService
     from services.region_mutator_service import RegionMutatorService
     from services.tenant_mutator_service import TenantMutatorService
+    from services.tenant_settings_mutator_service import (
+        TenantSettingsMutatorService,
+    )
+    from services.tenant_resolver import TenantResolver
     from services.clients.cognito import CognitoClient, BaseAuthClient
     from services.clients.mongo_ssm_auth_client import MongoAndSSMAuthClient
     from modular_sdk.modular import Modular
 
 
+# services can build other services, so the lock is reentrant
+_LOCK = threading.RLock()
+
+
+class cached_property(functools.cached_property):
+    """
+    Builds the service once even if threads of a worker ask for it at
+    the same time. functools.cached_property does not lock since 3.12.
+    When it's built, the value is read from instance's __dict__ without
+    calling this descriptor
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with _LOCK:
+            return super().__get__(instance, owner)
+
 
 class ServiceProvider(metaclass=SingletonMeta):
     @cached_property
@@ -58,16 +88,37 @@ class ServiceProvider(metaclass=SingletonMeta):
         from services.environment_service import EnvironmentService
         return EnvironmentService(os.environ)
 
+    @cached_property
+    def export_service(self) -> 'ExportService':
+        from services.export_service import ExportService
+        from commons.constants import Env
+        return ExportService(
+            bucket_name=Env.EXPORTS_BUCKET_NAME.get(),
+            url_expiration=int(Env.EXPORTS_URL_EXPIRATION.get())
+        )
+
     @cached_property
     def customer_service(self) -> 'CustomerMutatorService':
+        from commons.constants import Env
         from services.customer_mutator_service import CustomerMutatorService
-        return CustomerMutatorService()
+        return CustomerMutatorService(
+            state_ttl=float(Env.CUSTOMERS_CACHE_TTL.get())
+        )
+
+    @cached_property
+    def application_service(self) -> 'ApplicationMutatorService':
+        from services.application_mutator_service import (
+            ApplicationMutatorService,
+        )
+        return ApplicationMutatorService(
+            customer_service=self.customer_service
+        )
 
     @cached_property
     def parent_service(self) -> 'ParentMutatorService':
         from services.parent_mutator_service import ParentMutatorService
         return ParentMutatorService(
-            application_service=self.modular.application_service(),
+            application_service=self.application_service,
             tenant_service=self.tenant_service,
             customer_service=self.customer_service
         )
@@ -75,8 +126,10 @@ class ServiceProvider(metaclass=SingletonMeta):
     @cached_property
     def region_service(self) -> 'RegionMutatorService':
         from services.region_mutator_service import RegionMutatorService
+        from commons.constants import Env
         return RegionMutatorService(
-            tenant_service=self.tenant_service
+            tenant_service=self.tenant_service,
+            cache_ttl=float(Env.REGIONS_CACHE_TTL.get())
         )
 
     @cached_property
@@ -84,7 +137,49 @@ class ServiceProvider(metaclass=SingletonMeta):
         from services.tenant_mutator_service import TenantMutatorService
         return TenantMutatorService()
 
+    @cached_property
+    def tenant_settings_service(self) -> 'TenantSettingsMutatorService':
+        from services.tenant_settings_mutator_service import (
+            TenantSettingsMutatorService,
+        )
+        return TenantSettingsMutatorService(tenant_service=self.tenant_service)
+
+    @cached_property
+    def tenant_resolver(self) -> 'TenantResolver':
+        from services.tenant_resolver import TenantResolver
+        return TenantResolver(tenant_service=self.tenant_service)
+
     @cached_property
     def rbac_service(self) -> 'RBACService':
         from services.rbac_service import RBACService
         return RBACService()
+
+    @cached_property
+    def stats_service(self) -> 'StatsService':
+        from commons.constants import Env
+        from services.stats_service import StatsService
+        return StatsService(
+            users_client=self.users_client,
+            ttl=float(Env.STATS_CACHE_TTL.get())
+        )
+
+    @cached_property
+    def idempotency_service(self) -> 'IdempotencyService':
+        from commons.constants import Env
+        from services.idempotency_service import IdempotencyService
+        return IdempotencyService(
+            ttl=float(Env.IDEMPOTENCY_KEYS_TTL.get())
+        )
+
+    @cached_property
+    def rate_limiter(self) -> 'RateLimiter | None':
+        from commons.constants import Env
+        from services.rate_limiter import build_rate_limiter
+        backend = Env.RATE_LIMIT_BACKEND.get()
+        if not backend:
+            return None
+        return build_rate_limiter(
+            backend=backend,
+            user_rate=float(Env.RATE_LIMIT_USER.get()),
+            customer_rate=float(Env.RATE_LIMIT_CUSTOMER.get())
+        )
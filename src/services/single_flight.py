@@ -0,0 +1,61 @@
+import threading
+from typing import Callable, Generic, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+class _Call(Generic[T]):
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: T | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+    """
+    Concurrent calls with the same key share one execution: the first
+    call executes the function, the ones that come while it is in flight
+    wait for it and get its result (or its exception). Nothing is cached
+    after the execution is finished
+    """
+    __slots__ = ('_lock', '_calls')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call[T]] = {}
+
+    def do(self, key: Hashable, func: Callable[[], T],
+           share: Callable[[T], bool] = lambda result: True
+           ) -> tuple[T, bool]:
+        """
+        Returns the result and whether it was shared with another call
+        :param share: whether the result can be given to the waiting
+        calls. If not, each of them executes the function on its own
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            if not share(call.result):
+                return func(), False
+            return call.result, True
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,286 @@
+import threading
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Callable
+
+from modular_sdk.models.application import Application
+from modular_sdk.models.tenant import Tenant
+from pymongo import UpdateOne
+from pynamodb.connection import Connection
+from pynamodb.transactions import TransactWrite
+
+from commons.log_helper import get_logger
+from models.counter import Counter
+from models.user import User
+
+if TYPE_CHECKING:
+    from pynamodb.models import Model
+
+    from services.clients.cognito import BaseAuthClient
+
+_LOG = get_logger(__name__)
+
+TENANTS = 'tenants'
+APPLICATIONS = 'applications'
+USERS = 'users'
+
+ACTIVE = 'active'
+INACTIVE = 'inactive'
+
+SEP = '#'
+
+# values of the counted attributes -> number of items
+Groups = dict[tuple[str, ...], int]
+
+
+class StatsService:
+    """
+    Counts customer's tenants by cloud and state, applications by type and
+    users by role. Mongo collections are counted with one aggregation.
+    DynamoDB and Cognito cannot do that so Counter items are kept for them
+    and updated by the endpoints that create and delete these entities.
+    Counts are cached by each worker for a short time, writes made by the
+    same worker drop the cache
+    """
+
+    def __init__(self, users_client: 'BaseAuthClient', ttl: float = 30,
+                 max_size: int = 10_000):
+        """
+        :param users_client: used to recount users kept in Cognito
+        :param ttl: seconds to keep counts of a customer
+        :param max_size: number of counts to keep
+        """
+        self._users_client = users_client
+        self._ttl = ttl
+        self._max_size = max_size
+        # (entity, customer) -> (expiration, groups)
+        self._cache: dict[tuple[str, str], tuple[float, Groups]] = {}
+        # incremented by each write, counts made meanwhile are not cached
+        self._version = 0
+        self._lock = threading.Lock()  # not held while counting
+
+    def _get_groups(self, entity: str, customer: str,
+                    count: Callable[[str], Groups]) -> Groups:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get((entity, customer))
+            version = self._version
+        if cached and cached[0] > now:
+            return cached[1]
+        _LOG.debug(f'Counting {entity} of customer {customer}')
+        groups = count(customer)
+        with self._lock:
+            if version != self._version:
+                return groups
+            if len(self._cache) >= self._max_size:
+                self._cache.clear()
+            self._cache[(entity, customer)] = (now + self._ttl, groups)
+        return groups
+
+    @staticmethod
+    def _aggregate(model: type['Model'], match: dict,
+                   attributes: tuple[str, ...]) -> Groups:
+        cursor = model.mongo_adapter().get_collection(model).aggregate([
+            {'$match': match},
+            {'$group': {
+                '_id': {str(i): f'${name}' for i, name in
+                        enumerate(attributes)},
+                'n': {'$sum': 1}
+            }}
+        ])
+        return {
+            tuple(doc['_id'].get(str(i)) for i in range(len(attributes))):
+                doc['n']
+            for doc in cursor
+        }
+
+    @staticmethod
+    def _read_counters(customer: str, entity: str) -> Groups:
+        return {
+            tuple(item.key.split(SEP)[1:]): int(item.value)
+            for item in Counter.query(
+                hash_key=customer,
+                range_key_condition=Counter.key.startswith(entity + SEP)
+            )
+            if item.value and item.value > 0
+        }
+
+    def _count_tenants(self, customer: str) -> Groups:
+        if not Tenant.is_mongo_model():
+            return self._read_counters(customer, TENANTS)
+        groups = self._aggregate(
+            Tenant,
+            {Tenant.customer_name.attr_name: customer},
+            (Tenant.cloud.attr_name, Tenant.is_active.attr_name)
+        )
+        result = defaultdict(int)
+        for (cloud, is_active), n in groups.items():
+            result[(cloud, ACTIVE if is_active else INACTIVE)] += n
+        return dict(result)
+
+    def _count_applications(self, customer: str) -> Groups:
+        if not Application.is_mongo_model():
+            return self._read_counters(customer, APPLICATIONS)
+        return self._aggregate(
+            Application,
+            {Application.customer_id.attr_name: customer,
+             Application.is_deleted.attr_name: False},
+            (Application.type.attr_name,)
+        )
+
+    def _count_users(self, customer: str) -> Groups:
+        if not User.is_mongo_model():
+            return self._read_counters(customer, USERS)
+        return self._aggregate(
+            User,
+            {User.customer.attr_name: customer},
+            (User.role.attr_name,)
+        )
+
+    def tenants(self, customer: str) -> dict:
+        groups = self._get_groups(TENANTS, customer, self._count_tenants)
+        stats = {'total': 0, ACTIVE: 0, INACTIVE: 0, 'clouds': {}}
+        for (cloud, state), n in groups.items():
+            per_cloud = stats['clouds'].setdefault(
+                cloud, {'total': 0, ACTIVE: 0, INACTIVE: 0}
+            )
+            for item in (stats, per_cloud):
+                item['total'] += n
+                item[state] += n
+        return stats
+
+    def applications(self, customer: str) -> dict:
+        groups = self._get_groups(APPLICATIONS, customer,
+                                  self._count_applications)
+        return {
+            'total': sum(groups.values()),
+            'types': {_type: n for (_type,), n in groups.items()}
+        }
+
+    def users(self, customer: str) -> dict:
+        groups = self._get_groups(USERS, customer, self._count_users)
+        return {
+            'total': sum(groups.values()),
+            'roles': {str(role): n for (role,), n in groups.items()}
+        }
+
+    # counters
+    def _add(self, customer: str, entity: str,
+             deltas: dict[tuple[str, ...], int]) -> None:
+        """
+        Changes the counters of customer's entities with one write
+        :param deltas: values of the counted attributes -> delta
+        """
+        source = {TENANTS: Tenant, APPLICATIONS: Application, USERS: User}
+        if not source[entity].is_mongo_model():  # Mongo is aggregated
+            self._add_counters(customer, {
+                SEP.join((entity, *values)): delta
+                for values, delta in deltas.items()
+            })
+        with self._lock:  # after the write, counts made before are dropped
+            self._version += 1
+            self._cache.pop((entity, customer), None)
+
+    @staticmethod
+    def _add_counters(customer: str, deltas: dict[str, int]) -> None:
+        if Counter.is_mongo_model():
+            Counter.mongo_adapter().get_collection(Counter).bulk_write([
+                UpdateOne({Counter.customer.attr_name: customer,
+                           Counter.key.attr_name: key},
+                          {'$inc': {Counter.value.attr_name: delta}},
+                          upsert=True)
+                for key, delta in deltas.items()
+            ])
+            return
+        if len(deltas) == 1:
+            (key, delta), = deltas.items()
+            Counter(customer=customer, key=key).update(
+                actions=[Counter.value.add(delta)]
+            )
+            return
+        # several counters are changed together or not at all, so that
+        # the total does not drift if one of the writes fails
+        connection = Connection(region=Counter.Meta.region,
+                                host=getattr(Counter.Meta, 'host', None))
+        with TransactWrite(connection=connection) as transaction:
+            for key, delta in deltas.items():
+                transaction.update(Counter(customer=customer, key=key),
+                                   actions=[Counter.value.add(delta)])
+
+    def tenant_created(self, tenant: Tenant) -> None:
+        state = ACTIVE if tenant.is_active else INACTIVE
+        self._add(tenant.customer_name, TENANTS, {(tenant.cloud, state): 1})
+
+    def tenant_deleted(self, tenant: Tenant) -> None:
+        """
+        Must be called only if the tenant was deleted conditioned on its
+        state, so that the right counter is decremented and only once
+        """
+        state = ACTIVE if tenant.is_active else INACTIVE
+        self._add(tenant.customer_name, TENANTS, {(tenant.cloud, state): -1})
+
+    def tenant_state_changed(self, tenant: Tenant, active: bool) -> None:
+        """
+        Must be called only if the tenant was activated or deactivated by
+        an update conditioned on its previous state. Otherwise, concurrent
+        requests count the same change several times
+        """
+        current, previous = ACTIVE, INACTIVE
+        if not active:
+            current, previous = previous, current
+        self._add(tenant.customer_name, TENANTS, {
+            (tenant.cloud, previous): -1,
+            (tenant.cloud, current): 1
+        })
+
+    def application_created(self, application: Application) -> None:
+        self._add(application.customer_id, APPLICATIONS,
+                  {(application.type,): 1})
+
+    def application_deleted(self, application: Application) -> None:
+        self._add(application.customer_id, APPLICATIONS,
+                  {(application.type,): -1})
+
+    def user_created(self, customer: str | None, role: str | None) -> None:
+        if customer:
+            self._add(customer, USERS, {(str(role),): 1})
+
+    def user_deleted(self, customer: str | None, role: str | None) -> None:
+        if customer:
+            self._add(customer, USERS, {(str(role),): -1})
+
+    def recount(self) -> int:
+        """
+        Rewrites all the counters reading the whole tables of entities
+        that are not kept in Mongo. Returns the number of counters
+        """
+        counters: dict[tuple[str, str], int] = defaultdict(int)
+        if not Tenant.is_mongo_model():
+            for tenant in Tenant.scan(attributes_to_get=(
+                    Tenant.customer_name, Tenant.cloud, Tenant.is_active)):
+                state = ACTIVE if tenant.is_active else INACTIVE
+                key = SEP.join((TENANTS, tenant.cloud, state))
+                counters[(tenant.customer_name, key)] += 1
+        if not Application.is_mongo_model():
+            for app in Application.scan(
+                    filter_condition=Application.is_deleted == False,  # noqa
+                    attributes_to_get=(Application.customer_id,
+                                       Application.type)):
+                key = SEP.join((APPLICATIONS, app.type))
+                counters[(app.customer_id, key)] += 1
+        if not User.is_mongo_model():
+            for user in self._users_client.query_users():
+                if not user.customer:
+                    continue
+                key = SEP.join((USERS, str(user.role)))
+                counters[(user.customer, key)] += 1
+        with Counter.batch_write() as batch:
+            for item in Counter.scan():
+                if (item.customer, item.key) not in counters:
+                    batch.delete(item)
+            for (customer, key), value in counters.items():
+                batch.save(Counter(customer=customer, key=key, value=value))
+        with self._lock:
+            self._version += 1
+            self._cache.clear()
+        return len(counters)
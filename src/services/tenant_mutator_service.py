@@ -1,15 +1,30 @@
-from typing import TypedDict
+from http import HTTPStatus
+from typing import Iterable, Iterator, TypedDict
 
+from modular_sdk.commons import ModularException
 from modular_sdk.commons.constants import Cloud
 from modular_sdk.commons.time_helper import utc_iso
 from modular_sdk.models.tenant import Tenant
 from modular_sdk.services.tenant_service import TenantService
+from pymongo.errors import BulkWriteError
 from pynamodb.expressions.update import Action
 
 from commons.log_helper import get_logger
+from models import MONGO_SERIALIZER, pagination
+from models.projection import Projection
+from models.operations import (
+    CONDITIONAL_UPDATE_ATTEMPTS,
+    delete_if,
+    insert_if_not_exists,
+    update_if,
+)
+from services.region_mutator_service import RegionMutatorService
 
 _LOG = get_logger(__name__)
 
+MAX_CHAR = '\U0010ffff'  # greater than any other in UTF-8 byte order
+DUPLICATE_KEY = 11000
+
 
 class Contacts(TypedDict):
     primary_contacts: list[str]
@@ -37,40 +52,272 @@ class TenantMutatorService(TenantService):
         )
         return tenant
 
-    def activate(self, tenant: Tenant) -> None:
+    @staticmethod
+    def _state_is(active: bool):
+        if active:
+            return Tenant.is_active == True  # noqa: E712
+        return ((Tenant.is_active == False) |  # noqa: E712
+                Tenant.is_active.does_not_exist())
+
+    @staticmethod
+    def _reload(tenant: Tenant) -> bool:
+        try:
+            tenant.refresh(consistent_read=True)
+        except Tenant.DoesNotExist:
+            return False
+        return True
+
+    def _not_changed(self, tenant: Tenant) -> None:
+        _LOG.debug(f'Tenant \'{tenant.name}\' already has this state, '
+                   f'reloading')
+        if not self._reload(tenant):
+            raise ModularException(
+                code=HTTPStatus.NOT_FOUND.value,
+                content=f'Tenant \'{tenant.name}\' does not exist.'
+            )
+
+    def activate(self, tenant: Tenant) -> bool:
+        """
+        Activates the tenant. Returns False without writing anything if
+        the given tenant is already active. Otherwise, the update is
+        conditioned on the state in the database because the tenant can be
+        read before a concurrent change. Returns False if it is already
+        active there, the tenant is reloaded then
+        """
         if tenant.is_active:
-            _LOG.debug('Tenant is already active. Returning')
-            return
-        self.update(
-            tenant_item=tenant,
-            actions=[
-                Tenant.is_active.set(True),
-                Tenant.activation_date.set(utc_iso()),
-                Tenant.deactivation_date.set(None)
-            ]
-        )
+            return False
+        if update_if(tenant, actions=[
+            Tenant.is_active.set(True),
+            Tenant.activation_date.set(utc_iso()),
+            Tenant.deactivation_date.set(None)
+        ], condition=self._state_is(False)):
+            return True
+        self._not_changed(tenant)
+        return False
 
-    def deactivate(self, tenant: Tenant) -> None:
+    def deactivate(self, tenant: Tenant) -> bool:
+        """
+        Deactivates the tenant. Returns False without writing anything if
+        the given tenant is already inactive, or if it is inactive in the
+        database, the tenant is reloaded then
+        """
         if not tenant.is_active:
-            _LOG.debug('Tenant is already not active. Returning')
-            return
-        self.update(
-            tenant_item=tenant,
-            actions=[
-                Tenant.is_active.set(False),
-                Tenant.deactivation_date.set(utc_iso())
-            ]
-        )
+            return False
+        if update_if(tenant, actions=[
+            Tenant.is_active.set(False),
+            Tenant.deactivation_date.set(utc_iso())
+        ], condition=self._state_is(True)):
+            return True
+        self._not_changed(tenant)
+        return False
 
     @staticmethod
     def save(tenant: Tenant):
         tenant.save()
 
+    def insert(self, tenant: Tenant) -> bool:
+        """
+        Saves a new tenant. Returns False if a tenant with such name or
+        account id already exists. One request for Mongo, concurrent
+        duplicates are rejected by the unique indexes on name and account
+        id that create-indexes creates. For DynamoDB the account id is
+        checked with a query to its index beforehand, so it is not
+        guaranteed to be unique when tenants are created concurrently
+        """
+        if not Tenant.is_mongo_model() and tenant.project and next(
+                self.i_get_by_acc(acc=tenant.project, limit=1,
+                                  attributes_to_get=[Tenant.name]), None):
+            return False
+        unique = ()
+        if tenant.project:
+            unique = ({Tenant.project.attr_name: tenant.project},)
+        return insert_if_not_exists(tenant, unique=unique)
+
+    def insert_many(self, tenants: list[Tenant]) -> list[str | None]:
+        """
+        Saves new tenants. Tenants whose name or account id is already
+        taken or repeated among the given ones are skipped. Returns the
+        reason why a tenant is skipped or None if it's saved, for each of
+        the given tenants in the same order
+        """
+        errors: list[str | None] = [None] * len(tenants)
+        names, accounts = set(), set()
+        for i, tenant in enumerate(tenants):
+            if tenant.name in names:
+                errors[i] = (f'Tenant with name \'{tenant.name}\' is '
+                             f'repeated in the request.')
+            elif tenant.project and tenant.project in accounts:
+                errors[i] = (f'Tenant with account id \'{tenant.project}\' '
+                             f'is repeated in the request.')
+            names.add(tenant.name)
+            if tenant.project:
+                accounts.add(tenant.project)
+        pending = [tenants[i] for i, e in enumerate(errors) if e is None]
+        if not pending:
+            return errors
+        if Tenant.is_mongo_model():
+            rejected = self._insert_many_mongo(pending)
+        else:
+            rejected = self._insert_many_dynamodb(pending)
+        for i, tenant in enumerate(tenants):
+            if errors[i] is None and tenant.name in rejected:
+                errors[i] = rejected[tenant.name]
+        return errors
+
+    @staticmethod
+    def _insert_many_mongo(tenants: list[Tenant]) -> dict[str, str]:
+        """
+        Taken names and account ids are found with one query, the rest
+        of tenants are saved with one insert_many
+        """
+        adapter = Tenant.mongo_adapter()
+        collection = adapter.get_collection(Tenant)
+        name_attr = Tenant.name.attr_name
+        acc_attr = Tenant.project.attr_name
+        accounts = [t.project for t in tenants if t.project]
+        names, taken_accounts = set(), set()
+        for doc in collection.find(
+                {'$or': [
+                    {name_attr: {'$in': [t.name for t in tenants]}},
+                    {acc_attr: {'$in': accounts}}
+                ]},
+                {name_attr: 1, acc_attr: 1, '_id': 0}):
+            names.add(doc.get(name_attr))
+            taken_accounts.add(doc.get(acc_attr))
+        rejected = {}
+        to_save = []
+        for tenant in tenants:
+            if tenant.name in names:
+                rejected[tenant.name] = (f'Tenant with name '
+                                         f'\'{tenant.name}\' already exist.')
+            elif tenant.project and tenant.project in taken_accounts:
+                rejected[tenant.name] = (f'Tenant with account id '
+                                         f'\'{tenant.project}\' already '
+                                         f'exist.')
+            else:
+                to_save.append(tenant)
+        if not to_save:
+            return rejected
+        try:
+            collection.insert_many(
+                [MONGO_SERIALIZER.serialize(t) for t in to_save],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            # the tenants are created concurrently, unique indexes
+            # reject the ones whose name or account id is taken meanwhile
+            for error in e.details.get('writeErrors', ()):
+                if error.get('code') != DUPLICATE_KEY:
+                    raise
+                tenant = to_save[error['index']]
+                if acc_attr in (error.get('keyPattern') or {}):
+                    rejected[tenant.name] = (f'Tenant with account id '
+                                             f'\'{tenant.project}\' already '
+                                             f'exist.')
+                else:
+                    rejected[tenant.name] = (f'Tenant with name '
+                                             f'\'{tenant.name}\' already '
+                                             f'exist.')
+        return rejected
+
+    def _insert_many_dynamodb(self, tenants: list[Tenant]) -> dict[str, str]:
+        """
+        Names are checked with BatchGetItem. The account id index can be
+        queried only by one key, so accounts are checked one by one.
+        BatchWriteItem does not support conditions
+        """
+        rejected = {}
+        existing = {t.name for t in Tenant.batch_get(
+            [t.name for t in tenants], attributes_to_get=[Tenant.name]
+        )}
+        to_save = []
+        for tenant in tenants:
+            if tenant.name in existing:
+                rejected[tenant.name] = (f'Tenant with name '
+                                         f'\'{tenant.name}\' already exist.')
+            elif tenant.project and next(self.i_get_by_acc(
+                    acc=tenant.project, limit=1,
+                    attributes_to_get=[Tenant.name]), None):
+                rejected[tenant.name] = (f'Tenant with account id '
+                                         f'\'{tenant.project}\' already '
+                                         f'exist.')
+            else:
+                to_save.append(tenant)
+        with Tenant.batch_write() as batch:
+            for tenant in to_save:
+                batch.save(tenant)
+        return rejected
+
     @staticmethod
     def update(tenant_item: Tenant, actions: list[Action]) -> None:
         if actions:
             tenant_item.update(actions=actions)
 
+    def remove(self, tenant: Tenant) -> bool:
+        """
+        Deletes the tenant only if its state in the database is the same
+        as in the given tenant, so that the caller knows what exactly was
+        deleted. The tenant is reloaded and deleted again if it was
+        changed concurrently. Returns False if the tenant does not exist
+        anymore
+        """
+        for _ in range(CONDITIONAL_UPDATE_ATTEMPTS):
+            if delete_if(tenant, self._state_is(bool(tenant.is_active))):
+                RegionMutatorService.unlink_tenant(tenant)
+                return True
+            _LOG.info(f'Tenant \'{tenant.name}\' was changed, reloading')
+            if not self._reload(tenant):
+                return False
+        raise ModularException(
+            code=HTTPStatus.CONFLICT.value,
+            content=f'Tenant \'{tenant.name}\' is being changed '
+                    f'concurrently. Try again'
+        )
+
+    @staticmethod
+    def projection(fields: Iterable[str]) -> Projection:
+        return Projection(Tenant, fields, renamed={'account_id': 'project'})
+
     @staticmethod
-    def remove(tenant: Tenant):
-        tenant.delete()
+    def i_get_tenant_by_customer(customer_id: str,
+                                 active: bool | None = None,
+                                 tenant_name: str | None = None,
+                                 limit: int | None = None,
+                                 last_evaluated_key: dict | int | None = None,
+                                 cloud: str | None = None,
+                                 attributes_to_get: list | None = None,
+                                 rate_limit: int | None = None,
+                                 search: str | None = None
+                                 ) -> Iterator[Tenant]:
+        """
+        :param search: prefix of display name (case-insensitive) or of
+        account id. Mongo finds it using the indexes made by create-indexes.
+        Tenants table in DynamoDB has no index with customer and one of
+        these attributes, so there the prefix is a filter of the customer
+        index and all the customer's tenants can be read
+        """
+        condition = None
+        if isinstance(active, bool):
+            condition &= Tenant.is_active == active
+        if tenant_name:
+            condition &= Tenant.name == tenant_name
+        if cloud:
+            condition &= Tenant.cloud == cloud
+        if search:
+            # ranges instead of begins_with, so that Mongo can use indexes
+            # and regex special characters need no escaping
+            lower = search.lower()
+            condition &= (
+                Tenant.display_name_to_lower.between(lower, lower + MAX_CHAR)
+                | Tenant.project.between(search, search + MAX_CHAR)
+            )
+        return pagination.query(
+            model=Tenant,
+            hash_key=customer_id,
+            filter_condition=condition,
+            index=Tenant.customer_name_index,
+            limit=limit,
+            last_evaluated_key=last_evaluated_key,
+            attributes_to_get=attributes_to_get,
+            rate_limit=rate_limit
+        )
@@ -0,0 +1,133 @@
+import re
+import threading
+from collections import OrderedDict
+
+from modular_sdk.models.tenant import Tenant
+from modular_sdk.services.tenant_service import TenantService
+
+from commons.constants import Env
+from commons.log_helper import get_logger
+
+_LOG = get_logger(__name__)
+
+# AWS account id and Azure subscription id. Google project ids look like
+# tenant names, so for them the name is tried first
+ACCOUNT_ID_PATTERNS = (
+    re.compile(r'^\d{12}$'),
+    re.compile(
+        r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$',
+        re.IGNORECASE
+    ),
+)
+
+
+class TenantResolver:
+    """
+    Finds a tenant by a value that can be either its name or its account
+    id. Which lookup to do first is decided by the shape of the value, the
+    other one is done only if the first one finds nothing. Names of
+    resolved tenants are remembered so that next time one lookup by name
+    is enough, and resolved tenants are memoized till the end of the
+    current request. Safe to use from several threads: names are shared
+    under a lock, memo is kept per thread because a thread handles one
+    request at a time
+    """
+
+    __slots__ = ('_ts', '_lru', '_lru_size', '_lock', '_local')
+
+    def __init__(self, tenant_service: TenantService, lru_size: int = 1024):
+        self._ts = tenant_service
+        self._lru: OrderedDict[str, str] = OrderedDict()
+        self._lru_size = lru_size
+        self._lock = threading.Lock()
+
+        self._local = threading.local()  # memo and memo_request
+
+    @staticmethod
+    def looks_like_account_id(value: str) -> bool:
+        return any(p.match(value) for p in ACCOUNT_ID_PATTERNS)
+
+    @staticmethod
+    def _matches(tenant: Tenant, value: str) -> bool:
+        return tenant.name == value.upper() or tenant.project == value
+
+    def _by_name(self, value: str) -> Tenant | None:
+        return self._ts.get(value.upper())
+
+    def _by_account_id(self, value: str) -> Tenant | None:
+        return next(self._ts.i_get_by_acc(acc=value, limit=1), None)
+
+    def _current_memo(self) -> dict[str, Tenant] | None:
+        """
+        Returns memo of the current request. None if there is no request
+        """
+        request_id = Env.INVOCATION_REQUEST_ID.get()
+        if not request_id:
+            return
+        local = self._local
+        if request_id != getattr(local, 'memo_request', None):
+            local.memo = {}
+            local.memo_request = request_id
+        return local.memo
+
+    def _remember(self, value: str, name: str) -> None:
+        with self._lock:
+            self._lru[value] = name
+            self._lru.move_to_end(value)
+            if len(self._lru) > self._lru_size:
+                self._lru.popitem(last=False)
+
+    def _find(self, value: str) -> Tenant | None:
+        with self._lock:
+            name = self._lru.get(value)
+        if name:
+            tenant = self._ts.get(name)
+            if tenant and self._matches(tenant, value):
+                with self._lock:
+                    if value in self._lru:
+                        self._lru.move_to_end(value)
+                return tenant
+            _LOG.debug(f'Tenant remembered by {value} has changed')
+            with self._lock:
+                self._lru.pop(value, None)
+
+        if self.looks_like_account_id(value):
+            lookups = (self._by_account_id, self._by_name)
+        else:
+            lookups = (self._by_name, self._by_account_id)
+        for lookup in lookups:
+            if tenant := lookup(value):
+                self._remember(value, tenant.name)
+                return tenant
+        return
+
+    def resolve(self, value: str,
+                customer_id: str | None = None) -> Tenant | None:
+        """
+        :param value: tenant name or account id
+        :param customer_id: if given, tenants of other customers are
+        not returned
+        """
+        memo = self._current_memo()
+        if memo is not None and value in memo:
+            tenant = memo[value]
+        else:
+            tenant = self._find(value)
+            if tenant and memo is not None:
+                memo[value] = tenant
+        if not tenant or (customer_id and tenant.customer_name != customer_id):
+            return
+        return tenant
+
+    def forget(self, tenant: Tenant) -> None:
+        """
+        Must be called when the tenant is removed
+        """
+        with self._lock:
+            for value in [k for k, v in self._lru.items()
+                          if v == tenant.name]:
+                self._lru.pop(value, None)
+        memo = getattr(self._local, 'memo', {})
+        for value in [k for k, v in memo.items() if v is tenant or
+                      v.name == tenant.name]:
+            memo.pop(value, None)
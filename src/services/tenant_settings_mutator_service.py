@@ -0,0 +1,111 @@
+from typing import Iterable, Iterator
+
+from modular_sdk.models.tenant import Tenant
+from modular_sdk.models.tenant_settings import TenantSettings
+from modular_sdk.services.tenant_service import TenantService
+from modular_sdk.services.tenant_settings_service import TenantSettingsService
+
+from models import pagination
+
+
+class TenantSettingsMutatorService(TenantSettingsService):
+    def __init__(self, tenant_service: TenantService):
+        self._ts = tenant_service
+
+    @staticmethod
+    def batch_get(tenant_name: str,
+                  keys: Iterable[str]) -> list[TenantSettings]:
+        """
+        Returns existing settings of the tenant with the given keys in the
+        order of keys. Makes one BatchGetItem request per 100 keys
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return []
+        found = {
+            item.key: item for item in
+            TenantSettings.batch_get([(tenant_name, key) for key in keys])
+        }
+        return [found[key] for key in keys if key in found]
+
+    @staticmethod
+    def batch_save(items: list[TenantSettings]) -> None:
+        """
+        Overwrites the given settings. Makes one BatchWriteItem request
+        per 25 settings
+        """
+        with TenantSettings.batch_write() as batch:
+            for item in items:
+                batch.save(item)
+
+    def customer_tenant_names(self, customer_id: str) -> set[str]:
+        return {
+            tenant.name for tenant in self._ts.i_get_tenant_by_customer(
+                customer_id=customer_id,
+                attributes_to_get=[Tenant.name]
+            )
+        }
+
+    def query_by_key(self, key: str, customer_id: str | None = None,
+                     limit: int | None = None,
+                     last_evaluated_key: dict | int | None = None
+                     ) -> tuple[list[TenantSettings], dict | int | None]:
+        """
+        Settings with the given key across all tenants of the customer.
+        Served by the index on key. The index knows nothing about
+        customers so settings of other customers' tenants are filtered out
+        after reading and a page can contain fewer than limit items.
+        Returns the items and the key to continue from
+        """
+        cursor = self.i_get_by_key(key=key, limit=limit,
+                                   last_evaluated_key=last_evaluated_key)
+        items = list(cursor)
+        if customer_id:
+            names = self.customer_tenant_names(customer_id)
+            items = [item for item in items if item.tenant_name in names]
+        return items, cursor.last_evaluated_key
+
+    def iter_by_key(self, key: str, customer_id: str | None = None
+                    ) -> Iterator[TenantSettings]:
+        """
+        Lazily iterates over all the settings with the given key of the
+        customer's tenants
+        """
+        names = None
+        if customer_id:
+            names = self.customer_tenant_names(customer_id)
+        for item in self.i_get_by_key(key=key):
+            if names is None or item.tenant_name in names:
+                yield item
+
+    @staticmethod
+    def i_get_by_tenant(tenant: str, key: str | None = None,
+                        limit: int | None = None,
+                        last_evaluated_key: dict | int | None = None,
+                        rate_limit: int | None = None
+                        ) -> Iterator[TenantSettings]:
+        return pagination.query(
+            model=TenantSettings,
+            hash_key=tenant,
+            range_key_condition=(TenantSettings.key == key) if key else None,
+            limit=limit,
+            last_evaluated_key=last_evaluated_key,
+            rate_limit=rate_limit
+        )
+
+    @staticmethod
+    def i_get_by_key(key: str, tenant: str | None = None,
+                     limit: int | None = None,
+                     last_evaluated_key: dict | int | None = None
+                     ) -> Iterator[TenantSettings]:
+        fc = None
+        if tenant:
+            fc = (TenantSettings.tenant_name == tenant)
+        return pagination.query(
+            model=TenantSettings,
+            hash_key=key,
+            filter_condition=fc,
+            index=TenantSettings.key_tenant_name_index,
+            limit=limit,
+            last_evaluated_key=last_evaluated_key
+        )
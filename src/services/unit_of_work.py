@@ -0,0 +1,213 @@
+import threading
+import weakref
+from typing import Hashable
+
+from pynamodb.connection import Connection
+from pynamodb.exceptions import TransactWriteError
+from pynamodb.models import Model
+from pynamodb.transactions import TransactWrite
+
+from commons.log_helper import get_logger
+from models import MONGO_SERIALIZER
+from models.operations import insert_if_not_exists
+
+_LOG = get_logger(__name__)
+
+# DynamoDB cancellation reason of an item whose condition failed
+CONDITIONAL_CHECK_FAILED_REASON = 'ConditionalCheckFailed'
+# Mongo client -> whether its deployment supports transactions
+_TRANSACTIONS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_TRANSACTIONS_LOCK = threading.Lock()
+
+
+class UnitOfWorkConflict(Exception):
+    """
+    One of the items already exists. Nothing was saved
+    """
+
+    def __init__(self, item: Model):
+        self.item = item
+        super().__init__(f'{type(item).__name__} already exists')
+
+
+def supports_transactions(client) -> bool:
+    """
+    Replica sets and sharded clusters support transactions, standalone
+    servers do not. Asked once per client, a deployment of a client does
+    not change while it's alive
+    """
+    with _TRANSACTIONS_LOCK:
+        if client in _TRANSACTIONS:
+            return _TRANSACTIONS[client]
+    try:
+        hello = client.admin.command('hello')
+    except NotImplementedError:  # mongomock
+        supported = False
+    else:
+        supported = 'setName' in hello or hello.get('msg') == 'isdbgrid'
+    if not supported:
+        _LOG.info('Mongo does not support transactions')
+    with _TRANSACTIONS_LOCK:
+        _TRANSACTIONS[client] = supported
+    return supported
+
+
+class UnitOfWork:
+    """
+    Saves several items so that either all of them are saved or none.
+    Items that live in the same DynamoDB region are saved with one
+    TransactWriteItems request, items in the same Mongo cluster with one
+    multi-document transaction. Otherwise (different connections or a
+    standalone Mongo that does not support transactions) items are
+    inserted one by one and the inserted ones are undone if a next one
+    cannot be inserted. Undoing deletes inserted items and restores the
+    items that were overwritten
+    """
+
+    __slots__ = ('_items', '_conditional', '_committed', '_previous')
+
+    def __init__(self):
+        self._items: list[Model] = []
+        self._conditional: list[bool] = []
+        self._committed: list[Model] = []
+        # id of an overwriting item -> the overwritten one or None
+        self._previous: dict[int, Model | None] = {}
+
+    def insert(self, item: Model) -> None:
+        """
+        Adds a new item. It won't be saved if an item with the same key
+        exists, UnitOfWorkConflict is raised on commit in that case
+        """
+        self._items.append(item)
+        self._conditional.append(True)
+
+    def save(self, item: Model) -> None:
+        """
+        Adds an item that overwrites an existing one with the same key.
+        The existing one is read on commit to restore it if needed
+        """
+        self._items.append(item)
+        self._conditional.append(False)
+
+    def _pairs(self):
+        return zip(self._items, self._conditional)
+
+    @staticmethod
+    def _stored(item: Model) -> Model | None:
+        """
+        Returns the item with the same key that is in the DB now
+        """
+        model = type(item)
+        range_key = None
+        if model._range_keyname:
+            range_key = getattr(item, model._range_keyname)
+        try:
+            return model.get(getattr(item, model._hash_keyname), range_key,
+                             consistent_read=True)
+        except model.DoesNotExist:
+            return None
+
+    def _read_previous(self) -> None:
+        for item, conditional in self._pairs():
+            if not conditional:
+                self._previous[id(item)] = self._stored(item)
+
+    @staticmethod
+    def _save_mongo(item: Model, session=None) -> None:
+        ser = MONGO_SERIALIZER
+        item.mongo_adapter().get_collection(item).replace_one(
+            ser.instance_serialized_keys(item), ser.serialize(item),
+            upsert=True, session=session
+        )
+
+    @staticmethod
+    def _dynamodb_connection_key(model: type[Model]) -> Hashable | None:
+        """
+        Items of models with the same key can be saved in one transaction.
+        None if the model uses its own credentials
+        """
+        meta = model.Meta
+        if getattr(meta, 'aws_access_key_id', None):
+            return
+        return getattr(meta, 'region', None), getattr(meta, 'host', None)
+
+    def _commit_dynamodb(self, region: str | None, host: str | None) -> None:
+        items = self._items
+        connection = Connection(region=region, host=host)
+        try:
+            with TransactWrite(connection=connection) as transaction:
+                for item, conditional in self._pairs():
+                    condition = None
+                    if conditional:
+                        condition = (type(item)._hash_key_attribute()
+                                     .does_not_exist())
+                    transaction.save(item, condition=condition)
+        except TransactWriteError as e:
+            for item, reason in zip(items, e.cancellation_reasons):
+                if reason and reason.code == CONDITIONAL_CHECK_FAILED_REASON:
+                    raise UnitOfWorkConflict(item) from e
+            raise
+
+    def _commit_mongo(self, client) -> None:
+        with client.start_session() as session:
+            with session.start_transaction():
+                for item, conditional in self._pairs():
+                    if not conditional:
+                        self._save_mongo(item, session)
+                    elif not insert_if_not_exists(item, session=session):
+                        raise UnitOfWorkConflict(item)
+
+    def _commit_one_by_one(self) -> None:
+        inserted = []
+        try:
+            for item, conditional in self._pairs():
+                if not conditional:
+                    item.save()
+                elif not insert_if_not_exists(item):
+                    raise UnitOfWorkConflict(item)
+                inserted.append(item)
+        except Exception:
+            _LOG.warning('Could not save all the items, '
+                         'undoing the saved ones')
+            self._undo(inserted)
+            raise
+
+    def _undo(self, items: list[Model]) -> None:
+        for item in reversed(items):
+            if (previous := self._previous.get(id(item))) is not None:
+                previous.save()
+            else:
+                item.delete()
+
+    def commit(self) -> None:
+        items = self._items
+        if not items:
+            return
+        self._read_previous()
+        if not any(item.is_mongo_model() for item in items):
+            keys = {self._dynamodb_connection_key(type(i)) for i in items}
+            if len(keys) == 1 and None not in keys:
+                self._commit_dynamodb(*keys.pop())
+                self._committed = list(items)
+                return
+        elif all(item.is_mongo_model() for item in items):
+            clients = {}
+            for item in items:
+                client = item.mongo_adapter().get_collection(item).database.client
+                clients[id(client)] = client
+            if len(clients) == 1:
+                client = clients.popitem()[1]
+                if supports_transactions(client):
+                    self._commit_mongo(client)
+                    self._committed = list(items)
+                    return
+        self._commit_one_by_one()
+        self._committed = list(items)
+
+    def rollback(self) -> None:
+        """
+        Undoes committed items. Used to compensate a step that is done
+        after commit outside the database and has failed
+        """
+        self._undo(self._committed)
+        self._committed = []
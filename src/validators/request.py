@@ -2,11 +2,8 @@ import base64
 import binascii
 from datetime import datetime, timezone
 from typing_extensions import Self, TypedDict, Annotated
-import uuid
 from commons.constants import Permission
 
-import boto3
-from botocore.exceptions import ClientError
 from modular_sdk.commons.constants import (
     ApplicationType,
     Cloud,
@@ -23,11 +20,15 @@ from pydantic import (
 )
 from pydantic.json_schema import SkipJsonSchema
 
+# settings of one tenant that can be read or written with one request
+MAX_TENANT_SETTINGS = 100
+
 
 class BaseModel(BaseModelPydantic):
     model_config = ConfigDict(
         coerce_numbers_to_str=True,
         populate_by_name=True,
+        defer_build=True,  # validators are built on first use
     )
     customer_id: SkipJsonSchema[str] = Field(
         None,
@@ -62,13 +63,29 @@ class BasePaginationModel(BaseModel):
     next_token: str = Field(None)
 
 
+class BaseFieldsModel(BaseModel):
+    fields: str = Field(
+        None,
+        description='Fields of items to return separated by commas. All '
+                    'the fields are returned by default'
+    )
+
+    @property
+    def fields_to_get(self) -> list[str]:
+        if not self.fields:
+            return []
+        return list(dict.fromkeys(
+            f for f in map(str.strip, self.fields.split(',')) if f
+        ))
+
+
 class CustomerPost(BaseModel):
     name: str
     display_name: str
     admins: set[str] = Field(default_factory=set)
 
 
-class CustomerQuery(BasePaginationModel):
+class CustomerQuery(BasePaginationModel, BaseFieldsModel):
     is_active: bool = Field(None)
 
 
@@ -165,6 +182,47 @@ class RolePatch(BaseModel):
         return self
 
 
+class RBACPolicy(BaseModelPydantic):
+    name: str
+    permissions: set[Permission]
+
+    @field_validator('permissions', mode='after')
+    @classmethod
+    def validate_hidden(cls, permission: set[Permission]) -> set[Permission]:
+        if not_allowed := permission & Permission.hidden():
+            raise ValueError(f'Permissions: {", ".join(not_allowed)} are '
+                             f'currently not allowed')
+        return permission
+
+
+class RBACRole(BaseModelPydantic):
+    name: str
+    policies: set[str]
+    expiration: datetime = Field(None)
+
+
+class RBACImportPost(BaseModel):
+    policies: list[RBACPolicy] = Field(default_factory=list)
+    roles: list[RBACRole] = Field(default_factory=list)
+    dry_run: bool = Field(
+        False,
+        description='Only return the changes that would be made'
+    )
+    prune: bool = Field(
+        False,
+        description='Delete policies and roles that are not in the document'
+    )
+
+    @model_validator(mode='after')
+    def validate_unique(self) -> Self:
+        for kind, items in (('policies', self.policies),
+                            ('roles', self.roles)):
+            names = [item.name for item in items]
+            if len(names) != len(set(names)):
+                raise ValueError(f'names of {kind} must be unique')
+        return self
+
+
 class SignInPost(BaseModel):
     username: str
     password: str
@@ -241,9 +299,15 @@ class SignUpPost(BaseModel):
         return password
 
 
-class TenantQuery(BasePaginationModel):
+class TenantQuery(BasePaginationModel, BaseFieldsModel):
     cloud: Cloud = Field(None)
     is_active: bool = Field(None)
+    search: str = Field(
+        None,
+        min_length=1,
+        description='Returns tenants whose display name (case-insensitive) '
+                    'or account id starts with this value'
+    )
 
 
 class TenantPost(BaseModel):
@@ -258,19 +322,53 @@ class TenantPost(BaseModel):
     default_owner: str = Field(None)
 
 
+class TenantBatchPost(BaseModel):
+    tenants: list[TenantPost] = Field(min_length=1, max_length=100)
+
+
+class RegionQuery(BasePaginationModel):
+    limit: int = Field(
+        None, ge=1, le=1000,
+        description='All the regions are returned if not given'
+    )
+    cloud: Cloud = Field(None)
+    is_active: bool = Field(None)
+
+
 class RegionPost(BaseModel):
     maestro_name: str
     native_name: str
     cloud: str
-    region_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    region_id: str = Field(
+        None, description='Unique id of the region. Generated if not given'
+    )
 
 
 class TenantRegionPost(BaseModel):
-    region: str = Field(description='Maestro region name')
+    region: str = Field(None, description='Maestro region name')
+    regions: list[str] = Field(
+        default_factory=list,
+        description='Maestro region names. Allows to activate many '
+                    'regions at once'
+    )
 
+    @model_validator(mode='after')
+    def collect_regions(self) -> Self:
+        if self.region:
+            self.regions.insert(0, self.region)
+        if not self.regions:
+            raise ValueError('provide either region or regions')
+        self.regions = list(dict.fromkeys(self.regions))
+        return self
 
-class TenantRegionDelete(BaseModel):
-    region: str
+
+class TenantRegionDelete(TenantRegionPost):
+    region: str = Field(None, description='Maestro region name')
+    regions: list[str] = Field(
+        default_factory=list,
+        description='Maestro region names. Allows to deactivate many '
+                    'regions at once'
+    )
 
 
 class ParentGet(BaseModel):
@@ -298,7 +396,7 @@ class ParentDelete(BaseModel):
     parent_id: str
 
 
-class ApplicationQuery(BasePaginationModel):
+class ApplicationQuery(BasePaginationModel, BaseFieldsModel):
     type: ApplicationType = Field(None)
 
 
@@ -322,6 +420,10 @@ class ApplicationPostAWSCredentials(BaseModel):
 
     @model_validator(mode='after')
     def _(self) -> Self:
+        # boto3 is imported here because it's too heavy for cold start
+        import boto3
+        from botocore.exceptions import ClientError
+
         cl = boto3.client(
             'sts',
             aws_access_key_id=self.access_key_id,
@@ -382,15 +484,52 @@ class ApplicationPostGCPServiceAccount(BaseModel):
 class TenantSettingQuery(BasePaginationModel):
     key: str = Field(
         None,
-        description='Note that a tenant can have only one setting for a '
-                    'specific key. So in case you provide this value either '
-                    'an empty list of a list with one element is returned'
+        description='One key or several keys separated by commas. Note that '
+                    'a tenant can have only one setting for a specific key. '
+                    'So in case you provide this value only the settings '
+                    'with these keys are returned and pagination is not used'
     )
 
+    @property
+    def keys_to_get(self) -> list[str]:
+        if not self.key:
+            return []
+        return list(dict.fromkeys(
+            k for k in map(str.strip, self.key.split(',')) if k
+        ))
+
+    @model_validator(mode='after')
+    def validate_keys(self) -> Self:
+        if len(self.keys_to_get) > MAX_TENANT_SETTINGS:
+            raise ValueError(f'not more than {MAX_TENANT_SETTINGS} keys '
+                             f'can be requested at once')
+        return self
+
+
+class TenantSettingsKeyQuery(BasePaginationModel):
+    key: str = Field(description='Setting key to look for in all tenants')
+
 
 class TenantSettingPut(BaseModel):
-    key: str
-    value: dict | list | str | int | float | None
+    key: str = Field(None)
+    value: dict | list | str | int | float | None = Field(None)
+    settings: dict[str, dict | list | str | int | float | None] = Field(
+        default_factory=dict,
+        max_length=MAX_TENANT_SETTINGS,
+        description='Map of setting keys to values. Allows to put many '
+                    'settings at once'
+    )
+
+    @model_validator(mode='after')
+    def collect_settings(self) -> Self:
+        if self.key:
+            self.settings[self.key] = self.value
+        if not self.settings:
+            raise ValueError('provide either key and value or settings')
+        if len(self.settings) > MAX_TENANT_SETTINGS:
+            raise ValueError(f'not more than {MAX_TENANT_SETTINGS} settings '
+                             f'can be put at once')
+        return self
 
 
 
@@ -4,7 +4,7 @@ from http import HTTPStatus
 from modular_sdk.commons.constants import ApplicationType, ParentType, \
     ParentScope, Cloud
 from pydantic import BaseModel
-from typing_extensions import TypedDict
+from typing_extensions import NotRequired, TypedDict
 
 
 class ErrorData(TypedDict):
@@ -93,6 +93,13 @@ class Tenant(TypedDict):
     regions: list[str]
 
 
+class TenantBatchItem(TypedDict):
+    name: str
+    code: int
+    message: NotRequired[str]
+    data: NotRequired[Tenant]
+
+
 class TenantSetting(TypedDict):
     tenant_name: str
     key: str
@@ -124,6 +131,56 @@ class TenantResponse(BaseModel):
     data: Tenant
 
 
+class TenantBatchResponse(BaseModel):
+    items: list[TenantBatchItem]
+
+
+class TenantsCount(TypedDict):
+    total: int
+    active: int
+    inactive: int
+
+
+class TenantsStats(TenantsCount):
+    clouds: dict[Cloud, TenantsCount]
+
+
+class TenantsStatsResponse(BaseModel):
+    data: TenantsStats
+
+
+class RBACRole(TypedDict):
+    name: str
+    policies: list[str]
+    expiration: NotRequired[str]
+
+
+class RBACDocument(TypedDict):
+    policies: list[Policy]
+    roles: list[RBACRole]
+
+
+class RBACExportResponse(BaseModel):
+    data: RBACDocument
+
+
+class RBACChanges(TypedDict):
+    created: list[str]
+    updated: list[str]
+    deleted: list[str]
+    unchanged: list[str]
+
+
+class RBACImportResult(TypedDict):
+    dry_run: bool
+    policies: RBACChanges
+    roles: RBACChanges
+
+
+class RBACImportResponse(BaseModel):
+    data: RBACImportResult
+
+
 class RolesResponse(BaseModel):
     items: list[Role]
 
@@ -153,8 +210,18 @@ class ApplicationResponse(BaseModel):
     data: Application
 
 
+class ApplicationsStats(TypedDict):
+    total: int
+    types: dict[ApplicationType, int]
+
+
+class ApplicationsStatsResponse(BaseModel):
+    data: ApplicationsStats
+
+
 class RegionsResponse(BaseModel):
     items: list[Region]
+    next_token: str | None = None
 
 
 class RegionResponse(BaseModel):
@@ -185,6 +252,15 @@ class UsersResponse(BaseModel):
     next_token: str | None
 
 
+class UsersStats(TypedDict):
+    total: int
+    roles: dict[str, int]
+
+
+class UsersStatsResponse(BaseModel):
+    data: UsersStats
+
+
 class MessageModel(BaseModel):
     message: str
 
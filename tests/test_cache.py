@@ -0,0 +1,61 @@
+import pytest
+
+from commons.cache import IndexedCache
+
+
+class Item:
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+
+
+@pytest.fixture
+def storage() -> list[Item]:
+    return [Item('one', 'a'), Item('two', 'b')]
+
+
+@pytest.fixture
+def loads() -> list:
+    return []
+
+
+@pytest.fixture
+def cache(storage, loads) -> IndexedCache[Item]:
+    def loader():
+        loads.append(1)
+        return iter(storage)
+
+    return IndexedCache(
+        loader=loader,
+        indexes={'name': lambda i: i.name, 'kind': lambda i: (i.kind, 1)},
+        ttl=60
+    )
+
+
+def test_loaded_once(cache, loads):
+    assert not loads
+    assert cache.get('name', 'one').kind == 'a'
+    assert cache.get('kind', ('b', 1)).name == 'two'
+    assert cache.get('name', 'three') is None
+    assert [i.name for i in cache.all()] == ['one', 'two']
+    assert len(loads) == 1
+
+
+def test_invalidate(cache, storage, loads):
+    assert cache.get('name', 'three') is None
+    storage.append(Item('three', 'c'))
+    assert cache.get('name', 'three') is None
+    cache.invalidate()
+    assert cache.get('name', 'three').kind == 'c'
+    assert len(loads) == 2
+
+
+def test_ttl(storage, loads):
+    cache = IndexedCache(
+        loader=lambda: loads.append(1) or storage,
+        indexes={'name': lambda i: i.name},
+        ttl=0
+    )
+    cache.all()
+    cache.all()
+    assert len(loads) == 2
@@ -0,0 +1,18 @@
+import pytest
+from modular_sdk.models.pynamongo.indexes_creator import ensure_indexes
+from pymongo.operations import IndexModel
+
+from main import CreateIndexes
+
+
+def test_not_created_unique_index_is_missing():
+    mongomock = pytest.importorskip('mongomock')
+    collection = mongomock.MongoClient().db.tenants
+    collection.insert_many([{'n': 'T1', 'acc': '1'},
+                            {'n': 'T2', 'acc': '1'}])
+    indexes = (
+        IndexModel(keys=[('n', -1)], name='n-unique-index', unique=True),
+        IndexModel(keys=[('acc', -1)], name='acc-unique-index', unique=True),
+    )
+    ensure_indexes(indexes, collection)  # logs the duplicates, no error
+    assert CreateIndexes.missing(indexes, collection) == ['acc-unique-index']
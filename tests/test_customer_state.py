@@ -0,0 +1,63 @@
+import pytest
+
+from modular_sdk.models.customer import Customer
+
+from services.customer_mutator_service import CustomerMutatorService
+
+
+@pytest.fixture
+def storage(monkeypatch) -> dict:
+    """
+    Customers by name, DB reads are counted in '_reads'
+    """
+    items = {'_reads': 0}
+
+    def get_nullable(hash_key, attributes_to_get=None):
+        items['_reads'] += 1
+        return items.get(hash_key)
+
+    monkeypatch.setattr(Customer, 'get_nullable', get_nullable)
+    monkeypatch.setattr(Customer, 'save', lambda self: items.update(
+        {self.name: self}))
+    return items
+
+
+def test_existence_cached(storage):
+    service = CustomerMutatorService(state_ttl=60)
+    storage['ONE'] = Customer(name='ONE', is_active=True)
+    assert service.does_exist('ONE')
+    assert service.does_exist('ONE', is_active=True)
+    assert not service.does_exist('ONE', is_active=False)
+    assert not service.does_exist('TWO')
+    assert not service.does_exist('TWO')
+    assert storage['_reads'] == 2
+
+
+def test_invalidated_on_save(storage):
+    service = CustomerMutatorService(state_ttl=60)
+    assert not service.does_exist('TWO')
+    service.save(service.build('TWO', 'two'))
+    assert service.does_exist('TWO')
+    assert storage['_reads'] == 2
+
+
+def test_invalidated_while_read(storage, monkeypatch):
+    service = CustomerMutatorService(state_ttl=60)
+    get_nullable = Customer.get_nullable
+
+    def read_then_insert(hash_key, attributes_to_get=None):
+        item = get_nullable(hash_key)
+        if hash_key not in storage:
+            service.save(service.build(hash_key, 'two'))
+        return item
+
+    monkeypatch.setattr(Customer, 'get_nullable', read_then_insert)
+    assert not service.does_exist('TWO')  # read before the insert
+    assert service.does_exist('TWO')
+
+
+def test_ttl(storage):
+    service = CustomerMutatorService(state_ttl=0)
+    service.does_exist('ONE')
+    service.does_exist('ONE')
+    assert storage['_reads'] == 2
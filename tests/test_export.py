@@ -0,0 +1,34 @@
+import json
+
+import services.export_service as export_service
+from commons.lambda_response import NdjsonResponse
+from services.export_service import ExportService
+
+
+def test_ndjson_lines():
+    lines = list(NdjsonResponse(iter([{'b': 1, 'a': 2}, {'c': [3]}]))
+                 .iter_lines())
+    assert lines == [b'{"a":2,"b":1}\n', b'{"c":[3]}\n']
+    assert [json.loads(line) for line in lines] == [{'a': 2, 'b': 1},
+                                                    {'c': [3]}]
+
+
+def test_is_requested():
+    assert ExportService.is_requested(
+        {'headers': {'accept': 'application/x-ndjson'}}
+    )
+    assert ExportService.is_requested(
+        {'headers': {'Accept': 'application/json, application/x-ndjson'}}
+    )
+    assert not ExportService.is_requested(
+        {'headers': {'Accept': 'application/json'}}
+    )
+    assert not ExportService.is_requested({'headers': None})
+
+
+def test_parts(monkeypatch):
+    monkeypatch.setattr(export_service, 'PART_SIZE', 10)
+    lines = iter([b'123456\n', b'1234\n', b'12\n', b'1\n'])
+    parts = list(ExportService._iter_parts(lines))
+    assert parts == [b'123456\n1234\n', b'12\n1\n']
+    assert list(ExportService._iter_parts(iter([]))) == []
@@ -0,0 +1,93 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from commons.lambda_response import ApplicationException
+from models.idempotency_key import IdempotencyKey
+from services import idempotency_service
+from services.idempotency_service import IdempotencyService
+
+
+@pytest.fixture
+def storage(monkeypatch) -> dict:
+    """
+    Idempotency keys by id
+    """
+    items = {}
+
+    def insert(item, unique=(), session=None):
+        if item.id in items:
+            return False
+        items[item.id] = item
+        return True
+
+    def update(self, actions):
+        for action in actions:
+            path, value = action.values
+            if path.attribute is IdempotencyKey.response:
+                self.response = value.value['S']
+
+    monkeypatch.setattr(idempotency_service, 'insert_if_not_exists', insert)
+    monkeypatch.setattr(IdempotencyKey, 'get_nullable',
+                        lambda hash_key: items.get(hash_key))
+    monkeypatch.setattr(IdempotencyKey, 'update', update)
+    monkeypatch.setattr(IdempotencyKey, 'delete',
+                        lambda self, condition=None: items.pop(self.id))
+    return items
+
+
+def event(body: dict) -> dict:
+    return {'method': 'POST', 'path': '/tenants', 'body': body,
+            'cognito_user_id': 'user', 'headers': {}}
+
+
+def output(code: int = 201) -> dict:
+    return {'statusCode': code, 'headers': {}, 'body': '{}',
+            'isBase64Encoded': False}
+
+
+def test_executed_once(storage):
+    service = IdempotencyService()
+    calls = []
+    func = lambda: calls.append(1) or output()  # noqa
+    first = service.execute(event({'a': 1}), 'key', func)
+    second = service.execute(event({'a': 1}), 'key', func)
+    assert len(calls) == 1
+    assert second['statusCode'] == first['statusCode']
+    assert second['headers']['Idempotent-Replayed'] == 'true'
+
+    with pytest.raises(ApplicationException) as e:
+        service.execute(event({'a': 2}), 'key', func)
+    assert e.value.response.code == 422
+
+
+def test_server_error_released(storage):
+    service = IdempotencyService()
+    service.execute(event({}), 'key', lambda: output(500))
+    assert not storage
+    with pytest.raises(ZeroDivisionError):
+        service.execute(event({}), 'key', lambda: 1 / 0 or output())
+    assert not storage
+
+
+def test_waits_for_in_flight(storage, monkeypatch):
+    service = IdempotencyService(wait=1, poll_interval=0.01)
+    in_flight = IdempotencyKey(
+        id='user:key',
+        fingerprint=service.fingerprint(event({})),
+        expire_at=datetime.now(timezone.utc) + timedelta(minutes=1)
+    )
+    storage[in_flight.id] = in_flight
+
+    def sleep(seconds):  # the first request completes meanwhile
+        in_flight.response = json.dumps(output(200))
+
+    monkeypatch.setattr(idempotency_service.time, 'sleep', sleep)
+    assert service.execute(event({}), 'key', output)['statusCode'] == 200
+
+    in_flight.response = None
+    monkeypatch.setattr(idempotency_service.time, 'sleep', lambda s: None)
+    with pytest.raises(ApplicationException) as e:
+        IdempotencyService(wait=0).execute(event({}), 'key', output)
+    assert e.value.response.code == 409
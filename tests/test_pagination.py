@@ -0,0 +1,47 @@
+import pytest
+from bson import ObjectId
+from modular_sdk.commons import ModularException
+
+from models import pagination
+from models.pagination import KeysetResultIterator, _seek
+from models.policy import Policy
+
+
+class Serializer:
+    @staticmethod
+    def deserialize(model, item):
+        return model(customer=item['customer'], name=item['name'])
+
+
+def test_seek():
+    oid = ObjectId()
+    assert _seek(('_id',), {'_id': str(oid)}) == {'_id': {'$gt': oid}}
+    assert _seek(('t', '_id'), {'t': 'A', '_id': str(oid)}) == {'$or': [
+        {'t': {'$gt': 'A'}},
+        {'t': 'A', '_id': {'$gt': oid}}
+    ]}
+    assert _seek(('_id',), {'_id': 'invalid'}) is None
+    assert _seek(('t', '_id'), {'_id': str(oid)}) is None
+
+
+def test_last_evaluated_key_only_if_more():
+    docs = [{'customer': 'C', 'name': str(i)} for i in range(3)]
+
+    it = KeysetResultIterator(iter(docs), Policy, Serializer(), ('name',),
+                              limit=2)
+    assert [p.name for p in it] == ['0', '1']
+    assert it.last_evaluated_key == {'name': '1'}
+
+    it = KeysetResultIterator(iter(docs), Policy, Serializer(), ('name',),
+                              limit=3)
+    assert len(list(it)) == 3
+    assert it.last_evaluated_key is None
+
+
+def test_offset_token_is_rejected(monkeypatch):
+    monkeypatch.setattr(Policy, 'is_mongo_model', classmethod(lambda c: True))
+    monkeypatch.setattr(Policy, 'mongo_adapter',
+                        classmethod(lambda c: pytest.fail('queried')))
+    with pytest.raises(ModularException) as e:
+        pagination.query(Policy, 'C', limit=10, last_evaluated_key=20)
+    assert e.value.code == 400
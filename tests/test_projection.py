@@ -0,0 +1,25 @@
+import pytest
+from modular_sdk.commons import ModularException
+from modular_sdk.models.tenant import Tenant
+
+from models.projection import Projection
+
+
+def test_projection_renamed():
+    projection = Projection(Tenant, ['name', 'account_id'],
+                            renamed={'account_id': 'project'})
+    assert projection.attributes_to_get == [Tenant.project, Tenant.name]
+    assert projection.trim({'name': 'A', 'account_id': '1', 'cloud': 'AWS'}) \
+        == {'name': 'A', 'account_id': '1'}
+
+
+def test_projection_all():
+    projection = Projection(Tenant)
+    assert projection.attributes_to_get is None
+    assert projection.trim({'name': 'A'}) == {'name': 'A'}
+
+
+def test_projection_unknown():
+    with pytest.raises(ModularException):
+        Projection(Tenant, ['name', 'project'],
+                   renamed={'account_id': 'project'})
@@ -0,0 +1,128 @@
+import multiprocessing
+
+import pytest
+
+import main
+from commons.constants import Env
+from services import SP, rate_limiter
+from services.rate_limiter import (
+    InMemoryRateLimitBackend,
+    RateLimit,
+    RateLimiter,
+    RouteLimit,
+    SharedMemoryRateLimitBackend,
+)
+
+
+@pytest.fixture
+def now(monkeypatch) -> list[float]:
+    clock = [1000.]
+    monkeypatch.setattr(rate_limiter.time, 'time', lambda: clock[0])
+    return clock
+
+
+@pytest.mark.parametrize('backend', (InMemoryRateLimitBackend,
+                                     SharedMemoryRateLimitBackend))
+def test_bucket(now, backend):
+    b = backend()
+    limit = RateLimit(rate=2, burst=4)
+    assert [b.acquire('k', limit) for _ in range(4)] == [0, 0, 0, 0]
+    assert b.acquire('k', limit) == pytest.approx(0.5)
+    assert b.acquire('other', limit) == 0
+    now[0] += 0.5
+    assert b.acquire('k', limit) == 0
+    assert b.acquire('k', limit) == pytest.approx(0.5)
+    now[0] += 10  # does not accumulate more than burst
+    assert b.acquire('k', limit, cost=4) == 0
+    assert b.acquire('k', limit) > 0
+    b.release('k', limit, cost=2)
+    assert b.acquire('k', limit, cost=2) == 0
+    assert b.acquire('k', limit) > 0
+
+
+def test_customer_limit(now):
+    limiter = RateLimiter(
+        backend=InMemoryRateLimitBackend(),
+        user_limit=RateLimit(rate=10, burst=2),
+        customer_limit=RateLimit(rate=10, burst=3)
+    )
+    assert limiter.acquire('u1', 'C') == 0
+    assert limiter.acquire('u1', 'C') == 0
+    assert limiter.acquire('u1', 'C') > 0  # user's limit
+    assert limiter.acquire('u2', 'C') == 0
+    assert limiter.acquire('u2', 'C') > 0  # customer's limit
+    assert limiter.acquire('u3', 'D') == 0
+
+
+def test_rejected_by_customer_takes_nothing(now):
+    limiter = RateLimiter(
+        backend=InMemoryRateLimitBackend(),
+        user_limit=RateLimit(rate=10, burst=2),
+        customer_limit=RateLimit(rate=10, burst=1)
+    )
+    assert limiter.acquire('u1', 'C') == 0
+    for _ in range(5):
+        assert limiter.acquire('u2', 'C') > 0  # customer's limit
+    assert limiter.acquire('u2', 'D') == 0
+    assert limiter.acquire('u2', 'D') > 0  # customer's limit, not user's
+    assert limiter.acquire('u2', 'E') == 0  # user's tokens are left
+
+
+def test_route_limit(now):
+    limiter = RateLimiter(
+        backend=InMemoryRateLimitBackend(),
+        user_limit=RateLimit(rate=10, burst=10),
+        customer_limit=RateLimit(rate=10, burst=10)
+    )
+    route = RouteLimit.per_minute('POST /import', user=2, customer=3)
+    assert limiter.acquire('u1', 'C', route=route) == 0
+    assert limiter.acquire('u1', 'C', route=route) == 0
+    assert limiter.acquire('u1', 'C', route=route) == pytest.approx(30)
+    assert limiter.acquire('u1', 'C') == 0  # other routes are not limited
+    assert limiter.acquire('u2', 'C', route=route) == 0
+    assert limiter.acquire('u2', 'C', route=route) > 0  # customer's limit
+    assert limiter.acquire('u3', 'D', route=route) == 0
+    # the rejected requests took no tokens of the shared buckets
+    assert [limiter.acquire('u1', 'C') for _ in range(6)] == [0] * 6
+    assert limiter.acquire('u1', 'C') > 0
+
+
+def _acquire(backend: SharedMemoryRateLimitBackend, limit: RateLimit
+             ) -> None:
+    assert [backend.acquire('k', limit) for _ in range(2)] == [0, 0]
+
+
+def test_shared_memory_is_shared_by_forked_workers(now):
+    backend = SharedMemoryRateLimitBackend()
+    limit = RateLimit(rate=1, burst=2)
+    worker = multiprocessing.get_context('fork').Process(
+        target=_acquire, args=(backend, limit)
+    )
+    worker.start()
+    worker.join(5)
+    assert worker.exitcode == 0
+    assert backend.acquire('k', limit) == pytest.approx(1)
+
+
+@pytest.fixture
+def rate_limiter_unset():
+    yield
+    SP.__dict__.pop('rate_limiter', None)
+
+
+def test_run_builds_rate_limiter_before_serving(monkeypatch,
+                                                rate_limiter_unset):
+    from onprem.app import OnPremApiBuilder
+    monkeypatch.setenv(Env.RATE_LIMIT_BACKEND.value, 'shared')
+    monkeypatch.setenv(Env.SERVICE_MODE.value, 'docker')
+    monkeypatch.setattr(main, 'setup_logging', lambda: None)
+    SP.__dict__.pop('rate_limiter', None)  # built by the handler on import
+    built = []
+
+    class App:
+        def run(self, host, port):
+            built.append(SP.__dict__.get('rate_limiter'))
+
+    monkeypatch.setattr(OnPremApiBuilder, 'build', lambda self, stage: App())
+    main.Run()()
+    assert isinstance(built[0], RateLimiter)
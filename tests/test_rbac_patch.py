@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pynamodb.expressions.update import Update
+
+from commons.constants import Env
+from models import MONGO_SERIALIZER
+from models.policy import Policy
+from models.role import Role
+from services import rbac_service
+from services.rbac_service import RBACService
+
+
+def _serialize(actions, condition) -> tuple[str, str, dict]:
+    names, values = {}, {}
+    update = Update(*actions).serialize(names, values)
+    condition = condition.serialize(names, values)
+    for name, placeholder in names.items():
+        update = update.replace(placeholder, name)
+        condition = condition.replace(placeholder, name)
+    return update, condition, values
+
+
+class Table:
+    """
+    Records conditional updates. `results` are returned by them one by
+    one, `items` by get_nullable
+    """
+
+    def __init__(self, results: list[bool], items: list):
+        self.results = results
+        self.items = items
+        self.updates = []
+        self.reads = 0
+
+    def update_if(self, item, actions, condition) -> bool:
+        self.updates.append(_serialize(actions, condition))
+        return self.results.pop(0)
+
+    def get_nullable(self, hash_key, range_key):
+        self.reads += 1
+        return self.items.pop(0)
+
+
+@pytest.fixture
+def table(monkeypatch):
+    def make(results: list[bool], items: list = ()) -> Table:
+        t = Table(list(results), list(items))
+        monkeypatch.setattr(rbac_service, 'update_if', t.update_if)
+        monkeypatch.setattr(Policy, 'get_nullable', t.get_nullable)
+        monkeypatch.setattr(Role, 'get_nullable', t.get_nullable)
+        return t
+
+    return make
+
+
+def test_dynamodb_attach_and_detach_are_one_update(table):
+    t = table([True, True])
+    RBACService().patch_policy('C', 'p', to_attach=['b:b', 'a:a'])
+    RBACService().patch_policy('C', 'p', to_detach=['c:c'])
+    assert t.reads == 0
+    (add, add_condition, add_values), (delete, _, delete_values) = t.updates
+    assert add == 'ADD permissions :0'
+    assert add_values[':0'] == {'SS': ['a:a', 'b:b']}
+    assert add_condition == ('(attribute_type (permissions, :1) OR '
+                             'attribute_not_exists (permissions))')
+    assert add_values[':1'] == {'S': 'SS'}
+    assert delete == 'DELETE permissions :0'
+    assert delete_values[':0'] == {'SS': ['c:c']}
+
+
+def test_dynamodb_replace(table):
+    t = table([True])
+    RBACService().patch_policy('C', 'p', to_attach=['a:a'], replace=True)
+    update, _, values = t.updates[0]
+    assert update == 'SET permissions = :0'
+    assert values[':0'] == {'SS': ['a:a']}
+
+
+def test_dynamodb_role_expiration(table):
+    t = table([True])
+    expiration = datetime.now(timezone.utc) + timedelta(days=1)
+    RBACService().patch_role('C', 'r', to_attach=['p'],
+                             expiration=expiration)
+    update, _, values = t.updates[0]
+    assert update == 'SET expiration = :0 ADD policies :1'
+    assert values[':1'] == {'SS': ['p']}
+
+
+def test_dynamodb_attach_and_detach_at_once(table):
+    t = table([True], [Policy(customer='C', name='p',
+                              permissions=['a:a', 'b:b'])])
+    item = RBACService().patch_policy('C', 'p', to_attach=['c:c'],
+                                      to_detach=['a:a'])
+    assert item is not None
+    update, condition, values = t.updates[0]
+    assert update == 'SET permissions = :0'
+    assert values[':0'] == {'SS': ['b:b', 'c:c']}
+    assert condition == 'permissions = :1'
+    assert values[':1'] == {'SS': ['a:a', 'b:b']}
+
+
+def test_dynamodb_list_is_converted(table):
+    legacy = Policy(customer='C', name='p', permissions=['a:a'])
+    t = table([False, True, True], [legacy])
+    assert RBACService().patch_policy('C', 'p', to_attach=['b:b'])
+    assert [u[0] for u in t.updates] == [
+        'ADD permissions :0', 'SET permissions = :0', 'ADD permissions :0'
+    ]
+    _, condition, values = t.updates[1]
+    assert condition == 'attribute_type (permissions, :1)'
+    assert values[':1'] == {'S': 'L'}
+
+
+def test_dynamodb_not_found(table):
+    t = table([False], [None])
+    assert RBACService().patch_policy('C', 'p', to_attach=['b:b']) is None
+    assert len(t.updates) == 1
+
+
+def test_dynamodb_reads_lists_and_sets():
+    for value in ({'L': [{'S': 'b:b'}, {'S': 'a:a'}]},
+                  {'SS': ['b:b', 'a:a']}):
+        policy = Policy.from_raw_data({'customer': {'S': 'C'},
+                                       'name': {'S': 'p'},
+                                       'permissions': value})
+        assert policy.permissions == ['a:a', 'b:b']
+    policy = Policy(customer='C', name='p')
+    assert 'permissions' not in policy.serialize()
+
+
+class Adapter:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_collection(self, model):
+        return self.collection
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    mongomock = pytest.importorskip('mongomock')
+    monkeypatch.setenv(Env.SERVICE_MODE.value, 'docker')
+    c = mongomock.MongoClient().db.policies
+    monkeypatch.setattr(Policy, 'mongo_adapter',
+                        classmethod(lambda cls: Adapter(c)))
+    c.insert_one(MONGO_SERIALIZER.serialize(
+        Policy(customer='C', name='p', permissions=['b:b', 'a:a'])
+    ))
+    return c
+
+
+def test_mongo_patch(collection):
+    assert collection.find_one()['permissions'] == ['a:a', 'b:b']
+    service = RBACService()
+    item = service.patch_policy('C', 'p', to_attach=['c:c', 'b:b'],
+                                to_detach=['a:a'])
+    assert item.permissions == ['b:b', 'c:c']
+    assert sorted(collection.find_one()['permissions']) == ['b:b', 'c:c']
+    item = service.patch_policy('C', 'p', to_detach=['b:b', 'x:x'])
+    assert item.permissions == ['c:c']
+    item = service.patch_policy('C', 'p', to_attach=['d:d'], replace=True)
+    assert item.permissions == ['d:d']
+    assert service.patch_policy('C', 'missing', to_attach=['d:d']) is None
+    assert collection.count_documents({}) == 1
+
+
+def test_mongo_patch_is_one_write(collection, monkeypatch):
+    calls = []
+    for method in ('update_one', 'find_one_and_update'):
+        original = getattr(collection, method)
+        monkeypatch.setattr(
+            collection, method,
+            lambda *args, _m=method, _f=original, **kwargs:
+            calls.append(_m) or _f(*args, **kwargs)
+        )
+    RBACService().patch_policy('C', 'p', to_attach=['c:c'],
+                               to_detach=['a:a'])
+    assert calls == ['find_one_and_update']
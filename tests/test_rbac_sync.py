@@ -0,0 +1,96 @@
+import pytest
+
+from modular_sdk.commons import ModularException
+
+from models.policy import Policy
+from models.role import Role
+from services.rbac_service import RBACService
+
+
+@pytest.fixture
+def storage(monkeypatch) -> dict:
+    """
+    Existing policies and roles, written items are recorded in '_writes'
+    """
+    items = {Policy: {}, Role: {}, '_writes': []}
+
+    def batch_write(model, to_save, to_delete):
+        if not to_save and not to_delete:
+            return
+        items['_writes'].append((
+            model.__name__,
+            sorted(i.name for i in to_save),
+            sorted(i.name for i in to_delete)
+        ))
+
+    monkeypatch.setattr(RBACService, 'iter_policies',
+                        staticmethod(lambda customer: items[Policy].values()))
+    monkeypatch.setattr(RBACService, 'iter_roles',
+                        staticmethod(lambda customer: items[Role].values()))
+    monkeypatch.setattr(RBACService, '_batch_write', staticmethod(batch_write))
+    return items
+
+
+@pytest.fixture
+def existing(storage) -> dict:
+    service = RBACService()
+    for policy in (service.build_policy('C', 'one', ['a:b', 'c:d']),
+                   service.build_policy('C', 'two', ['e:f'])):
+        storage[Policy][policy.name] = policy
+    role = service.build_role('C', 'admin', ['one', 'two'])
+    storage[Role][role.name] = role
+    return storage
+
+
+def test_only_changes_written(existing):
+    service = RBACService()
+    changes = service.sync(
+        customer='C',
+        policies=[service.build_policy('C', 'one', ['c:d', 'a:b']),
+                  service.build_policy('C', 'two', ['e:f', 'g:h']),
+                  service.build_policy('C', 'three', ['a:b'])],
+        roles=[service.build_role('C', 'admin', ['two', 'one'])],
+    )
+    assert changes['policies'] == {
+        'created': ['three'], 'updated': ['two'], 'deleted': [],
+        'unchanged': ['one']
+    }
+    assert changes['roles']['unchanged'] == ['admin']
+    assert existing['_writes'] == [('Policy', ['three', 'two'], [])]
+
+
+def test_prune_deletes_roles_before_policies(existing):
+    service = RBACService()
+    changes = service.sync(
+        customer='C',
+        policies=[service.build_policy('C', 'one', ['a:b', 'c:d'])],
+        roles=[service.build_role('C', 'reader', ['one'])],
+        prune=True
+    )
+    assert changes['policies']['deleted'] == ['two']
+    assert changes['roles'] == {
+        'created': ['reader'], 'updated': [], 'deleted': ['admin'],
+        'unchanged': []
+    }
+    assert existing['_writes'] == [('Role', ['reader'], ['admin']),
+                                   ('Policy', [], ['two'])]
+
+
+def test_dry_run(existing):
+    service = RBACService()
+    changes = service.sync(customer='C', policies=[], roles=[], prune=True,
+                           dry_run=True)
+    assert sorted(changes['policies']['deleted']) == ['one', 'two']
+    assert existing['_writes'] == []
+
+
+def test_missing_policy(existing):
+    service = RBACService()
+    with pytest.raises(ModularException):
+        service.sync(
+            customer='C',
+            policies=[],
+            roles=[service.build_role('C', 'admin', ['one', 'two'])],
+            prune=True
+        )
+    assert existing['_writes'] == []
@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lambdas.modular_api_handler.handler import ModularApiHandler
+from lambdas.modular_api_handler.registry import CONTROLLERS, ROUTES
+from services.service_provider import cached_property
+
+
+@pytest.fixture(scope='module')
+def declared() -> set[tuple]:
+    """
+    Routes that controllers declare themselves
+    """
+    res = set()
+    for name in CONTROLLERS:
+        cls = ModularApiHandler.get_controller_class(name)
+        assert cls.controller_name() == name
+        for route in cls.routes():
+            for method in route.conditions['method']:
+                res.add((
+                    route.routepath,
+                    method,
+                    route._kargs['controller'],
+                    route._kargs['action'],
+                    route._kargs['_permission'],
+                    route._kargs['_require_auth'],
+                ))
+    return res
+
+
+def test_registry_matches_controllers(declared):
+    registered = {
+        (r.path.value, r.method, r.controller, r.action, r.permission,
+         r.require_auth)
+        for r in ROUTES
+    }
+    assert registered == declared
+    assert len(ROUTES) == len(registered)
+
+
+def test_controllers_are_loaded_lazily():
+    handler = ModularApiHandler()
+    assert not handler._controllers
+    match = handler.mapper.match('/health/live', {'REQUEST_METHOD': 'GET'})
+    assert match['controller'] == 'HealthCheckProcessor'
+    handler.get_controller(match['controller'])
+    assert list(handler._controllers) == ['HealthCheckProcessor']
+
+
+def _build_concurrently(get, build_started: threading.Event,
+                        release: threading.Event) -> list:
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(get)]
+        build_started.wait(5)
+        futures.extend(pool.submit(get) for _ in range(3))
+        release.set()
+        return [f.result() for f in futures]
+
+
+def test_controller_is_built_once_by_threads(monkeypatch):
+    handler = ModularApiHandler()
+    started, release = threading.Event(), threading.Event()
+    built = []
+
+    def build(cls):
+        built.append(cls)
+        started.set()
+        release.wait(5)
+        return object()
+
+    name = 'HealthCheckProcessor'
+    monkeypatch.setattr(handler.get_controller_class(name), 'build',
+                        classmethod(build))
+    results = _build_concurrently(lambda: handler.get_controller(name),
+                                  started, release)
+    assert len(built) == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_service_is_built_once_by_threads():
+    started, release = threading.Event(), threading.Event()
+    built = []
+
+    class Provider:
+        @cached_property
+        def service(self) -> object:
+            built.append(1)
+            started.set()
+            release.wait(5)
+            return object()
+
+    provider = Provider()
+    results = _build_concurrently(lambda: provider.service, started,
+                                  release)
+    assert len(built) == 1
+    assert all(r is results[0] for r in results)
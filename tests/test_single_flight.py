@@ -0,0 +1,172 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lambdas.modular_api_handler.handler import ModularApiHandler
+from services import single_flight
+from services.single_flight import SingleFlight
+
+
+class Followers:
+    """
+    Replaces the event that calls in flight are done with one that
+    counts the calls waiting for it
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._waiting = 0
+        followers = self
+
+        class Done(threading.Event):
+            def wait(self, timeout=None):
+                with followers._cond:
+                    followers._waiting += 1
+                    followers._cond.notify_all()
+                return super().wait(timeout)
+
+        self.event = Done
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    def wait(self, n: int) -> None:
+        """
+        Waits until n calls in total have waited for the ones in flight
+        """
+        with self._cond:
+            assert self._cond.wait_for(lambda: self._waiting >= n, 5)
+
+
+@pytest.fixture
+def followers(monkeypatch) -> Followers:
+    f = Followers()
+    init = single_flight._Call.__init__
+
+    def __init__(self):
+        init(self)
+        self.done = f.event()
+
+    monkeypatch.setattr(single_flight._Call, '__init__', __init__)
+    return f
+
+
+def test_concurrent_calls_share_execution(followers):
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'result'
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, 'key', func)
+        started.wait(5)
+        futures = [pool.submit(flight.do, 'key', func) for _ in range(3)]
+        followers.wait(3)
+        release.set()
+        assert leader.result() == ('result', False)
+        assert [f.result() for f in futures] == [('result', True)] * 3
+    assert len(calls) == 1
+    assert len(flight) == 0
+    assert flight.do('key', lambda: 'again') == ('again', False)
+
+
+class Gate:
+    """
+    Keeps the first call in flight until the given number of the others
+    wait for it
+    """
+
+    def __init__(self, followers: Followers, waiting: int):
+        self.followers = followers
+        self.waiting = followers.waiting + waiting
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def wait(self) -> None:
+        self.started.set()
+        self.release.wait(5)
+
+    def run(self, calls: list) -> list:
+        with ThreadPoolExecutor(len(calls)) as pool:
+            futures = [pool.submit(calls[0])]
+            self.started.wait(5)
+            futures.extend(pool.submit(c) for c in calls[1:])
+            self.followers.wait(self.waiting)
+            self.release.set()
+            return [f.exception() or f.result() for f in futures]
+
+
+def test_not_shareable_result_is_not_shared(followers):
+    flight = SingleFlight()
+    gate = Gate(followers, 2)
+    calls = []
+
+    def func():
+        calls.append(1)
+        gate.wait()
+        return iter(['line'])
+
+    results = gate.run([
+        lambda: flight.do('key', func, share=lambda r: isinstance(r, str))
+    ] * 3)
+    assert [shared for _, shared in results] == [False] * 3
+    assert len(calls) == 3
+    assert [list(r) for r, _ in results] == [['line']] * 3
+
+
+def event(accept: str | None = None) -> dict:
+    return {'cognito_user_id': 'user', 'cognito_customer': 'C',
+            'path': '/tenants', 'query': {},
+            'headers': {'Accept': accept} if accept else {}}
+
+
+def test_handler_coalesces_by_accept(followers):
+    handler = ModularApiHandler()
+    gate = Gate(followers, 1)  # the second request
+    calls = []
+
+    def request(accept: str | None, body):
+        def func():
+            calls.append(1)
+            gate.wait()
+            return {'statusCode': 200, 'headers': {}, 'body': body}
+        return lambda: handler._coalesce(event(accept), func)
+
+    ndjson = 'application/x-ndjson'
+    results = gate.run([
+        request(None, '{}'), request(None, '{}'), request(ndjson, '{}')
+    ])
+    assert len(calls) == 2
+    assert [r['body'] for r in results] == ['{}'] * 3
+
+    calls.clear()
+    gate = Gate(followers, 1)
+    results = gate.run([  # streamed bodies are not shared
+        request(ndjson, iter([b'{}\n'])), request(ndjson, iter([b'{}\n']))
+    ])
+    assert len(calls) == 2
+    assert [list(r['body']) for r in results] == [[b'{}\n']] * 2
+
+
+def test_error_is_shared(followers):
+    flight = SingleFlight()
+    gate = Gate(followers, 3)
+    calls = []
+
+    def func():
+        calls.append(1)
+        gate.wait()
+        raise ZeroDivisionError
+
+    errors = gate.run([lambda: flight.do('key', func)] * 4)
+    assert len(calls) == 1
+    assert all(isinstance(e, ZeroDivisionError) for e in errors)
+    assert all(e is errors[0] for e in errors)
+    assert len(flight) == 0
@@ -0,0 +1,224 @@
+import json
+
+import pytest
+from modular_sdk.models.tenant import Tenant
+
+from lambdas.modular_api_handler.processors.tenant_processor import (
+    TenantProcessor,
+)
+from models import MONGO_SERIALIZER
+from models.counter import Counter
+from services import stats_service
+from services.stats_service import StatsService
+from services.tenant_mutator_service import TenantMutatorService
+
+
+@pytest.fixture
+def counts(monkeypatch) -> dict:
+    """
+    Tenants groups that are returned by DB, reads are counted in '_reads'
+    """
+    groups = {
+        ('AWS', 'active'): 2,
+        ('AWS', 'inactive'): 1,
+        ('AZURE', 'active'): 3,
+    }
+    storage = {'groups': groups, '_reads': 0}
+
+    def count(self, customer):
+        storage['_reads'] += 1
+        return dict(storage['groups'])
+
+    monkeypatch.setattr(StatsService, '_count_tenants', count)
+    return storage
+
+
+def test_tenants(counts):
+    service = StatsService(users_client=None, ttl=60)
+    assert service.tenants('C') == {
+        'total': 6,
+        'active': 5,
+        'inactive': 1,
+        'clouds': {
+            'AWS': {'total': 3, 'active': 2, 'inactive': 1},
+            'AZURE': {'total': 3, 'active': 3, 'inactive': 0},
+        }
+    }
+
+
+def test_cached(counts):
+    service = StatsService(users_client=None, ttl=60)
+    service.tenants('C')
+    service.tenants('C')
+    assert counts['_reads'] == 1
+    service.tenants('D')
+    assert counts['_reads'] == 2
+
+    service = StatsService(users_client=None, ttl=0)
+    service.tenants('C')
+    service.tenants('C')
+    assert counts['_reads'] == 4
+
+
+def matches(doc: dict | None, query: dict) -> bool:
+    if doc is None:
+        return False
+    for key, value in query.items():
+        if key == '$or':
+            ok = any(matches(doc, q) for q in value)
+        elif isinstance(value, dict) and '$exists' in value:
+            ok = (key in doc) == value['$exists']
+        else:
+            ok = key in doc and doc[key] == value
+        if not ok:
+            return False
+    return True
+
+
+class Result:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+
+
+class TenantCollection:
+    """
+    Holds one tenant document, None when it is deleted
+    """
+
+    def __init__(self, doc: dict):
+        self.doc = doc
+        self.writes = 0
+
+    def find_one_and_update(self, query, update, return_document=None):
+        self.writes += 1
+        if not matches(self.doc, query):
+            return None
+        self.doc.update(update['$set'])
+        return dict(self.doc)
+
+    def delete_one(self, query) -> Result:
+        if not matches(self.doc, query):
+            return Result(0)
+        self.doc = None
+        return Result(1)
+
+
+class Adapter:
+    def __init__(self, collection: TenantCollection):
+        self.collection = collection
+
+    def get_collection(self, model):
+        return self.collection
+
+    def refresh(self, instance):
+        if self.collection.doc is None:
+            raise Tenant.DoesNotExist()
+        MONGO_SERIALIZER.deserialize_to(instance, self.collection.doc)
+
+
+class Resolver:
+    """
+    Every request gets the tenant that was read before any of them
+    changed it
+    """
+
+    def __init__(self, doc: dict):
+        self.doc = doc
+
+    def resolve(self, name, customer=None):
+        return MONGO_SERIALIZER.deserialize(Tenant, dict(self.doc))
+
+    def forget(self, tenant):
+        pass
+
+
+@pytest.fixture
+def changes(monkeypatch) -> list:
+    """
+    Counter changes: (values, delta)
+    """
+    items = []
+    monkeypatch.setattr(
+        StatsService, '_add',
+        lambda self, customer, entity, deltas: items.extend(deltas.items())
+    )
+    return items
+
+
+@pytest.fixture
+def processor(monkeypatch) -> TenantProcessor:
+    doc = MONGO_SERIALIZER.serialize(Tenant(
+        name='T1', display_name='t1', display_name_to_lower='t1',
+        customer_name='C', cloud='AWS', is_active=True, regions=[]
+    ))
+    collection = TenantCollection(dict(doc))
+    monkeypatch.setattr(Tenant, 'is_mongo_model', classmethod(lambda c: True))
+    monkeypatch.setattr(Tenant, 'mongo_adapter',
+                        classmethod(lambda c: Adapter(collection)))
+    return TenantProcessor(
+        customer_service=None,
+        tenant_service=TenantMutatorService(),
+        tenant_resolver=Resolver(doc),
+        export_service=None,
+        stats_service=StatsService(users_client=None)
+    )
+
+
+def test_state_change_counted_once(processor, changes):
+    for _ in range(2):
+        response = processor.deactivate(event={}, name='T1')
+        assert json.loads(response['body'])['data']['is_active'] is False
+    assert changes == [(('AWS', 'active'), -1), (('AWS', 'inactive'), 1)]
+    changes.clear()
+
+    processor.tenant_resolver.doc[Tenant.is_active.attr_name] = False
+    for _ in range(2):
+        processor.activate(event={}, name='T1')  # read as inactive
+    assert changes == [(('AWS', 'inactive'), -1), (('AWS', 'active'), 1)]
+
+
+def test_unchanged_state_is_not_written(processor, changes, monkeypatch):
+    collection = Tenant.mongo_adapter().get_collection(Tenant)
+    monkeypatch.setattr(TenantMutatorService, '_reload',
+                        lambda tenant: pytest.fail('reloaded'))
+    response = processor.activate(event={}, name='T1')
+    assert json.loads(response['body'])['data']['is_active'] is True
+    processor.tenant_resolver.doc[Tenant.is_active.attr_name] = False
+    processor.deactivate(event={}, name='T1')
+    assert collection.writes == 0
+    assert changes == []
+
+
+def test_state_change_is_one_transaction(monkeypatch):
+    transactions = []
+
+    class Transaction:
+        def __init__(self, connection):
+            self.updates = []
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            transactions.append(self.updates)
+
+        def update(self, model, actions):
+            self.updates.append((model.customer, model.key, len(actions)))
+
+    monkeypatch.setattr(stats_service, 'TransactWrite', Transaction)
+    monkeypatch.setattr(Counter, 'update',
+                        lambda *args, **kwargs: pytest.fail('not atomic'))
+    StatsService(users_client=None).tenant_state_changed(
+        Tenant(name='T1', customer_name='C', cloud='AWS', is_active=False),
+        active=False
+    )
+    assert transactions == [[('C', 'tenants#AWS#active', 1),
+                             ('C', 'tenants#AWS#inactive', 1)]]
+
+
+def test_delete_counted_once(processor, changes):
+    processor.deactivate(event={}, name='T1')
+    changes.clear()
+    for _ in range(2):
+        processor.delete(event={}, name='T1')  # read as active
+    assert changes == [(('AWS', 'inactive'), -1)]
@@ -0,0 +1,138 @@
+import json
+
+import pytest
+from modular_sdk.models.tenant import Tenant
+from pymongo.errors import BulkWriteError
+
+from lambdas.modular_api_handler.processors.tenant_processor import (
+    TenantProcessor,
+)
+from services.tenant_mutator_service import TenantMutatorService
+
+
+class Collection:
+    """
+    Tenants collection with unique name and account id. Documents from
+    `concurrent` are inserted by somebody else right before insert_many
+    """
+
+    def __init__(self):
+        self.docs = []
+        self.concurrent = []
+
+    def find(self, query, projection=None):
+        names = set(query['$or'][0]['n']['$in'])
+        accounts = set(query['$or'][1]['acc']['$in'])
+        return [d for d in self.docs
+                if d['n'] in names or d.get('acc') in accounts]
+
+    def insert_many(self, docs, ordered=True):
+        self.docs.extend(self.concurrent)
+        self.concurrent = []
+        errors = []
+        for i, doc in enumerate(docs):
+            for attr in ('n', 'acc'):
+                if any(d.get(attr) == doc.get(attr) for d in self.docs):
+                    errors.append({'index': i, 'code': 11000,
+                                   'keyPattern': {attr: -1}})
+                    break
+            else:
+                self.docs.append(doc)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors})
+
+
+class Adapter:
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    def get_collection(self, model):
+        return self.collection
+
+
+class Stats:
+    def __init__(self):
+        self.created = []
+
+    def tenant_created(self, tenant):
+        self.created.append(tenant.name)
+
+
+@pytest.fixture
+def collection(monkeypatch) -> Collection:
+    collection = Collection()
+    monkeypatch.setattr(Tenant, 'is_mongo_model', classmethod(lambda c: True))
+    monkeypatch.setattr(Tenant, 'mongo_adapter',
+                        classmethod(lambda c: Adapter(collection)))
+    return collection
+
+
+@pytest.fixture
+def stats() -> Stats:
+    return Stats()
+
+
+@pytest.fixture
+def processor(stats) -> TenantProcessor:
+    return TenantProcessor(
+        customer_service=None,
+        tenant_service=TenantMutatorService(),
+        tenant_resolver=None,
+        export_service=None,
+        stats_service=stats
+    )
+
+
+def tenant(name: str, acc: str) -> dict:
+    return {'name': name, 'display_name': name, 'cloud': 'AWS',
+            'account_id': acc, 'read_only': False}
+
+
+def create(processor: TenantProcessor, *tenants: dict) -> list[tuple]:
+    response = processor.create_batch(
+        event={'customer_id': 'CUSTOMER', 'tenants': list(tenants)}
+    )
+    assert response['statusCode'] == 207
+    return [(i['name'], i['code']) for i in json.loads(
+        response['body'])['items']]
+
+
+def test_repeated_in_request(processor, collection, stats):
+    assert create(
+        processor,
+        tenant('one', '111111111111'),
+        tenant('one', '222222222222'),
+        tenant('two', '111111111111'),
+        tenant('three', '333333333333'),
+    ) == [('ONE', 201), ('ONE', 409), ('TWO', 409), ('THREE', 201)]
+    assert [d['n'] for d in collection.docs] == ['ONE', 'THREE']
+    assert stats.created == ['ONE', 'THREE']
+
+
+def test_existing(processor, collection, stats):
+    collection.docs.append({'n': 'ONE', 'acc': '111111111111'})
+    assert create(
+        processor,
+        tenant('one', '999999999999'),
+        tenant('two', '111111111111'),
+        tenant('three', '333333333333'),
+    ) == [('ONE', 409), ('TWO', 409), ('THREE', 201)]
+    assert stats.created == ['THREE']
+
+
+def test_created_concurrently(processor, collection, stats):
+    collection.concurrent = [{'n': 'ONE', 'acc': '999999999999'},
+                             {'n': 'OTHER', 'acc': '222222222222'}]
+    response = processor.create_batch(event={
+        'customer_id': 'CUSTOMER',
+        'tenants': [tenant('one', '111111111111'),
+                    tenant('two', '222222222222'),
+                    tenant('three', '333333333333')]
+    })
+    items = json.loads(response['body'])['items']
+    assert [(i['name'], i['code']) for i in items] == [
+        ('ONE', 409), ('TWO', 409), ('THREE', 201)
+    ]
+    assert 'name \'ONE\'' in items[0]['message']
+    assert 'account id \'222222222222\'' in items[1]['message']
+    assert stats.created == ['THREE']
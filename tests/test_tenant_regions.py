@@ -0,0 +1,287 @@
+import pytest
+from botocore.exceptions import ClientError
+from bson import ObjectId
+from modular_sdk.commons import ModularException
+from modular_sdk.models.region import RegionAttr, RegionModel
+from modular_sdk.models.tenant import Tenant
+from pynamodb.exceptions import UpdateError
+
+from models import MONGO_SERIALIZER
+from models.operations import (
+    CONDITIONAL_CHECK_FAILED,
+    CONDITIONAL_UPDATE_ATTEMPTS,
+)
+from models.tenant_region import TenantRegion
+from services import region_mutator_service
+from services.region_mutator_service import RegionMutatorService
+
+
+class Batch:
+    def __init__(self, links: set):
+        self._links = links
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def save(self, item):
+        self._links.add((item.region_name, item.tenant_name))
+
+    def delete(self, item):
+        self._links.discard((item.region_name, item.tenant_name))
+
+
+@pytest.fixture
+def links(monkeypatch) -> set:
+    """
+    (region, tenant) rows of TenantRegion table
+    """
+    rows = set()
+
+    def query(hash_key, attributes_to_get=None):
+        return iter([TenantRegion(region_name=r, tenant_name=t)
+                     for r, t in sorted(rows) if r == hash_key])
+
+    monkeypatch.setattr(Tenant, 'is_mongo_model', classmethod(lambda c: False))
+    monkeypatch.setattr(TenantRegion, 'query', query)
+    monkeypatch.setattr(TenantRegion, 'batch_write', lambda: Batch(rows))
+    return rows
+
+
+def test_links_are_removed(links):
+    tenant = Tenant(name='T1', customer_name='C', regions=[
+        RegionAttr(maestro_name='R1'), RegionAttr(maestro_name='R2')
+    ])
+    RegionMutatorService.link_regions_to_tenant(tenant, ['R1', 'R2'])
+    links.add(('R1', 'T2'))
+    RegionMutatorService.unlink_tenant(tenant)
+    assert links == {('R1', 'T2')}
+    RegionMutatorService.unlink_region('R1')
+    assert links == set()
+
+
+def test_links_of_deleted_tenants_pruned(links, monkeypatch):
+    links.update({('R1', 'T1'), ('R1', 'T2'), ('R1', 'T3')})
+    existing = {'T1': True, 'T3': False}
+
+    def batch_get(names, attributes_to_get=None):
+        return iter([Tenant(name=n, is_active=existing[n])
+                     for n in names if n in existing])
+
+    monkeypatch.setattr(Tenant, 'batch_get', batch_get)
+    assert list(RegionMutatorService.i_tenants_in_region('R1')) == ['T1']
+    assert links == {('R1', 'T1'), ('R1', 'T3')}
+
+
+class Result:
+    def __init__(self, matched_count: int):
+        self.matched_count = matched_count
+
+
+class TenantCollection:
+    """
+    One tenant document. Understands only the updates that activate and
+    deactivate regions. `concurrent` changes the document right before
+    each update as if another request did it
+    """
+
+    def __init__(self, doc: dict):
+        self.doc = doc
+        self.concurrent = None
+        self.updates = 0
+
+    def _matches(self, query: dict) -> bool:
+        if self.doc is None:  # deleted
+            return False
+        regions = self.doc['r']
+        for key, value in query.items():
+            if key == 'n':
+                ok = self.doc['n'] == value
+            elif key == 'r.r':
+                ok = not any(r['r'] in value['$nin'] for r in regions)
+            else:
+                _, i, attr = key.split('.')
+                ok = int(i) < len(regions) and regions[int(i)][attr] == value
+            if not ok:
+                return False
+        return True
+
+    def update_one(self, query: dict, update: dict) -> Result:
+        self.updates += 1
+        if self.concurrent:
+            self.concurrent(self.doc)
+        if not self._matches(query):
+            return Result(0)
+        if '$push' in update:
+            self.doc['r'].extend(update['$push']['r']['$each'])
+        for key, value in update.get('$set', {}).items():
+            _, i, attr = key.split('.')
+            self.doc['r'][int(i)][attr] = value
+        return Result(1)
+
+
+class Adapter:
+    def __init__(self, collection: TenantCollection):
+        self.collection = collection
+
+    def get_collection(self, model):
+        return self.collection
+
+
+def region(name: str) -> RegionModel:
+    return RegionModel(maestro_name=name, native_name=name.lower(),
+                       cloud='AWS', region_id=name, is_active=True)
+
+
+@pytest.fixture
+def service() -> RegionMutatorService:
+    return RegionMutatorService(tenant_service=None)
+
+
+@pytest.fixture
+def tenant(service) -> Tenant:
+    return Tenant(
+        name='T1', display_name='t1', display_name_to_lower='t1',
+        customer_name='C', cloud='AWS', regions=[
+            service.region_model_to_attr(region(n))
+            for n in ('R1', 'R2', 'R3')
+        ]
+    )
+
+
+@pytest.fixture
+def collection(tenant, monkeypatch) -> TenantCollection:
+    collection = TenantCollection(MONGO_SERIALIZER.serialize(tenant))
+
+    def refresh(self, consistent_read=False):
+        if collection.doc is None:
+            raise Tenant.DoesNotExist()
+        self.regions = MONGO_SERIALIZER.deserialize(
+            Tenant, collection.doc).regions
+
+    monkeypatch.setattr(Tenant, 'is_mongo_model', classmethod(lambda c: True))
+    monkeypatch.setattr(Tenant, 'mongo_adapter',
+                        classmethod(lambda c: Adapter(collection)))
+    monkeypatch.setattr(Tenant, 'refresh', refresh)
+    return collection
+
+
+def names(regions) -> list[tuple[str, bool]]:
+    return [(r['r'], r['act']) if isinstance(r, dict)
+            else (r.maestro_name, r.is_active) for r in regions]
+
+
+def test_activate_many(service, tenant, collection):
+    service.activate_regions_in_tenant(tenant, [region('R4'), region('R5')])
+    expected = [('R1', True), ('R2', True), ('R3', True),
+                ('R4', True), ('R5', True)]
+    assert names(collection.doc['r']) == expected
+    assert names(tenant.regions) == expected
+    assert collection.updates == 1
+
+
+def test_activate_many_activated_concurrently(service, tenant, collection):
+    collection.concurrent = lambda doc: doc['r'].append(
+        {'r': 'R5', 'act': True})
+    with pytest.raises(ModularException) as e:
+        service.activate_regions_in_tenant(tenant,
+                                           [region('R4'), region('R5')])
+    assert e.value.code == 400
+    assert names(collection.doc['r'])[-1] == ('R5', True)
+    assert len(collection.doc['r']) == 4  # R4 is not added
+
+
+def test_deactivate_many_retried(service, tenant, collection):
+    def remove_first(doc):  # shifts indexes of the rest of the regions
+        doc['r'].pop(0)
+        collection.concurrent = None
+
+    collection.concurrent = remove_first
+    service.deactivate_regions_in_tenant(tenant, [region('R3'), region('R2')])
+    assert collection.updates == 2
+    assert names(collection.doc['r']) == [('R2', False), ('R3', False)]
+    assert names(tenant.regions) == [('R2', False), ('R3', False)]
+
+
+def test_activate_in_deleted_tenant(service, tenant, collection):
+    collection.doc = None
+    with pytest.raises(ModularException) as e:
+        service.activate_regions_in_tenant(tenant, [region('R4')])
+    assert e.value.code == 404
+    assert e.value.content == 'Tenant \'T1\' does not exist.'
+
+
+def test_deactivate_in_deleted_tenant(service, tenant, collection):
+    collection.doc = None
+    with pytest.raises(ModularException) as e:
+        service.deactivate_regions_in_tenant(tenant, [region('R1')])
+    assert e.value.code == 404
+    assert collection.updates == 1
+
+
+def test_deactivate_many_changed_all_the_time(service, tenant, collection):
+    collection.concurrent = lambda doc: doc['r'].append(doc['r'].pop(0))
+    with pytest.raises(ModularException) as e:
+        service.deactivate_regions_in_tenant(tenant,
+                                             [region('R1'), region('R2')])
+    assert e.value.code == 409
+    assert collection.updates == CONDITIONAL_UPDATE_ATTEMPTS
+    assert all(r['act'] for r in collection.doc['r'])
+
+
+def test_activate_many_retried_dynamodb(service, tenant, links,
+                                        monkeypatch):
+    calls = []
+
+    def update(self, actions, condition=None):
+        calls.append(condition)
+        if len(calls) == 1:
+            raise UpdateError('changed', cause=ClientError({'Error': {
+                'Code': CONDITIONAL_CHECK_FAILED, 'Message': 'changed'
+            }}, 'UpdateItem'))
+
+    def refresh(self, consistent_read=False):  # somebody added R4
+        self.regions.append(service.region_model_to_attr(region('R4')))
+
+    monkeypatch.setattr(Tenant, 'update', update)
+    monkeypatch.setattr(Tenant, 'refresh', refresh)
+    service.activate_regions_in_tenant(tenant, [region('R5'), region('R6')])
+    assert len(calls) == 2
+    assert "size (r) = {'N': '4'}" in str(calls[1])  # reloaded size
+    assert links == {('R5', 'T1'), ('R6', 'T1')}
+
+    with pytest.raises(ModularException) as e:  # R4 is activated meanwhile
+        service.activate_regions_in_tenant(tenant, [region('R4')])
+    assert e.value.code == 400
+
+
+def test_activate_in_deleted_tenant_dynamodb(service, tenant, links,
+                                             monkeypatch):
+    def update(self, actions, condition=None):
+        raise UpdateError('deleted', cause=ClientError({'Error': {
+            'Code': CONDITIONAL_CHECK_FAILED, 'Message': 'deleted'
+        }}, 'UpdateItem'))
+
+    def refresh(self, consistent_read=False):
+        raise Tenant.DoesNotExist()
+
+    monkeypatch.setattr(Tenant, 'update', update)
+    monkeypatch.setattr(Tenant, 'refresh', refresh)
+    with pytest.raises(ModularException) as e:
+        service.activate_regions_in_tenant(tenant, [region('R4')])
+    assert e.value.code == 404
+    assert links == set()
+
+
+def test_created_region_id_is_object_id(service, monkeypatch):
+    inserted = []
+    monkeypatch.setattr(RegionModel, 'is_mongo_model',
+                        classmethod(lambda c: True))
+    monkeypatch.setattr(region_mutator_service, 'insert_if_not_exists',
+                        lambda item, unique=(): inserted.append(item) or True)
+    created = service.create('R1', 'r1', 'AWS')
+    assert inserted == [created]
+    assert ObjectId.is_valid(created.region_id)
+    assert service.create('R2', 'r2', 'AWS', region_id='id').region_id == 'id'
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from modular_sdk.models.tenant import Tenant
+
+from commons.constants import Env
+from services.tenant_resolver import TenantResolver
+
+
+class FakeTenantService:
+    def __init__(self, tenants: list[Tenant]):
+        self.tenants = tenants
+        self.calls = []
+
+    def get(self, tenant_name: str) -> Tenant | None:
+        self.calls.append(('name', tenant_name))
+        return next((t for t in self.tenants if t.name == tenant_name), None)
+
+    def i_get_by_acc(self, acc: str, limit: int | None = None):
+        self.calls.append(('acc', acc))
+        return (t for t in self.tenants if t.project == acc)
+
+
+@pytest.fixture
+def service() -> FakeTenantService:
+    return FakeTenantService([
+        Tenant(name='AWS-TENANT', project='123456789012',
+               customer_name='CUSTOMER'),
+        Tenant(name='AZURE-TENANT',
+               project='3d615fa8-05c6-47ea-990d-9d162b2a6c7a',
+               customer_name='CUSTOMER'),
+        Tenant(name='GOOGLE-TENANT', project='my-project-123',
+               customer_name='OTHER'),
+    ])
+
+
+@pytest.fixture
+def resolver(service) -> TenantResolver:
+    return TenantResolver(tenant_service=service, lru_size=2)
+
+
+@pytest.fixture(autouse=True)
+def no_request():
+    Env.INVOCATION_REQUEST_ID.set(None)
+    yield
+    Env.INVOCATION_REQUEST_ID.set(None)
+
+
+def test_lookup_order(resolver, service):
+    assert resolver.resolve('aws-tenant').name == 'AWS-TENANT'
+    assert service.calls == [('name', 'AWS-TENANT')]
+    service.calls.clear()
+
+    assert resolver.resolve('123456789012').name == 'AWS-TENANT'
+    assert service.calls == [('acc', '123456789012')]
+    service.calls.clear()
+
+    tenant = resolver.resolve('3d615fa8-05c6-47ea-990d-9d162b2a6c7a')
+    assert tenant.name == 'AZURE-TENANT'
+    assert service.calls == [('acc', '3d615fa8-05c6-47ea-990d-9d162b2a6c7a')]
+    service.calls.clear()
+
+    assert resolver.resolve('my-project-123').name == 'GOOGLE-TENANT'
+    assert service.calls == [('name', 'MY-PROJECT-123'),
+                             ('acc', 'my-project-123')]
+
+
+def test_remembered(resolver, service):
+    resolver.resolve('my-project-123')
+    service.calls.clear()
+    assert resolver.resolve('my-project-123').name == 'GOOGLE-TENANT'
+    assert service.calls == [('name', 'GOOGLE-TENANT')]
+
+
+def test_lru_size(resolver, service):
+    resolver.resolve('my-project-123')
+    resolver.resolve('aws-tenant')
+    resolver.resolve('azure-tenant')
+    service.calls.clear()
+    resolver.resolve('my-project-123')
+    assert len(service.calls) == 2
+
+
+def test_customer(resolver):
+    assert resolver.resolve('AWS-TENANT', 'CUSTOMER')
+    assert resolver.resolve('AWS-TENANT', 'OTHER') is None
+    assert resolver.resolve('UNKNOWN', 'CUSTOMER') is None
+
+
+def test_memoized_within_request(resolver, service):
+    Env.INVOCATION_REQUEST_ID.set('one')
+    first = resolver.resolve('AWS-TENANT')
+    assert resolver.resolve('AWS-TENANT') is first
+    assert len(service.calls) == 1
+
+    Env.INVOCATION_REQUEST_ID.set('two')
+    resolver.resolve('AWS-TENANT')
+    assert len(service.calls) == 2
+
+
+def test_memo_not_shared_by_threads(resolver, service):
+    Env.INVOCATION_REQUEST_ID.set('one')
+    resolver.resolve('AWS-TENANT')
+    with ThreadPoolExecutor(1) as pool:
+        pool.submit(resolver.resolve, 'AWS-TENANT').result()
+    assert len(service.calls) == 2  # not taken from the memo
+    resolver.resolve('AWS-TENANT')
+    assert len(service.calls) == 2
+
+
+def test_forget(resolver, service):
+    Env.INVOCATION_REQUEST_ID.set('one')
+    tenant = resolver.resolve('my-project-123')
+    service.tenants.remove(tenant)
+    resolver.forget(tenant)
+    assert resolver.resolve('my-project-123') is None
@@ -0,0 +1,126 @@
+import pytest
+from modular_sdk.models.pynamongo.convertors import (
+    convert_condition_expression,
+)
+from modular_sdk.models.tenant import Tenant
+from pynamodb.connection.table import TableConnection
+
+from models import pagination
+from services.tenant_mutator_service import MAX_CHAR, TenantMutatorService
+
+
+def test_search_is_range(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pagination, 'query',
+                        lambda **kwargs: calls.append(kwargs))
+    TenantMutatorService.i_get_tenant_by_customer('C', search='Dev.*')
+    assert convert_condition_expression(calls[0]['filter_condition']) == {
+        '$or': [
+            {'dntl': {'$gte': 'dev.*', '$lte': 'dev.*' + MAX_CHAR}},
+            {'acc': {'$gte': 'Dev.*', '$lte': 'Dev.*' + MAX_CHAR}},
+        ]
+    }
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, value in query.items():
+        if key == '$or':
+            if not any(_matches(doc, q) for q in value):
+                return False
+        elif key == '$and':
+            if not all(_matches(doc, q) for q in value):
+                return False
+        elif isinstance(value, dict):
+            if key not in doc or not (value['$gte'] <= doc[key]
+                                      <= value['$lte']):
+                return False
+        elif doc.get(key) != value:
+            return False
+    return True
+
+
+class Index:
+    """
+    Customer index of tenants. Like DynamoDB, evaluates `limit` items,
+    then applies the filter and returns last evaluated key if the limit
+    was reached
+    """
+
+    def __init__(self, tenants: list[Tenant]):
+        self.items = [t.serialize() for t in tenants]
+        self.calls = 0
+
+    def query(self, hash_key, range_key_condition=None,
+              filter_condition=None, exclusive_start_key=None, limit=None,
+              **kwargs):
+        self.calls += 1
+        items = [i for i in self.items if i['ctmr']['S'] == hash_key]
+        if exclusive_start_key:
+            names = [i['n']['S'] for i in items]
+            items = items[names.index(exclusive_start_key['n']['S']) + 1:]
+        evaluated = items[:limit] if limit else items
+        query = {}
+        if filter_condition is not None:
+            query = convert_condition_expression(filter_condition)
+        found = [
+            i for i in evaluated
+            if _matches({k: next(iter(v.values())) for k, v in i.items()},
+                        query)
+        ]
+        page = {'Items': found, 'Count': len(found),
+                'ScannedCount': len(evaluated)}
+        if limit and len(evaluated) == limit:
+            last = evaluated[-1]
+            page['LastEvaluatedKey'] = {'n': last['n'], 'ctmr': last['ctmr']}
+        return page
+
+
+@pytest.fixture
+def tenants(monkeypatch) -> Index:
+    displays = ['Dev 0', 'dev 1', 'Prod 2', 'Test 3', 'Prod 4', 'DEV 5',
+                'Prod 6', 'Test 7', 'Prod 8', 'Test 9']
+    index = Index([
+        Tenant(name=f'T{i}', display_name=display,
+               display_name_to_lower=display.lower(), customer_name='C',
+               cloud='AWS', project=f'{i}0000', is_active=True)
+        for i, display in enumerate(displays)
+    ])
+    monkeypatch.setattr(TableConnection, 'query',
+                        lambda self, *args, **kwargs: index.query(*args,
+                                                                  **kwargs))
+    return index
+
+
+def _pages(search: str, limit: int) -> list[list[str]]:
+    pages = []
+    token = None
+    while True:
+        it = TenantMutatorService.i_get_tenant_by_customer(
+            'C', search=search, limit=limit, last_evaluated_key=token
+        )
+        pages.append([t.name for t in it])
+        token = it.last_evaluated_key
+        if not token:
+            return pages
+
+
+def test_search_pages(tenants):
+    assert _pages('dev', 2) == [['T0', 'T1'], ['T5']]
+    assert _pages('prod', 2) == [['T2', 'T4'], ['T6', 'T8']]
+    assert _pages('prod', 3) == [['T2', 'T4', 'T6'], ['T8']]
+    assert _pages('30', 10) == [['T3']]
+    assert _pages('nothing', 2) == [[]]
+
+
+def test_no_next_page_if_nothing_else_matches(tenants):
+    it = TenantMutatorService.i_get_tenant_by_customer('C', search='dev',
+                                                       limit=1)
+    assert [t.name for t in it] == ['T0']
+    assert it.last_evaluated_key == {'n': {'S': 'T0'}, 'ctmr': {'S': 'C'}}
+
+    it = TenantMutatorService.i_get_tenant_by_customer(
+        'C', search='dev', limit=1,
+        last_evaluated_key={'n': {'S': 'T1'}, 'ctmr': {'S': 'C'}}
+    )
+    assert [t.name for t in it] == ['T5']
+    assert it.last_evaluated_key is None
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+from modular_sdk.models.tenant import Tenant
+from modular_sdk.models.tenant_settings import TenantSettings
+
+from commons.lambda_response import ApplicationException
+from lambdas.modular_api_handler.processors.tenant_settings_processor import (
+    TenantSettingsProcessor,
+)
+from services.tenant_settings_mutator_service import (
+    TenantSettingsMutatorService,
+)
+
+
+class Batch:
+    def __init__(self, storage: dict):
+        self._storage = storage
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._storage['_batches'] += 1
+
+    def save(self, item):
+        self._storage[(item.tenant_name, item.key)] = item
+
+
+class Resolver:
+    def resolve(self, name: str, customer: str | None = None):
+        if name == 'T1':
+            return Tenant(name='T1', customer_name='C')
+
+
+@pytest.fixture
+def storage(monkeypatch) -> dict:
+    """
+    Settings by (tenant, key). Batch writes are counted in '_batches' and
+    single writes in '_saves'
+    """
+    items = {'_batches': 0, '_saves': 0}
+
+    def batch_get(keys):  # the order of BatchGetItem result is arbitrary
+        return reversed([items[k] for k in keys if k in items])
+
+    def save(self):
+        items['_saves'] += 1
+        items[(self.tenant_name, self.key)] = self
+
+    monkeypatch.setattr(TenantSettings, 'batch_get', batch_get)
+    monkeypatch.setattr(TenantSettings, 'batch_write', lambda: Batch(items))
+    monkeypatch.setattr(TenantSettings, 'save', save)
+    return items
+
+
+@pytest.fixture
+def processor() -> TenantSettingsProcessor:
+    return TenantSettingsProcessor(
+        tenant_settings_service=TenantSettingsMutatorService(None),
+        tenant_resolver=Resolver(),
+        export_service=None
+    )
+
+
+def body(response: dict) -> dict:
+    return json.loads(response['body'])
+
+
+def test_put_and_get_many(processor, storage):
+    response = processor.put(event={'settings': {
+        'A': {'v': 1}, 'B': [1, 2], 'C': 'three'
+    }}, name='T1')
+    assert response['statusCode'] == 200
+    assert [i['key'] for i in body(response)['items']] == ['A', 'B', 'C']
+    assert storage['_batches'] == 1
+    assert storage['_saves'] == 0
+
+    response = processor.query(event={'key': 'C, A,MISSING,A'}, _pe={},
+                               name='T1')
+    assert [(i['key'], i['value']) for i in body(response)['items']] == [
+        ('C', 'three'), ('A', {'v': 1})
+    ]
+
+
+def test_put_one(processor, storage):
+    response = processor.put(event={'key': 'A', 'value': {'v': 1}},
+                             name='T1')
+    assert body(response)['data']['key'] == 'A'
+    assert storage['_saves'] == 1
+
+    processor.put(event={'key': 'A', 'value': 2, 'settings': {'B': 3}},
+                  name='T1')
+    assert storage[('T1', 'A')].value == 2
+    assert storage[('T1', 'B')].value == 3
+    assert storage['_batches'] == 1
+
+
+def test_too_many(processor, storage):
+    with pytest.raises(ApplicationException) as e:
+        processor.put(event={'settings': {
+            f'K{i}': i for i in range(101)
+        }}, name='T1')
+    assert e.value.response.code == 400
+    with pytest.raises(ApplicationException) as e:
+        processor.query(event={'key': ','.join(f'K{i}' for i in range(101))},
+                        _pe={}, name='T1')
+    assert e.value.response.code == 400
+    assert storage['_batches'] == 0
@@ -0,0 +1,130 @@
+import pytest
+
+import services.unit_of_work as unit_of_work
+from services.unit_of_work import UnitOfWork, UnitOfWorkConflict
+
+
+class FakeItem:
+    """
+    DynamoDB item with own credentials so that it cannot be saved within
+    a transaction
+    """
+
+    class Meta:
+        aws_access_key_id = 'key'
+
+    def __init__(self, key: str, storage: dict):
+        self.key = key
+        self._storage = storage
+
+    @staticmethod
+    def is_mongo_model() -> bool:
+        return False
+
+    def save(self):
+        self._storage[self.key] = self
+
+    def delete(self):
+        self._storage.pop(self.key, None)
+        self._storage.setdefault('_deleted', []).append(self.key)
+
+
+@pytest.fixture
+def storage(monkeypatch) -> dict:
+    items = {}
+
+    def insert_if_not_exists(item, unique=(), session=None):
+        if item.key in items:
+            return False
+        item.save()
+        return True
+
+    monkeypatch.setattr(unit_of_work, 'insert_if_not_exists',
+                        insert_if_not_exists)
+    monkeypatch.setattr(UnitOfWork, '_stored',
+                        staticmethod(lambda item: items.get(item.key)))
+    return items
+
+
+def test_commit(storage):
+    uow = UnitOfWork()
+    uow.insert(FakeItem('one', storage))
+    uow.save(FakeItem('two', storage))
+    uow.commit()
+    assert set(storage) == {'one', 'two'}
+
+
+def test_conflict_deletes_saved(storage):
+    existing = FakeItem('two', storage)
+    existing.save()
+    uow = UnitOfWork()
+    uow.insert(FakeItem('one', storage))
+    uow.save(FakeItem('three', storage))
+    conflicting = FakeItem('two', storage)
+    uow.insert(conflicting)
+    with pytest.raises(UnitOfWorkConflict) as e:
+        uow.commit()
+    assert e.value.item is conflicting
+    assert storage['two'] is existing
+    assert 'one' not in storage and 'three' not in storage
+    assert storage['_deleted'] == ['three', 'one']
+
+
+def test_saved_item_overwrites(storage):
+    FakeItem('one', storage).save()
+    uow = UnitOfWork()
+    new = FakeItem('one', storage)
+    uow.save(new)
+    uow.commit()
+    assert storage['one'] is new
+
+
+def test_rollback(storage):
+    uow = UnitOfWork()
+    uow.insert(FakeItem('one', storage))
+    uow.insert(FakeItem('two', storage))
+    uow.commit()
+    uow.rollback()
+    assert storage == {'_deleted': ['two', 'one']}
+    uow.rollback()
+    assert storage == {'_deleted': ['two', 'one']}
+
+
+def test_rollback_restores_overwritten(storage):
+    existing = FakeItem('two', storage)
+    existing.save()
+    uow = UnitOfWork()
+    uow.insert(FakeItem('one', storage))
+    uow.save(FakeItem('two', storage))
+    uow.commit()
+    uow.rollback()
+    assert storage['two'] is existing
+    assert 'one' not in storage
+
+
+class Client:
+    def __init__(self, hello: dict | None):
+        self.hello = hello
+        self.asked = 0
+        self.admin = self
+
+    def command(self, name: str) -> dict:
+        assert name == 'hello'
+        self.asked += 1
+        if self.hello is None:
+            raise NotImplementedError
+        return self.hello
+
+
+def test_transactions_are_detected_per_client():
+    replica_set = Client({'setName': 'rs0'})
+    sharded = Client({'msg': 'isdbgrid'})
+    standalone = Client({'isWritablePrimary': True})
+    mongomock = Client(None)
+    for _ in range(2):
+        assert unit_of_work.supports_transactions(replica_set)
+        assert unit_of_work.supports_transactions(sharded)
+        assert not unit_of_work.supports_transactions(standalone)
+        assert not unit_of_work.supports_transactions(mongomock)
+    for client in (replica_set, sharded, standalone, mongomock):
+        assert client.asked == 1